@@ -0,0 +1,103 @@
+import os
+import threading
+from typing import Iterable
+
+from prometheus_metrics import ADMISSION_DECISIONS
+
+# Eşikler env ile ayarlanabilir
+DEGRADE_IN_FLIGHT = int(os.environ.get('ADMISSION_DEGRADE_IN_FLIGHT', '32'))
+SHED_IN_FLIGHT = int(os.environ.get('ADMISSION_SHED_IN_FLIGHT', '128'))
+DEGRADE_QUEUE_MS = float(os.environ.get('ADMISSION_DEGRADE_QUEUE_MS', '200'))
+SHED_QUEUE_MS = float(os.environ.get('ADMISSION_SHED_QUEUE_MS', '1000'))
+RETRY_AFTER_SECONDS = int(os.environ.get('ADMISSION_RETRY_AFTER_SECONDS', '1'))
+
+ADMIT, DEGRADE, SHED = 'admit', 'degrade', 'shed'
+
+
+class AdmissionController:
+    """
+    🚦 Admission control from in-flight requests and executor queue delay
+
+    Each request is admitted, admitted in degraded mode (handlers serve
+    precomputed lists instead of running the full recommender) or shed with
+    a 503 before any work is queued. Signals: requests currently inside the
+    app and the queue delay of the executor(s) that do the heavy work.
+    """
+
+    def __init__(self, executors: Iterable, degrade_in_flight: int = DEGRADE_IN_FLIGHT,
+                 shed_in_flight: int = SHED_IN_FLIGHT, degrade_queue_ms: float = DEGRADE_QUEUE_MS,
+                 shed_queue_ms: float = SHED_QUEUE_MS):
+        self.executors = list(executors)
+        self.degrade_in_flight = degrade_in_flight
+        self.shed_in_flight = shed_in_flight
+        self.degrade_queue_ms = degrade_queue_ms
+        self.shed_queue_ms = shed_queue_ms
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def queue_delay_ms(self) -> float:
+        return max((executor.queue_delay() for executor in self.executors), default=0.0) * 1000
+
+    def decide(self) -> str:
+        queue_ms = self.queue_delay_ms()
+        if self.in_flight >= self.shed_in_flight or queue_ms >= self.shed_queue_ms:
+            return SHED
+        if self.in_flight >= self.degrade_in_flight or queue_ms >= self.degrade_queue_ms:
+            return DEGRADE
+        return ADMIT
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            'in_flight': self.in_flight,
+            'queue_delay_ms': round(self.queue_delay_ms(), 1),
+            'decision': self.decide(),
+            'thresholds': {
+                'degrade_in_flight': self.degrade_in_flight,
+                'shed_in_flight': self.shed_in_flight,
+                'degrade_queue_ms': self.degrade_queue_ms,
+                'shed_queue_ms': self.shed_queue_ms,
+            },
+        }
+
+
+def is_degraded(request) -> bool:
+    """Handler'lar için: bu istek degrade modda mı kabul edildi?"""
+    return getattr(request.state, 'admission', ADMIT) == DEGRADE
+
+
+def install_admission_control(app, controller: AdmissionController,
+                              exempt_paths: Iterable[str] = ('/', '/metrics', '/health')):
+    """FastAPI app'e admission middleware'ini ekle (exempt path'ler her zaman kabul edilir)"""
+    from fastapi import Request
+    from fastapi.responses import JSONResponse
+
+    exempt = frozenset(exempt_paths)
+
+    @app.middleware("http")
+    async def admission_middleware(request: Request, call_next):
+        if request.url.path in exempt or request.url.path.startswith('/static'):
+            return await call_next(request)
+
+        decision = controller.decide()
+        ADMISSION_DECISIONS.labels(decision).inc()
+        if decision == SHED:
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "Server overloaded, please retry"},
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+
+        request.state.admission = decision
+        controller.enter()
+        try:
+            return await call_next(request)
+        finally:
+            controller.exit()
@@ -0,0 +1,243 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import create_engine
+
+from database_fixed import AnalyticsDaily, AnalyticsGenre, AnalyticsWatermark, Base
+from executors import ExecutorBusy, run_blocking
+from genre_index import parse_genres
+from sqlite_pool import get_pool
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.environ.get('ANALYTICS_DB_PATH', 'movie_recommendation.db')
+COMPACT_BATCH = 50_000
+COMPACT_INTERVAL_SECONDS = float(os.environ.get('ANALYTICS_COMPACT_SECONDS', '60'))
+COUNTER_TABLES = (AnalyticsDaily.__table__, AnalyticsGenre.__table__, AnalyticsWatermark.__table__)
+
+
+def ensure_tables(db_path: str = DEFAULT_DB_PATH):
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine, tables=list(COUNTER_TABLES))
+    engine.dispose()
+    # rerates / last_time sonradan eklendi: eski sayaç tablolarına sütunları ekle
+    with get_pool(db_path).connection() as conn, conn:
+        for table, column, sql_type in (('analytics_daily', 'rerates', 'INTEGER DEFAULT 0'),
+                                        ('analytics_watermarks', 'last_time', 'VARCHAR')):
+            if column not in table_columns(conn, table):
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}")
+        if 'updated_at' in table_columns(conn, 'ratings'):
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_ratings_updated_at ON ratings (updated_at)")
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _rating_source(conn: sqlite3.Connection) -> Tuple[str, str]:
+    # İki şema var: ORM (created_at, ratings.movie_id -> movies.id) ve
+    # setup_complete_system (unix timestamp, ratings.movie_id -> movies.movie_id)
+    rating_columns = table_columns(conn, 'ratings')
+    if 'created_at' in rating_columns:
+        day = "date(r.created_at)"
+    elif 'timestamp' in rating_columns:
+        day = "date(r.timestamp, 'unixepoch')"
+    else:
+        day = "NULL"
+    join_column = 'id' if 'id' in table_columns(conn, 'movies') else 'movie_id'
+    return day, join_column
+
+
+def _watermark(conn: sqlite3.Connection, source: str) -> int:
+    row = conn.execute("SELECT last_id FROM analytics_watermarks WHERE source = ?", (source,)).fetchone()
+    return row[0] if row else 0
+
+
+def _set_watermark(conn: sqlite3.Connection, source: str, last_id: int):
+    conn.execute(
+        "INSERT INTO analytics_watermarks (source, last_id, updated_at) VALUES (?, ?, ?) "
+        "ON CONFLICT(source) DO UPDATE SET last_id = excluded.last_id, updated_at = excluded.updated_at",
+        (source, last_id, datetime.utcnow().isoformat(sep=' ')),
+    )
+
+
+def _compact_ratings(conn: sqlite3.Connection, batch: int) -> int:
+    day, join_column = _rating_source(conn)
+    rows = conn.execute(
+        f"SELECT r.id, {day}, m.genres FROM ratings r "
+        f"LEFT JOIN movies m ON m.{join_column} = r.movie_id "
+        f"WHERE r.id > ? ORDER BY r.id LIMIT ?",
+        (_watermark(conn, 'ratings'), batch),
+    ).fetchall()
+    if not rows:
+        return 0
+
+    per_day = Counter(rating_day for _, rating_day, _ in rows if rating_day)
+    per_genre = Counter()
+    parsed = {}  # Aynı tür string'i tekrar tekrar parse edilmesin
+    for _, _, genres in rows:
+        if genres not in parsed:
+            parsed[genres] = parse_genres(genres)
+        per_genre.update(parsed[genres])
+
+    conn.executemany(
+        "INSERT INTO analytics_daily (day, ratings, new_users, rerates) VALUES (?, ?, 0, 0) "
+        "ON CONFLICT(day) DO UPDATE SET ratings = ratings + excluded.ratings",
+        per_day.items(),
+    )
+    conn.executemany(
+        "INSERT INTO analytics_genres (genre, ratings) VALUES (?, ?) "
+        "ON CONFLICT(genre) DO UPDATE SET ratings = ratings + excluded.ratings",
+        per_genre.items(),
+    )
+    _set_watermark(conn, 'ratings', rows[-1][0])
+    return len(rows)
+
+
+def _time_watermark(conn: sqlite3.Connection, source: str) -> Tuple[Optional[str], int]:
+    row = conn.execute("SELECT last_time, last_id FROM analytics_watermarks WHERE source = ?", (source,)).fetchone()
+    return (row[0], row[1]) if row else (None, 0)
+
+
+def _set_time_watermark(conn: sqlite3.Connection, source: str, last_time: str, last_id: int):
+    conn.execute(
+        "INSERT INTO analytics_watermarks (source, last_id, last_time, updated_at) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(source) DO UPDATE SET last_id = excluded.last_id, last_time = excluded.last_time, "
+        "updated_at = excluded.updated_at",
+        (source, last_id, last_time, datetime.utcnow().isoformat(sep=' ')),
+    )
+
+
+def _compact_rating_updates(conn: sqlite3.Connection, batch: int, counted_id: int) -> int:
+    # Re-rate: zaten sayılmış (id <= counted_id) bir satırın updated_at'i watermark'ı geçti
+    if 'updated_at' not in table_columns(conn, 'ratings'):
+        return 0
+    last_time, last_id = _time_watermark(conn, 'rating_updates')
+    if last_time is None:
+        # İlk çalışma: mevcut satırların geçmiş güncellemeleri sayılmaz, bundan sonrakiler sayılır
+        start = conn.execute("SELECT COALESCE(MAX(updated_at), ''), COALESCE(MAX(id), 0) FROM ratings").fetchone()
+        _set_time_watermark(conn, 'rating_updates', start[0], start[1])
+        return 0
+
+    rows = conn.execute(
+        "SELECT id, updated_at, date(updated_at) FROM ratings "
+        "WHERE (updated_at, id) > (?, ?) ORDER BY updated_at, id LIMIT ?",
+        (last_time, last_id, batch),
+    ).fetchall()
+    if not rows:
+        return 0
+
+    # Yeni satırlar (id > counted_id) rating olarak sayılır; watermark onları da geçer
+    per_day = Counter(update_day for row_id, _, update_day in rows if row_id <= counted_id and update_day)
+    conn.executemany(
+        "INSERT INTO analytics_daily (day, ratings, new_users, rerates) VALUES (?, 0, 0, ?) "
+        "ON CONFLICT(day) DO UPDATE SET rerates = rerates + excluded.rerates",
+        per_day.items(),
+    )
+    _set_time_watermark(conn, 'rating_updates', rows[-1][1], rows[-1][0])
+    return len(rows)
+
+
+def _compact_users(conn: sqlite3.Connection, batch: int) -> int:
+    day = "date(created_at)" if 'created_at' in table_columns(conn, 'users') else "NULL"
+    rows = conn.execute(
+        f"SELECT id, {day} FROM users WHERE id > ? ORDER BY id LIMIT ?",
+        (_watermark(conn, 'users'), batch),
+    ).fetchall()
+    if not rows:
+        return 0
+
+    per_day = Counter(user_day for _, user_day in rows if user_day)
+    conn.executemany(
+        "INSERT INTO analytics_daily (day, ratings, new_users, rerates) VALUES (?, 0, ?, 0) "
+        "ON CONFLICT(day) DO UPDATE SET new_users = new_users + excluded.new_users",
+        per_day.items(),
+    )
+    _set_watermark(conn, 'users', rows[-1][0])
+    return len(rows)
+
+
+def compact_once(db_path: str = DEFAULT_DB_PATH, batch: int = COMPACT_BATCH) -> Dict[str, int]:
+    """
+    Fold at most `batch` new ratings, re-rates and users into the counter tables
+
+    New rows are found through the primary key (id > watermark), so a pass
+    costs O(new rows) whatever the table sizes. Counters and watermarks are
+    updated in one transaction; SQLite has a single writer, so ids become
+    visible in order and nothing is skipped or counted twice.
+
+    Re-rates update a row in place. They are found through the
+    ratings.updated_at index with their own (updated_at, id) watermark and
+    counted per day of updated_at, once per row and pass: a row rated and
+    re-rated between two passes counts as one new rating. Counting starts
+    when the watermark is first created; deletes are only reflected by
+    rebuild(), which also restarts re-rate counting.
+    """
+    with get_pool(db_path).connection() as conn, conn:
+        # Re-rate'ler önce: bu geçişte sayılacak yeni satırlar re-rate sayılmasın
+        rerates = _compact_rating_updates(conn, batch, _watermark(conn, 'ratings'))
+        return {'ratings': _compact_ratings(conn, batch), 'rating_updates': rerates,
+                'users': _compact_users(conn, batch)}
+
+
+def compact(db_path: str = DEFAULT_DB_PATH, batch: int = COMPACT_BATCH) -> Dict[str, int]:
+    """Birikmiş tüm satırları işle (batch batch)"""
+    start = time.perf_counter()
+    totals = Counter()
+    while True:
+        counts = compact_once(db_path, batch)
+        totals.update(counts)
+        if max(counts.values()) < batch:
+            break
+    return {**totals, 'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+
+def rebuild(db_path: str = DEFAULT_DB_PATH, batch: int = COMPACT_BATCH) -> Dict[str, int]:
+    """Sayaçları sıfırdan hesapla (silinen rating'ler / şema değişikliği sonrası)"""
+    with get_pool(db_path).connection() as conn, conn:
+        for table in COUNTER_TABLES:
+            conn.execute(f"DELETE FROM {table.name}")
+    return compact(db_path, batch)
+
+
+async def run_compactor(db_path: str = DEFAULT_DB_PATH, interval: float = COMPACT_INTERVAL_SECONDS,
+                        batch: int = COMPACT_BATCH):
+    """API içinde periyodik compactor; her batch ayrı DB executor çağrısı (havuzu uzun süre tutmaz)"""
+    await run_blocking(ensure_tables, db_path)
+    logger.info(f"📈 Analytics compactor started (every {interval:.0f}s)")
+    while True:
+        try:
+            counts = await run_blocking(compact_once, db_path, batch)
+        except (sqlite3.Error, ExecutorBusy) as e:
+            # DB executor dolu ya da kilit: bir sonraki turda devam edilir
+            logger.warning(f"⚠️ Analytics compaction failed: {e}")
+            counts = {}
+        # Dolu batch: backlog var, beklemeden devam et
+        if counts and max(counts.values()) >= batch:
+            continue
+        await asyncio.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental analytics counters compactor")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="SQLite database path")
+    parser.add_argument('--batch', type=int, default=COMPACT_BATCH, help="Rows folded per transaction")
+    parser.add_argument('--rebuild', action='store_true', help="Drop the counters and recount everything")
+    args = parser.parse_args()
+
+    ensure_tables(args.db)
+    result = rebuild(args.db, args.batch) if args.rebuild else compact(args.db, args.batch)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
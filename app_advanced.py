@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, Depends, status, Query
+from fastapi import FastAPI, HTTPException, Depends, status, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
@@ -10,8 +10,12 @@ import json
 
 # Import modüller
 from database_fixed import get_db, User, Movie, Rating, Favorite, UserActivity
-from auth import UserService, create_access_token, verify_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from auth import UserService, auth_cache, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from password_service import PASSWORD_RETRY_AFTER_SECONDS, PasswordServiceBusy, password_service
 from advanced_recommender import HybridRecommendationEngine
+from genre_index import get_genre_catalog, parse_genres
+from similar_movies import similar_index
+from http_cache import make_etag, not_modified, set_cache_headers
 from datetime import timedelta
 
 # Global recommendation engine
@@ -57,7 +61,7 @@ async def get_current_user(
     db: Session = Depends(get_db)
 ):
     token = credentials.credentials
-    username = verify_token(token)
+    username = auth_cache.verify(token)
     if username is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -65,23 +69,30 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.username == username).first()
+    # Cache hit: sorgu yok (paylaşılan, session'dan ayrılmış kopya; değiştirmek için yeniden yükle)
+    user = auth_cache.get_user(username)
     if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        db.expunge(user)
+        auth_cache.put_user(username, user)
     return user
 
 # 🆕 GENRE ENDPOINTS
 @app.get("/genres")
-async def get_all_genres(db: Session = Depends(get_db)):
+async def get_all_genres(request: Request, response: Response, db: Session = Depends(get_db)):
     """Sistemdeki tüm film türlerini listele"""
     try:
-        movies = db.query(Movie).all()
-        all_genres = set()
+        # Katalog bellekte: güncel kopyaya sorgusuz 304
+        catalog = get_genre_catalog(db)
+        etag = make_etag('genres', catalog.content_version)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        set_cache_headers(response, etag)
         
-        for movie in movies:
-            if movie.genres:
-                genres = json.loads(movie.genres)
-                all_genres.update(genres)
+        all_genres = set(catalog.genre_names())
         
         # 'unknown' türünü çıkar ve sırala
         all_genres.discard('unknown')
@@ -153,21 +164,38 @@ async def get_similar_movies(
             if rated_movie:
                 user_ratings[rated_movie.movie_id] = rating.rating
         
-        # Content-based öneriler
-        recommendations = rec_engine.get_content_based_recommendations(
-            liked_movie_ids=[movie_id],
-            user_ratings=user_ratings,
-            n_recommendations=n_recommendations
-        )
+        # 🔗 Önceden hesaplanmış top-K tablo (puanladığı filmler hariç)
+        neighbours = similar_index.lookup(movie_id)
+        if neighbours is not None:
+            catalog = get_genre_catalog(db)
+            recommendations = []
+            for similar_id, score in neighbours:
+                row = catalog.row_for_movie_id(similar_id)
+                if row is None or similar_id in user_ratings:
+                    continue
+                card = catalog.movie_card(row)
+                card["similarity_score"] = round(score, 4)
+                recommendations.append(card)
+                if len(recommendations) >= n_recommendations:
+                    break
+            method = f"BENZER FİLMLER (ÖNCEDEN HESAPLANMIŞ): {movie.title}"
+        else:
+            # Content-based öneriler
+            recommendations = rec_engine.get_content_based_recommendations(
+                liked_movie_ids=[movie_id],
+                user_ratings=user_ratings,
+                n_recommendations=n_recommendations
+            )
+            method = f"BENZER FİLMLER: {movie.title}"
         
         return {
             "status": "success",
             "base_movie": {
                 "movie_id": movie.movie_id,
                 "title": movie.title,
-                "genres": json.loads(movie.genres) if movie.genres else []
+                "genres": parse_genres(movie.genres)
             },
-            "method": f"BENZER FİLMLER: {movie.title}",
+            "method": method,
             "recommendations": recommendations
         }
         
@@ -225,9 +253,11 @@ async def update_user_genre_preferences(
 ):
     """Kullanıcının tür tercihlerini güncelle"""
     try:
-        # User'ın favorite_genres'ini güncelle
-        current_user.favorite_genres = json.dumps(genre_request.genres)
+        # User'ın favorite_genres'ini güncelle (cache'teki kopya değil, bu session'daki satır)
+        user = db.get(User, current_user.id)
+        user.favorite_genres = json.dumps(genre_request.genres)
         db.commit()
+        auth_cache.invalidate_user(user.username)
         
         return {
             "status": "success",
@@ -243,13 +273,23 @@ async def update_user_genre_preferences(
 async def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
     try:
         user_service = UserService()
+        # Kullanıcı zaten var mı? (bcrypt'ten önce, ucuz kontrol)
+        if user_service.get_user_by_username(user_data.username):
+            raise ValueError("Bu kullanıcı adı zaten kullanılıyor")
+        
+        if user_service.get_user_by_email(user_data.email):
+            raise ValueError("Bu email zaten kullanılıyor")
+        
+        # bcrypt process pool'da (event loop bloklanmaz)
+        hashed_password = await password_service.hash(user_data.password)
         user = user_service.create_user(
             username=user_data.username,
             email=user_data.email,
             password=user_data.password,
             age=user_data.age,
             gender=user_data.gender,
-            favorite_genres=user_data.favorite_genres
+            favorite_genres=user_data.favorite_genres,
+            hashed_password=hashed_password
         )
         
         return {
@@ -260,16 +300,19 @@ async def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
         }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PasswordServiceBusy:
+        raise HTTPException(status_code=503, detail="Çok fazla giriş isteği, lütfen tekrar deneyin",
+                            headers={"Retry-After": str(PASSWORD_RETRY_AFTER_SECONDS)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/login")
 async def login_user(user_data: UserLogin, db: Session = Depends(get_db)):
     try:
-        user_service = UserService()
-        user = user_service.authenticate_user(user_data.username, user_data.password)
+        user = db.query(User).filter(User.username == user_data.username).first()
         
-        if not user:
+        # Şifre doğrulama (bcrypt) process pool'da
+        if not user or not await password_service.verify(user.username, user_data.password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Yanlış kullanıcı adı veya şifre"
@@ -295,9 +338,18 @@ async def login_user(user_data: UserLogin, db: Session = Depends(get_db)):
         }
     except HTTPException:
         raise
+    except PasswordServiceBusy:
+        raise HTTPException(status_code=503, detail="Çok fazla giriş isteği, lütfen tekrar deneyin",
+                            headers={"Retry-After": str(PASSWORD_RETRY_AFTER_SECONDS)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/logout")
+async def logout_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Çıkış: token süresi dolana kadar reddedilir (diğer worker'lar AUTH_REVOCATION_CHECK_SECONDS içinde görür)"""
+    auth_cache.revoke(credentials.credentials)
+    return {"status": "success", "message": "Çıkış yapıldı"}
+
 @app.post("/rate-movie")
 async def rate_movie(
     rating_data: UserRating, 
@@ -346,8 +398,15 @@ async def rate_movie(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/search")
-async def search_movies(q: str = Query(..., description="Arama terimi"), db: Session = Depends(get_db)):
+async def search_movies(request: Request, response: Response,
+                        q: str = Query(..., description="Arama terimi"), db: Session = Depends(get_db)):
     try:
+        etag = make_etag('search', get_genre_catalog(db).content_version, q)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        set_cache_headers(response, etag)
+        
         search_results = db.query(Movie).filter(
             Movie.title.contains(q)
         ).order_by(Movie.popularity_score.desc()).limit(20).all()
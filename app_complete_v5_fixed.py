@@ -1,9 +1,10 @@
-from fastapi import FastAPI, HTTPException, Depends, status, Query
+from fastapi import FastAPI, HTTPException, Depends, status, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from typing import Dict, List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 import json
 from datetime import datetime
 from ml_service_simple import ml_service
@@ -11,12 +12,24 @@ from ml_service_simple import ml_service
 
 
 # Import modüller
-from database_fixed import get_db, User, Movie, Rating, Favorite, UserActivity# app_complete_v5_fixed.py dosyasının EN BAŞINA şunu ekle:
+from database_fixed import SessionLocal, User, Movie, Rating, Favorite, UserActivity# app_complete_v5_fixed.py dosyasının EN BAŞINA şunu ekle:
 from ml_service_simple import ml_service
 
-from auth import UserService, create_access_token, verify_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from auth import UserService, auth_cache, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from advanced_recommender import HybridRecommendationEngine
 from datetime import timedelta
+from database_fixed import engine
+from prometheus_metrics import install_metrics, instrument_sqlalchemy
+from genre_index import get_genre_catalog_async, match_fraction
+from json_fragments import PreEncodedJSONResponse, json_array, with_fields
+from async_database import async_engine, get_async_db
+from executors import ExecutorBusy, install_busy_handler, run_blocking, run_cpu
+from password_service import PASSWORD_RETRY_AFTER_SECONDS, PasswordServiceBusy, password_service
+from similar_movies import similar_index
+from http_cache import PRIVATE_CATALOG_CACHE, make_etag, not_modified, set_cache_headers
+from pagination import (PAGE_DEFAULT_LIMIT, InvalidCursor, decode_id_cursor, decode_time_cursor, encode_cursor,
+                        encode_time_cursor, page_limit, split_page)
+import numpy as np
 
 # Global recommendation engine
 rec_engine = HybridRecommendationEngine()
@@ -32,6 +45,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 📊 Prometheus /metrics + ORM sorgu süreleri (sync executor session'ları + async engine)
+install_metrics(app)
+# Executor slotları doluysa (ExecutorBusy) 503 + Retry-After
+install_busy_handler(app)
+instrument_sqlalchemy(engine)
+instrument_sqlalchemy(async_engine.sync_engine)
+
 security = HTTPBearer()
 
 # Pydantic Models
@@ -74,10 +94,10 @@ class WatchlistRequest(BaseModel):
 # Dependency: Current User
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     token = credentials.credentials
-    username = verify_token(token)
+    username = auth_cache.verify(token)
     if username is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -85,54 +105,93 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.username == username).first()
+    # Cache hit: sorgu yok (paylaşılan, session'dan ayrılmış kopya; değiştirmek için yeniden yükle)
+    user = auth_cache.get_user(username)
     if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
+        user = await db.scalar(select(User).where(User.username == username))
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        db.expunge(user)
+        auth_cache.put_user(username, user)
     return user
 
+async def _seen_rows(catalog, db: AsyncSession, user_id: int) -> np.ndarray:
+    """Kullanıcının puanladığı + favoriye eklediği filmlerin katalog satırları"""
+    rated = await db.scalars(select(Rating.movie_id).where(Rating.user_id == user_id))
+    favorited = await db.scalars(select(Favorite.movie_id).where(Favorite.user_id == user_id))
+    return catalog.rows_for_db_ids(list(rated) + list(favorited))
+
+async def _resolve_movie(movie_id: int):
+    """Dış movie_id -> (movies.id, film kartı); katalog cache'ten, sorgusuz"""
+    catalog = await get_genre_catalog_async()
+    row = catalog.row_for_movie_id(movie_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Film bulunamadı")
+    return int(catalog.db_ids[row]), catalog.movie_card(row)
+
+def _with_sync_session(func, *args, **kwargs):
+    """Sync Session bekleyen servisler için (executor thread'inde çalışır)"""
+    with SessionLocal() as db:
+        return func(*args, db=db, **kwargs)
+
 # 🔑 AUTH ENDPOINTS
+def _create_user_sync(user_data: UserRegister, hashed_password: str, db) -> int:
+    new_user = UserService(db).create_user(
+        username=user_data.username,
+        email=user_data.email,
+        password=user_data.password,
+        age=user_data.age,
+        gender=user_data.gender,
+        favorite_genres=user_data.favorite_genres or [],
+        hashed_password=hashed_password
+    )
+    return new_user.id
+
+def _password_service_busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Çok fazla giriş isteği, lütfen tekrar deneyin",
+                         headers={"Retry-After": str(PASSWORD_RETRY_AFTER_SECONDS)})
+
 @app.post("/register")
-async def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register_user(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
     """Kullanıcı kaydı"""
     try:
-        user_service = UserService(db)
-        
-        # Kullanıcı zaten var mı?
-        if user_service.get_user_by_username(user_data.username):
+        # Kullanıcı zaten var mı? (bcrypt'ten önce, ucuz kontrol)
+        if await db.scalar(select(User.id).where(User.username == user_data.username)) is not None:
             raise HTTPException(status_code=400, detail="Bu kullanıcı adı zaten kullanılıyor")
         
-        if user_service.get_user_by_email(user_data.email):
+        if await db.scalar(select(User.id).where(User.email == user_data.email)) is not None:
             raise HTTPException(status_code=400, detail="Bu email adresi zaten kullanılıyor")
         
-        # Kullanıcı oluştur
-        new_user = user_service.create_user(
-            username=user_data.username,
-            email=user_data.email,
-            password=user_data.password,
-            age=user_data.age,
-            gender=user_data.gender,
-            favorite_genres=user_data.favorite_genres or []
-        )
+        # bcrypt process pool'da; kayıt sync UserService ile DB executor'da
+        hashed_password = await password_service.hash(user_data.password)
+        new_user_id = await run_blocking(_with_sync_session, _create_user_sync, user_data, hashed_password)
         
         return {
             "status": "success",
             "message": "Kullanıcı başarıyla kaydedildi!",
-            "user_id": new_user.id
+            "user_id": new_user_id
         }
         
-    except HTTPException:
+    except (HTTPException, ExecutorBusy):
         raise
+    except PasswordServiceBusy:
+        raise _password_service_busy()
+    except ValueError as e:
+        # Eşzamanlı kayıt: UserService'in kendi kontrolü yakaladı
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/login")
-async def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
+async def login_user(login_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Kullanıcı girişi"""
     try:
-        user_service = UserService(db)
-        user = user_service.authenticate_user(login_data.username, login_data.password)
+        user = await db.scalar(select(User).where(User.username == login_data.username))
         
-        if not user:
+        # Şifre doğrulama (bcrypt) process pool'da; event loop serbest kalır
+        if not user or not await password_service.verify(
+            user.username, login_data.password, user.hashed_password
+        ):
             raise HTTPException(status_code=401, detail="Kullanıcı adı veya şifre hatalı")
         
         # JWT token oluştur
@@ -155,58 +214,69 @@ async def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
         
     except HTTPException:
         raise
+    except PasswordServiceBusy:
+        raise _password_service_busy()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/logout")
+async def logout_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Çıkış: token süresi dolana kadar reddedilir (diğer worker'lar AUTH_REVOCATION_CHECK_SECONDS içinde görür)"""
+    auth_cache.revoke(credentials.credentials)
+    return {"status": "success", "message": "Çıkış yapıldı"}
+
 # 🎬 MOVIE ENDPOINTS
 @app.get("/search")
-async def search_movies(q: str, limit: int = 20, db: Session = Depends(get_db)):
-    """Film arama - Database'den"""
+async def search_movies(q: str, request: Request, limit: int = 20, cursor: Optional[str] = None,
+                        db: AsyncSession = Depends(get_async_db)):
+    """Film arama - Database'den (movies.id sırasında, cursor ile sayfalı)"""
     try:
-        # Database'den arama yap
-        movies = db.query(Movie).filter(
-            Movie.title.ilike(f"%{q}%")
-        ).limit(limit).all()
-        
-        results = []
-        for movie in movies:
-            results.append({
-                "movie_id": movie.movie_id,
-                "title": movie.title,
-                "release_date": movie.release_date,
-                "avg_rating": round(movie.avg_rating, 2) if movie.avg_rating else 0,
-                "popularity": movie.rating_count if movie.rating_count else 0,
-                "genres": json.loads(movie.genres) if movie.genres else [],
-                "imdb_url": movie.imdb_url if movie.imdb_url else None
-            })
+        limit = page_limit(limit)
+        after_id = decode_id_cursor(cursor) if cursor else 0
         
-        return {
+        # Sonuç yalnızca katalog versiyonuna ve parametrelere bağlı: güncel kopyaya 304 (sorgu yok)
+        catalog = await get_genre_catalog_async()
+        etag = make_etag('search', catalog.content_version, q, limit, after_id)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        
+        # Database'den arama yap (sadece id'ler; kartlar katalogdan hazır JSON olarak)
+        movie_db_ids, has_more = split_page((await db.scalars(
+            select(Movie.id).where(Movie.title.ilike(f"%{q}%"), Movie.id > after_id)
+            .order_by(Movie.id).limit(limit + 1)
+        )).all(), limit)
+        
+        rows = [row for row in map(catalog.row_for_db_id, movie_db_ids) if row is not None]
+        
+        return set_cache_headers(PreEncodedJSONResponse({
             "status": "success",
             "query": q,
-            "count": len(results),
-            "results": results
-        }
-        
+            "count": len(rows),
+            "results": json_array(catalog.card_fragment(row) for row in rows),
+            "next_cursor": encode_cursor([movie_db_ids[-1]]) if has_more else None
+        }), etag)
+        
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorBusy:
+        raise
     except Exception as e:
         print(f"Search error: {e}")  # Debug için
         raise HTTPException(status_code=500, detail=f"Arama hatası: {str(e)}")
 
 @app.get("/genres")
-async def get_all_genres(db: Session = Depends(get_db)):
+async def get_all_genres(request: Request, response: Response):
     """Tüm film türlerini getir - Database'den"""
     try:
-        # Database'den tüm film türlerini topla
-        movies = db.query(Movie).filter(Movie.genres.isnot(None)).all()
-        all_genres = set()
-        
-        for movie in movies:
-            if movie.genres:
-                try:
-                    genres = json.loads(movie.genres)
-                    if isinstance(genres, list):
-                        all_genres.update(genres)
-                except:
-                    continue
+        catalog = await get_genre_catalog_async()
+        etag = make_etag('genres', catalog.content_version)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        
+        # Katalogdaki tür bitmask'lerinin birleşimi
+        all_genres = set(catalog.genre_names())
         
         # Eğer database'de türler yoksa default türler ekle
         if not all_genres:
@@ -217,6 +287,7 @@ async def get_all_genres(db: Session = Depends(get_db)):
                 "Thriller", "War", "Western"
             }
         
+        set_cache_headers(response, etag)
         return {
             "status": "success",
             "genres": sorted(list(all_genres))
@@ -240,28 +311,27 @@ async def get_all_genres(db: Session = Depends(get_db)):
 async def rate_movie(
     rating_data: UserRating,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Film puanlama"""
     try:
         # Film var mı kontrol et
-        movie = db.query(Movie).filter(Movie.movie_id == rating_data.movie_id).first()
-        if not movie:
-            raise HTTPException(status_code=404, detail="Film bulunamadı")
+        movie_db_id, movie = await _resolve_movie(rating_data.movie_id)
         
         # Daha önce puanlamış mı?
-        existing_rating = db.query(Rating).filter(
+        existing_rating = await db.scalar(select(Rating).where(
             Rating.user_id == current_user.id,
-            Rating.movie_id == movie.id
-        ).first()
+            Rating.movie_id == movie_db_id
+        ))
         
         if existing_rating:
             existing_rating.rating = rating_data.rating
             existing_rating.created_at = datetime.utcnow()
+            existing_rating.updated_at = existing_rating.created_at  # analytics re-rate sayacı
         else:
             new_rating = Rating(
                 user_id=current_user.id,
-                movie_id=movie.id,
+                movie_id=movie_db_id,
                 rating=rating_data.rating
             )
             db.add(new_rating)
@@ -270,16 +340,16 @@ async def rate_movie(
         activity = UserActivity(
             user_id=current_user.id,
             activity_type="rating",
-            movie_id=movie.id,
+            movie_id=movie_db_id,
             extra_data=json.dumps({"rating": rating_data.rating})
         )
         db.add(activity)
         
-        db.commit()
+        await db.commit()
         
         return {
             "status": "success",
-            "message": f"'{movie.title}' filmi {rating_data.rating} ⭐ ile puanlandı!"
+            "message": f"'{movie['title']}' filmi {rating_data.rating} ⭐ ile puanlandı!"
         }
         
     except HTTPException:
@@ -292,41 +362,39 @@ async def rate_movie(
 async def add_to_favorites(
     favorite_request: FavoriteRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Film favorilere ekle"""
     try:
-        movie = db.query(Movie).filter(Movie.movie_id == favorite_request.movie_id).first()
-        if not movie:
-            raise HTTPException(status_code=404, detail="Film bulunamadı")
+        movie_db_id, movie = await _resolve_movie(favorite_request.movie_id)
         
-        existing_favorite = db.query(Favorite).filter(
+        existing_favorite = await db.scalar(select(Favorite).where(
             Favorite.user_id == current_user.id,
-            Favorite.movie_id == movie.id
-        ).first()
+            Favorite.movie_id == movie_db_id
+        ))
         
         if existing_favorite:
             return {"status": "info", "message": "Film zaten favorilerinizde"}
         
         new_favorite = Favorite(
             user_id=current_user.id,
-            movie_id=movie.id
+            movie_id=movie_db_id
         )
         db.add(new_favorite)
         
         activity = UserActivity(
             user_id=current_user.id,
             activity_type="favorite",
-            movie_id=movie.id,
+            movie_id=movie_db_id,
             extra_data=json.dumps({"action": "add"})
         )
         db.add(activity)
         
-        db.commit()
+        await db.commit()
         
         return {
             "status": "success",
-            "message": f"'{movie.title}' favorilerinize eklendi! ❤️"
+            "message": f"'{movie['title']}' favorilerinize eklendi! ❤️"
         }
         
     except HTTPException:
@@ -338,37 +406,35 @@ async def add_to_favorites(
 async def remove_from_favorites(
     movie_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Film favorilerden çıkar"""
     try:
-        movie = db.query(Movie).filter(Movie.movie_id == movie_id).first()
-        if not movie:
-            raise HTTPException(status_code=404, detail="Film bulunamadı")
+        movie_db_id, movie = await _resolve_movie(movie_id)
         
-        favorite = db.query(Favorite).filter(
+        favorite = await db.scalar(select(Favorite).where(
             Favorite.user_id == current_user.id,
-            Favorite.movie_id == movie.id
-        ).first()
+            Favorite.movie_id == movie_db_id
+        ))
         
         if not favorite:
             return {"status": "info", "message": "Film zaten favorilerinizde değil"}
         
-        db.delete(favorite)
+        await db.delete(favorite)
         
         activity = UserActivity(
             user_id=current_user.id,
             activity_type="unfavorite",
-            movie_id=movie.id,
+            movie_id=movie_db_id,
             extra_data=json.dumps({"action": "remove"})
         )
         db.add(activity)
         
-        db.commit()
+        await db.commit()
         
         return {
             "status": "success",
-            "message": f"'{movie.title}' favorilerinizden çıkarıldı! 💔"
+            "message": f"'{movie['title']}' favorilerinizden çıkarıldı! 💔"
         }
         
     except HTTPException:
@@ -378,36 +444,46 @@ async def remove_from_favorites(
 
 @app.get("/my-favorites")
 async def get_my_favorites(
+    limit: int = PAGE_DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Kullanıcının favori filmlerini listele"""
+    """Kullanıcının favori filmlerini listele (en yeni önce, cursor ile sayfalı)"""
     try:
-        favorites = db.query(Favorite).filter(Favorite.user_id == current_user.id).all()
-        
+        limit = page_limit(limit)
+        # Keyset: (user_id, created_at, id) index'i üzerinde limit + 1 satır
+        query = select(Favorite.id, Favorite.movie_id, Favorite.created_at).where(
+            Favorite.user_id == current_user.id
+        )
+        if cursor:
+            query = query.where(tuple_(Favorite.created_at, Favorite.id) < decode_time_cursor(cursor))
+        favorites, has_more = split_page((await db.execute(
+            query.order_by(Favorite.created_at.desc(), Favorite.id.desc()).limit(limit + 1)
+        )).all(), limit)
+        
+        # Film kartları katalog cache'ten hazır JSON olarak (film başına sorgu / encode yok)
+        catalog = await get_genre_catalog_async()
         favorite_movies = []
         for favorite in favorites:
-            movie = db.query(Movie).filter(Movie.id == favorite.movie_id).first()
-            if movie:
-                favorite_movies.append({
-                    "movie_id": movie.movie_id,
-                    "title": movie.title,
-                    "release_date": movie.release_date,
-                    "avg_rating": movie.avg_rating,
-                    "popularity": movie.rating_count,
-                    "genres": json.loads(movie.genres) if movie.genres else [],
-                    "imdb_url": movie.imdb_url,
-                    "added_to_favorites": favorite.created_at.isoformat()
-                })
-        
-        favorite_movies.sort(key=lambda x: x['added_to_favorites'], reverse=True)
-        
-        return {
+            row = catalog.row_for_db_id(favorite.movie_id)
+            if row is not None:
+                favorite_movies.append(with_fields(
+                    catalog.card_fragment(row),
+                    {"added_to_favorites": favorite.created_at.isoformat()}
+                ))
+        
+        return PreEncodedJSONResponse({
             "status": "success",
             "count": len(favorite_movies),
-            "favorites": favorite_movies
-        }
+            "favorites": json_array(favorite_movies),
+            "next_cursor": encode_time_cursor(favorites[-1].created_at, favorites[-1].id) if has_more else None
+        })
         
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -416,19 +492,17 @@ async def get_my_favorites(
 async def add_to_watchlist(
     watchlist_request: WatchlistRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Film watchlist'e ekle"""
     try:
-        movie = db.query(Movie).filter(Movie.movie_id == watchlist_request.movie_id).first()
-        if not movie:
-            raise HTTPException(status_code=404, detail="Film bulunamadı")
+        movie_db_id, movie = await _resolve_movie(watchlist_request.movie_id)
         
-        existing_watchlist = db.query(UserActivity).filter(
+        existing_watchlist = await db.scalar(select(UserActivity).where(
             UserActivity.user_id == current_user.id,
-            UserActivity.movie_id == movie.id,
+            UserActivity.movie_id == movie_db_id,
             UserActivity.activity_type == "watchlist"
-        ).first()
+        ))
         
         if existing_watchlist:
             existing_watchlist.extra_data = json.dumps({"status": watchlist_request.status})
@@ -437,17 +511,17 @@ async def add_to_watchlist(
             watchlist_activity = UserActivity(
                 user_id=current_user.id,
                 activity_type="watchlist",
-                movie_id=movie.id,
+                movie_id=movie_db_id,
                 extra_data=json.dumps({"status": watchlist_request.status})
             )
             db.add(watchlist_activity)
         
-        db.commit()
+        await db.commit()
         
         status_messages = {
-            "to_watch": f"'{movie.title}' izleme listenize eklendi! 📋",
-            "watched": f"'{movie.title}' izlendi olarak işaretlendi! ✅",
-            "removed": f"'{movie.title}' izleme listenizden çıkarıldı! ❌"
+            "to_watch": f"'{movie['title']}' izleme listenize eklendi! 📋",
+            "watched": f"'{movie['title']}' izlendi olarak işaretlendi! ✅",
+            "removed": f"'{movie['title']}' izleme listenizden çıkarıldı! ❌"
         }
         
         return {
@@ -463,50 +537,52 @@ async def add_to_watchlist(
 @app.get("/my-watchlist")
 async def get_my_watchlist(
     status_filter: str = Query("to_watch", description="to_watch, watched, all"),
+    limit: int = PAGE_DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Kullanıcının watchlist'ini listele"""
+    """Kullanıcının watchlist'ini listele (en yeni önce, cursor ile sayfalı)"""
     try:
-        watchlist_entries = db.query(UserActivity).filter(
+        limit = page_limit(limit)
+        # Durum filtresi SQL'de (extra_data JSON); sıralama (user_id, activity_type, created_at, id) index'inden
+        entry_status = func.coalesce(func.json_extract(UserActivity.extra_data, '$.status'), 'to_watch')
+        query = select(UserActivity.id, UserActivity.movie_id, UserActivity.created_at, entry_status).where(
             UserActivity.user_id == current_user.id,
-            UserActivity.activity_type == "watchlist"
-        ).all()
-        
+            UserActivity.activity_type == "watchlist",
+            entry_status != "removed"
+        )
+        if status_filter != "all":
+            query = query.where(entry_status == status_filter)
+        if cursor:
+            query = query.where(tuple_(UserActivity.created_at, UserActivity.id) < decode_time_cursor(cursor))
+        entries, has_more = split_page((await db.execute(
+            query.order_by(UserActivity.created_at.desc(), UserActivity.id.desc()).limit(limit + 1)
+        )).all(), limit)
+        
+        # Film kartları katalog cache'ten hazır JSON olarak (film başına sorgu / encode yok)
+        catalog = await get_genre_catalog_async()
         watchlist_movies = []
-        for entry in watchlist_entries:
-            extra_data = json.loads(entry.extra_data) if entry.extra_data else {}
-            entry_status = extra_data.get("status", "to_watch")
-            
-            if status_filter != "all" and entry_status != status_filter:
-                continue
-            
-            if entry_status == "removed":
-                continue
-                
-            movie = db.query(Movie).filter(Movie.id == entry.movie_id).first()
-            if movie:
-                watchlist_movies.append({
-                    "movie_id": movie.movie_id,
-                    "title": movie.title,
-                    "release_date": movie.release_date,
-                    "avg_rating": movie.avg_rating,
-                    "popularity": movie.rating_count,
-                    "genres": json.loads(movie.genres) if movie.genres else [],
-                    "imdb_url": movie.imdb_url,
-                    "watchlist_status": entry_status,
-                    "added_to_watchlist": entry.created_at.isoformat()
-                })
-        
-        watchlist_movies.sort(key=lambda x: x['added_to_watchlist'], reverse=True)
-        
-        return {
+        for entry_id, movie_db_id, created_at, status_value in entries:
+            row = catalog.row_for_db_id(movie_db_id)
+            if row is not None:
+                watchlist_movies.append(with_fields(catalog.card_fragment(row), {
+                    "watchlist_status": status_value,
+                    "added_to_watchlist": created_at.isoformat()
+                }))
+        
+        return PreEncodedJSONResponse({
             "status": "success",
             "filter": status_filter,
             "count": len(watchlist_movies),
-            "watchlist": watchlist_movies
-        }
+            "watchlist": json_array(watchlist_movies),
+            "next_cursor": encode_time_cursor(entries[-1].created_at, entries[-1].id) if has_more else None
+        })
         
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -514,17 +590,21 @@ async def get_my_watchlist(
 @app.get("/user-stats")
 async def get_user_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Kullanıcının istatistiklerini getir"""
     try:
-        ratings_count = db.query(Rating).filter(Rating.user_id == current_user.id).count()
-        favorites_count = db.query(Favorite).filter(Favorite.user_id == current_user.id).count()
+        ratings_count = await db.scalar(
+            select(func.count()).select_from(Rating).where(Rating.user_id == current_user.id)
+        )
+        favorites_count = await db.scalar(
+            select(func.count()).select_from(Favorite).where(Favorite.user_id == current_user.id)
+        )
         
-        watchlist_entries = db.query(UserActivity).filter(
+        watchlist_entries = (await db.scalars(select(UserActivity).where(
             UserActivity.user_id == current_user.id,
             UserActivity.activity_type == "watchlist"
-        ).all()
+        ))).all()
         
         to_watch_count = 0
         watched_count = 0
@@ -568,11 +648,11 @@ async def get_user_stats(
 async def get_favorites_based_recommendations(
     n_recommendations: int = 10,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Favori filmlere dayalı basit öneriler"""
     try:
-        favorites = db.query(Favorite).filter(Favorite.user_id == current_user.id).all()
+        favorites = (await db.scalars(select(Favorite).where(Favorite.user_id == current_user.id))).all()
         
         if not favorites:
             return {
@@ -581,52 +661,29 @@ async def get_favorites_based_recommendations(
                 "recommendations": []
             }
         
-        # Basit öneri: Favori filmlerin türlerini al ve o türlerden öneriler yap
-        favorite_genres = set()
-        for favorite in favorites:
-            movie = db.query(Movie).filter(Movie.id == favorite.movie_id).first()
-            if movie and movie.genres:
-                try:
-                    genres = json.loads(movie.genres)
-                    favorite_genres.update(genres)
-                except:
-                    continue
+        # Basit öneri: Favori filmlerin türleri -> inverted index posting'leri (izlenenler hariç)
+        catalog = await get_genre_catalog_async()
+        favorite_mask = catalog.union_mask(catalog.rows_for_db_ids(f.movie_id for f in favorites))
+        favorite_genre_count = favorite_mask.bit_count()
         
-        # O türlerden başka filmler öner
         recommended_movies = []
-        if favorite_genres:
-            all_movies = db.query(Movie).filter(
-                Movie.genres.isnot(None)
-            ).limit(100).all()
-            
-            for movie in all_movies:
-                if movie.genres:
-                    try:
-                        movie_genres = set(json.loads(movie.genres))
-                        if favorite_genres.intersection(movie_genres):
-                            recommended_movies.append({
-                                "movie_id": movie.movie_id,
-                                "title": movie.title,
-                                "release_date": movie.release_date,
-                                "avg_rating": movie.avg_rating or 0,
-                                "popularity": movie.rating_count or 0,
-                                "genres": list(movie_genres),
-                                "imdb_url": movie.imdb_url,
-                                "similarity_score": len(favorite_genres.intersection(movie_genres)) / len(favorite_genres)
-                            })
-                    except:
-                        continue
-        
-        # Benzerlik skoruna göre sırala
-        recommended_movies.sort(key=lambda x: x['similarity_score'], reverse=True)
-        
-        return {
+        if favorite_mask:
+            rows, common = catalog.genre_matches(favorite_mask, await _seen_rows(catalog, db, current_user.id))
+            rows, scores = catalog.rank_rows(rows, common / favorite_genre_count, n_recommendations)
+            for row, score in zip(rows, scores):
+                recommended_movies.append(with_fields(
+                    catalog.card_fragment(row), {"similarity_score": float(score)}
+                ))
+        
+        return PreEncodedJSONResponse({
             "status": "success",
             "favorite_count": len(favorites),
-            "method": f"BASIT FAVORİ BAZLI ÖNERİLER ({len(favorite_genres)} tür)",
-            "recommendations": recommended_movies[:n_recommendations]
-        }
+            "method": f"BASIT FAVORİ BAZLI ÖNERİLER ({favorite_genre_count} tür)",
+            "recommendations": json_array(recommended_movies)
+        })
         
+    except ExecutorBusy:
+        raise
     except Exception as e:
         print(f"Favorites recommendations error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -634,62 +691,66 @@ async def get_favorites_based_recommendations(
 @app.get("/similar-movies/{movie_id}")
 async def get_similar_movies(
     movie_id: int,
+    request: Request,
+    response: Response,
     n_recommendations: int = 8,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Belirli bir filme benzer filmler - Basit versiyon"""
+    """Belirli bir filme benzer filmler (önceden hesaplanmış top-K tablo, yoksa tür bazlı)"""
     try:
+        # Sonuç kullanıcıya değil katalog + benzerlik tablosu versiyonuna bağlı
+        catalog = await get_genre_catalog_async()
+        etag = make_etag('similar', catalog.content_version, similar_index.version, movie_id, n_recommendations)
+        cached = not_modified(request, etag, PRIVATE_CATALOG_CACHE)
+        if cached is not None:
+            return cached
+        
         # Ana filmi bul
-        base_movie = db.query(Movie).filter(Movie.movie_id == movie_id).first()
-        if not base_movie:
+        base_row = catalog.row_for_movie_id(movie_id)
+        if base_row is None:
             raise HTTPException(status_code=404, detail="Film bulunamadı")
+        set_cache_headers(response, etag, PRIVATE_CATALOG_CACHE)
         
-        base_genres = set()
-        if base_movie.genres:
-            try:
-                base_genres = set(json.loads(base_movie.genres))
-            except:
-                pass
-        
-        # Benzer filmler bul
         similar_movies = []
-        if base_genres:
-            all_movies = db.query(Movie).filter(
-                Movie.movie_id != movie_id,
-                Movie.genres.isnot(None)
-            ).limit(100).all()
+        
+        # 🔗 Offline tablo (similar_movies.py): tek satır okuma
+        neighbours = similar_index.lookup(movie_id, n_recommendations)
+        if neighbours is not None:
+            for similar_id, score in neighbours:
+                row = catalog.row_for_movie_id(similar_id)
+                if row is None:
+                    continue
+                card = catalog.movie_card(row)
+                card["similarity_score"] = round(score, 4)
+                similar_movies.append(card)
             
-            for movie in all_movies:
-                if movie.genres:
-                    try:
-                        movie_genres = set(json.loads(movie.genres))
-                        common_genres = base_genres.intersection(movie_genres)
-                        if common_genres:
-                            similarity = len(common_genres) / len(base_genres)
-                            similar_movies.append({
-                                "movie_id": movie.movie_id,
-                                "title": movie.title,
-                                "release_date": movie.release_date,
-                                "avg_rating": movie.avg_rating or 0,
-                                "popularity": movie.rating_count or 0,
-                                "genres": list(movie_genres),
-                                "imdb_url": movie.imdb_url,
-                                "similarity_score": similarity
-                            })
-                    except:
-                        continue
-        
-        # Benzerlik skoruna göre sırala
-        similar_movies.sort(key=lambda x: x['similarity_score'], reverse=True)
+            return {
+                "status": "success",
+                "base_movie_id": movie_id,
+                "method": "ÖNCEDEN HESAPLANMIŞ BENZERLİK (içerik + item-CF + birlikte beğenilme)",
+                "recommendations": similar_movies
+            }
+        
+        # Fallback: ortak tür sayısı / ana filmin tür sayısı
+        base_mask = int(catalog.masks[base_row])
+        if base_mask:
+            scores = match_fraction(catalog.masks, base_mask)
+            scores[base_row] = 0.0
+            for row in catalog.top_rows(scores, n_recommendations):
+                card = catalog.movie_card(row)
+                card["similarity_score"] = float(scores[row])
+                similar_movies.append(card)
         
         return {
             "status": "success",
             "base_movie_id": movie_id,
             "method": "BASIT TÜR BAZLI BENZERLİK",
-            "recommendations": similar_movies[:n_recommendations]
+            "recommendations": similar_movies
         }
         
+    except (HTTPException, ExecutorBusy):
+        raise
     except Exception as e:
         print(f"Similar movies error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -698,12 +759,14 @@ async def get_similar_movies(
 async def update_genre_preferences(
     genre_request: GenreRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Kullanıcının tür tercihlerini güncelle"""
     try:
-        current_user.favorite_genres = json.dumps(genre_request.genres)
-        db.commit()
+        user = await db.get(User, current_user.id)
+        user.favorite_genres = json.dumps(genre_request.genres)
+        await db.commit()
+        auth_cache.invalidate_user(user.username)
         
         return {
             "status": "success",
@@ -719,14 +782,14 @@ async def update_genre_preferences(
 async def get_advanced_recommendations(
     request: AdvancedRecommendationRequest,  # dict yerine Pydantic model
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)):
+    db: AsyncSession = Depends(get_async_db)):
     """Gelişmiş hibrit öneriler"""
     try:
         # request.n_recommendations kullanın (request['n_recommendations'] yerine)
         n_recommendations = request.n_recommendations
         
         # Kullanıcının puanladığı filmler
-        user_ratings = db.query(Rating).filter(Rating.user_id == current_user.id).all()
+        user_ratings = (await db.scalars(select(Rating).where(Rating.user_id == current_user.id))).all()
         
         if len(user_ratings) < 3:
             return {
@@ -735,63 +798,34 @@ async def get_advanced_recommendations(
                 "recommendations": []
             }
         
-        # Yüksek puan verdiği filmlerden türleri topla
-        liked_genres = set()
-        for rating in user_ratings:
-            if rating.rating >= 4.0:  # Beğendiği filmler
-                movie = db.query(Movie).filter(Movie.id == rating.movie_id).first()
-                if movie and movie.genres:
-                    try:
-                        genres = json.loads(movie.genres)
-                        liked_genres.update(genres)
-                    except:
-                        continue
-        
-        # O türlerden öneriler
+        # Yüksek puan verdiği filmlerin türleri (bitmask birleşimi)
+        catalog = await get_genre_catalog_async()
+        liked_rows = catalog.rows_for_db_ids(r.movie_id for r in user_ratings if r.rating >= 4.0)
+        liked_mask = catalog.union_mask(liked_rows)
+        
+        # O türlerden öneriler (posting listeleri; zaten puanladığı/favori filmler hariç)
         recommendations = []
-        if liked_genres:
-            all_movies = db.query(Movie).filter(Movie.genres.isnot(None)).limit(200).all()
+        if liked_mask:
+            rows, common = catalog.genre_matches(liked_mask, await _seen_rows(catalog, db, current_user.id))
+            # Popülerlik bonusu
+            scores = common / liked_mask.bit_count() \
+                + 0.1 * (catalog.rating_count[rows] > 50) + 0.2 * (catalog.avg_rating[rows] > 7.0)
+            rows, scores = catalog.rank_rows(rows, np.round(scores, 3), n_recommendations)
             
-            for movie in all_movies:
-                # Zaten puanladığı filmleri atla
-                if any(r.movie_id == movie.id for r in user_ratings):
-                    continue
-                    
-                if movie.genres:
-                    try:
-                        movie_genres = set(json.loads(movie.genres))
-                        common = liked_genres.intersection(movie_genres)
-                        if common:
-                            score = len(common) / len(liked_genres)
-                            # Popülerlik bonusu ekle
-                            if movie.rating_count and movie.rating_count > 50:
-                                score += 0.1
-                            if movie.avg_rating and movie.avg_rating > 7.0:
-                                score += 0.2
-                                
-                            recommendations.append({
-                                "movie_id": movie.movie_id,
-                                "title": movie.title,
-                                "release_date": movie.release_date,
-                                "avg_rating": movie.avg_rating or 0,
-                                "popularity": movie.rating_count or 0,
-                                "genres": list(movie_genres),
-                                "imdb_url": movie.imdb_url,
-                                "hybrid_score": round(score, 3)
-                            })
-                    except:
-                        continue
-        
-        # Skora göre sırala
-        recommendations.sort(key=lambda x: x['hybrid_score'], reverse=True)
+            for row, score in zip(rows, scores):
+                card = catalog.movie_card(row)
+                card["hybrid_score"] = float(score)
+                recommendations.append(card)
         
         return {
             "status": "success",
             "method": "BASİT HİBRİT ÖNERİLER (Rating + Genre)",
             "user_rating_count": len(user_ratings),
-            "recommendations": recommendations[:n_recommendations]
+            "recommendations": recommendations
         }
         
+    except ExecutorBusy:
+        raise
     except Exception as e:
         print(f"Advanced recommendations error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -811,7 +845,7 @@ async def root():
 @app.post("/ml/train")
 async def train_ml_model(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """ML modelini database verisiyle train et"""
     try:
@@ -820,7 +854,8 @@ async def train_ml_model(
             # Eğer admin yoksa, herhangi bir kullanıcı train edebilir (geliştirme için)
             pass
             
-        success = ml_service.train_from_database(db)
+        # Eğitim DB okuma + CPU: sync session ile CPU executor'da
+        success = await run_cpu(_with_sync_session, ml_service.train_from_database)
         
         if success:
             return {
@@ -835,6 +870,8 @@ async def train_ml_model(
                 "ml_status": ml_service.get_status()
             }
             
+    except ExecutorBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"ML Training hatası: {str(e)}")
 
@@ -842,7 +879,7 @@ async def train_ml_model(
 async def get_ml_recommendations(
     n_recommendations: int = 10,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """ML bazlı kişiselleştirilmiş öneriler"""
     try:
@@ -854,9 +891,9 @@ async def get_ml_recommendations(
                 "ml_status": ml_service.get_status()
             }
         
-        recommendations = ml_service.get_recommendations(
+        recommendations = await run_cpu(
+            _with_sync_session, ml_service.get_recommendations,
             user_id=current_user.id,
-            db=db,
             n_recommendations=n_recommendations
         )
         
@@ -869,6 +906,8 @@ async def get_ml_recommendations(
             "ml_status": ml_service.get_status()
         }
         
+    except ExecutorBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"ML Recommendations hatası: {str(e)}")
 
@@ -876,7 +915,7 @@ async def get_ml_recommendations(
 async def predict_movie_rating(
     movie_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Kullanıcının bir filme vereceği puanı ML ile tahmin et"""
     try:
@@ -884,24 +923,22 @@ async def predict_movie_rating(
             raise HTTPException(status_code=400, detail="ML modeli henüz hazır değil!")
         
         # Movie'yi bul (external movie_id ile)
-        movie = db.query(Movie).filter(Movie.movie_id == movie_id).first()
-        if not movie:
-            raise HTTPException(status_code=404, detail="Film bulunamadı")
+        movie_db_id, movie = await _resolve_movie(movie_id)
         
         # ML ile tahmin yap (internal ID kullan)
-        predicted_rating = ml_service.predict_rating(current_user.id, movie.id)
+        predicted_rating = await run_cpu(ml_service.predict_rating, current_user.id, movie_db_id)
         
         return {
             "status": "success",
             "user_id": current_user.id,
             "movie_id": movie_id,
-            "movie_title": movie.title,
+            "movie_title": movie['title'],
             "predicted_rating": predicted_rating,
             "confidence": min(predicted_rating / 5.0, 1.0),
             "method": "🤖 ML Collaborative Filtering"
         }
         
-    except HTTPException:
+    except (HTTPException, ExecutorBusy):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Puan tahmini hatası: {str(e)}")
@@ -911,7 +948,7 @@ async def predict_movie_rating(
 async def get_genre_based_recommendations(
     request: GenreBasedRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)):
+    db: AsyncSession = Depends(get_async_db)):
     """Tür bazlı öneriler"""
     try:
         genres = request.genres
@@ -924,50 +961,33 @@ async def get_genre_based_recommendations(
                 "recommendations": []
             }
         
-        # Tür bazlı filmler bul
-        recommended_movies = []
-        all_movies = db.query(Movie).filter(Movie.genres.isnot(None)).limit(200).all()
-        
-        for movie in all_movies:
-            if movie.genres:
-                try:
-                    movie_genres = set(json.loads(movie.genres))
-                    selected_genres = set(genres)
-                    
-                    # Ortak türler var mı?
-                    common_genres = selected_genres.intersection(movie_genres)
-                    if common_genres:
-                        score = len(common_genres) / len(selected_genres)
-                        
-                        # Popülerlik bonusu
-                        if movie.rating_count and movie.rating_count > 20:
-                            score += 0.1
-                        if movie.avg_rating and movie.avg_rating > 7.0:
-                            score += 0.2
-                        
-                        recommended_movies.append({
-                            "movie_id": movie.movie_id,
-                            "title": movie.title,
-                            "release_date": movie.release_date,
-                            "avg_rating": movie.avg_rating or 0,
-                            "popularity": movie.rating_count or 0,
-                            "genres": list(movie_genres),
-                            "imdb_url": movie.imdb_url,
-                            "genre_match_score": round(score, 3)
-                        })
-                except:
-                    continue
+        # Tür bazlı filmler bul: posting listeleri, izlenenler hariç
+        # (katalogda olmayan türler paydada kalır)
+        catalog = await get_genre_catalog_async()
+        selected_genres = set(genres)
+        rows, common = catalog.genre_matches(catalog.registry.mask(selected_genres),
+                                             await _seen_rows(catalog, db, current_user.id))
+        
+        # Popülerlik bonusu
+        scores = common / len(selected_genres) \
+            + 0.1 * (catalog.rating_count[rows] > 20) + 0.2 * (catalog.avg_rating[rows] > 7.0)
+        rows, scores = catalog.rank_rows(rows, np.round(scores, 3), n_recommendations)
         
-        # Skora göre sırala
-        recommended_movies.sort(key=lambda x: x['genre_match_score'], reverse=True)
+        recommended_movies = []
+        for row, score in zip(rows, scores):
+            card = catalog.movie_card(row)
+            card["genre_match_score"] = float(score)
+            recommended_movies.append(card)
         
         return {
             "status": "success",
             "selected_genres": genres,
             "method": f"TÜR BAZLI ÖNERİLER ({len(genres)} tür seçili)",
-            "recommendations": recommended_movies[:n_recommendations]
+            "recommendations": recommended_movies
         }
         
+    except ExecutorBusy:
+        raise
     except Exception as e:
         print(f"Genre-based recommendations error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,15 +1,21 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Dict, List, Optional
 import pandas as pd
 import numpy as np
+import os
+
+from http_cache import make_etag, not_modified, set_cache_headers
 
 # Önceki kodları kopyala...
+DATA_FILES = ('user_movie_matrix.pkl', 'ml-100k/u.item')
 user_movie_matrix = pd.read_pickle('user_movie_matrix.pkl')
 movies = pd.read_csv('ml-100k/u.item', sep='|', encoding='latin1',
                     names=['movie_id', 'title', 'release_date', 'video_release_date',
                            'imdb_url'] + [f'genre_{i}' for i in range(19)])
+# Veri import'ta bir kez yüklenir: katalog versiyonu = yüklenen dosyaların mtime'ları (ETag parçası)
+DATA_VERSION = tuple(os.path.getmtime(path) for path in DATA_FILES)
 
 def get_popular_movies(n_movies=15):
     movie_stats = []
@@ -86,9 +92,15 @@ async def root():
 
 # 🆕 YENİ: Film Arama
 @app.get("/search")
-async def search_movies(q: str = Query(..., description="Arama terimi")):
+async def search_movies(request: Request, response: Response, q: str = Query(..., description="Arama terimi")):
     """Film arama endpoint'i"""
     try:
+        etag = make_etag('search', *DATA_VERSION, q)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        set_cache_headers(response, etag)
+        
         # Basit string arama
         search_results = movies[
             movies['title'].str.contains(q, case=False, na=False)
@@ -123,13 +135,19 @@ async def search_movies(q: str = Query(..., description="Arama terimi")):
 
 # 🆕 YENİ: Film Detayı
 @app.get("/movie/{movie_id}")
-async def get_movie_details(movie_id: int):
+async def get_movie_details(movie_id: int, request: Request, response: Response):
     """Belirli bir filmin detaylarını getir"""
     try:
+        etag = make_etag('movie', *DATA_VERSION, movie_id)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        
         movie = movies[movies['movie_id'] == movie_id]
         
         if movie.empty:
             raise HTTPException(status_code=404, detail="Film bulunamadı")
+        set_cache_headers(response, etag)
         
         movie_data = movie.iloc[0]
         
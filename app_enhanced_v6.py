@@ -1,19 +1,35 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Request, Header
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Dict, Optional
-import sqlite3
 import pandas as pd
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import asyncio
 import logging
+import os
+import time
 
 from enhanced_hybrid_recommender_v6 import EnhancedRecommendationAPI
 from database_fixed import DatabaseManager
+from request_tracing import tracer, span, set_trace_attribute, FORCE_TRACE_HEADER
+from sampling_profiler import profiler, ProfilerBusyError, to_collapsed, top_functions
+from prometheus_metrics import install_metrics, instrument_sqlalchemy, db_timer
+from async_database import async_engine, fetch_all, fetch_scalar
+from executors import ExecutorBusy, cpu_executor, executor_stats, install_busy_handler, run_blocking, run_cpu
+from admission_control import AdmissionController, install_admission_control, is_degraded
+from json_fragments import FragmentCache, PreEncodedJSONResponse, dumps, json_array, with_fields
+from analytics_counters import ensure_tables, run_compactor
+from readiness import ReadinessMonitor
+from sqlite_pool import pool_stats
+from jobs import JOB_RETRY_AFTER_SECONDS, JobQueueFull, JobRunner
+from exports import (EXPORT_ALGORITHMS, EXPORT_BLOCK_USERS, EXPORT_MEDIA_TYPES, RATING_COLUMNS,
+                     RECOMMENDATION_COLUMNS, LineEncoder, iter_rating_blocks, iter_recommendation_blocks,
+                     stream_lines_async)
+from pagination import InvalidCursor, RankedListCache, decode_cursor, encode_cursor, page_limit
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -35,9 +51,75 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 📊 PROMETHEUS /metrics (+ async engine sorgu süreleri)
+install_metrics(app)
+# Executor slotları doluysa (ExecutorBusy) 503 + Retry-After
+install_busy_handler(app)
+instrument_sqlalchemy(async_engine.sync_engine)
+
+# 🔐 ADMIN GUARD (ADMIN_TOKEN env yoksa admin endpoint'leri kapalı)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+def is_admin_token(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token == ADMIN_TOKEN
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set ADMIN_TOKEN)")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+# 🔍 REQUEST TRACING (sampled, Server-Timing header)
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    # Zorla örnekleme yalnızca admin için: herkese açık olsa sampling rate'i aşmanın yolu olur
+    force = (request.headers.get(FORCE_TRACE_HEADER) == "1"
+             and is_admin_token(request.headers.get("x-admin-token")))
+    trace, token = tracer.start(f"{request.method} {request.url.path}", force=force)
+    if trace is None:
+        return await call_next(request)
+    
+    try:
+        response = await call_next(request)
+    finally:
+        tracer.finish(trace, token)
+    
+    response.headers["Server-Timing"] = trace.server_timing()
+    response.headers["X-Trace-Id"] = trace.trace_id
+    return response
+
+# 🚦 ADMISSION CONTROL (en dıştaki middleware: reddedilen istek hiç iş başlatmaz)
+admission = AdmissionController([cpu_executor])
+install_admission_control(app, admission)
+
 # Initialize components
 db_manager = DatabaseManager()
 recommendation_api = EnhancedRecommendationAPI()
+job_runner = JobRunner()
+# Sayfalanan öneri listeleri: 2. sayfa hybrid'i yeniden hesaplamaz
+ranked_lists = RankedListCache('v6_recommendation_pages')
+
+ANALYTICS_WINDOW_DAYS = 7
+
+# 📈 Analytics sayaç tabloları: arka planda periyodik compactor
+@app.on_event("startup")
+async def start_analytics_compactor():
+    await run_blocking(ensure_tables)
+    app.state.analytics_compactor = asyncio.create_task(run_compactor())
+
+# 🗂️ Job tablosu + heartbeat (sahibi ölmüş işler başka bir process tarafından toplanır)
+@app.on_event("startup")
+async def start_job_runner():
+    await job_runner.start()
+    app.state.job_heartbeat = asyncio.create_task(job_runner.run())
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    for name in ('analytics_compactor', 'readiness_monitor', 'job_heartbeat'):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+    job_runner.shutdown()
 
 # Pydantic models
 class UserRegistration(BaseModel):
@@ -75,7 +157,8 @@ async def serve_frontend():
 async def register_user(user_data: UserRegistration):
     """Enhanced user registration with preferences"""
     try:
-        result = db_manager.create_user(
+        result = await run_blocking(
+            db_manager.create_user,
             username=user_data.username,
             email=user_data.email,
             password=user_data.password,
@@ -94,6 +177,8 @@ async def register_user(user_data: UserRegistration):
         else:
             raise HTTPException(status_code=400, detail="Registration failed")
             
+    except ExecutorBusy:
+        raise
     except Exception as e:
         logger.error(f"❌ Registration error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -102,7 +187,7 @@ async def register_user(user_data: UserRegistration):
 async def login_user(login_data: UserLogin):
     """Enhanced user login with session management"""
     try:
-        user = db_manager.authenticate_user(login_data.username, login_data.password)
+        user = await run_blocking(db_manager.authenticate_user, login_data.username, login_data.password)
         
         if user:
             # Generate session token (simplified)
@@ -118,6 +203,8 @@ async def login_user(login_data: UserLogin):
         else:
             raise HTTPException(status_code=401, detail="Invalid credentials")
             
+    except ExecutorBusy:
+        raise
     except Exception as e:
         logger.error(f"❌ Login error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -126,8 +213,12 @@ async def login_user(login_data: UserLogin):
 @app.get("/enhanced-recommendations/{user_id}")
 async def get_enhanced_recommendations(
     user_id: int, 
+    request: Request,
     n_recommendations: int = 10,
-    algorithm: str = "hybrid"
+    algorithm: str = "hybrid",
+    deadline_ms: Optional[float] = None,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None
 ):
     """
     🚀 Get Enhanced Hybrid Recommendations
@@ -138,95 +229,275 @@ async def get_enhanced_recommendations(
     - content_based: Content-based only  
     - matrix_factorization: SVD-based
     - popularity: Popularity-based
+    
+    deadline_ms (hybrid): latency budget; components that miss their share
+    are dropped and reported in `components`.
+    
+    Under load (admission control) the precomputed cohort/global popularity
+    list is served instead, marked with "degraded": true.
+    
+    page_size: return the n_recommendations ranked list in pages; the list
+    is kept for the session and `next_cursor` pages through that snapshot
+    without recomputing it (410 once the session has expired).
     """
     try:
-        if algorithm == "hybrid":
-            recommendations = await recommendation_api.get_hybrid_recommendations(
-                user_id, n_recommendations
-            )
-        else:
-            # Initialize if needed
-            await recommendation_api.initialize()
-            
-            # Get specific algorithm recommendations
-            if algorithm == "collaborative_filtering":
-                recs = recommendation_api.recommender.collaborative_filtering_recommendations(
-                    user_id, n_recommendations
-                )
-            elif algorithm == "content_based":
-                recs = recommendation_api.recommender.content_based_recommendations(
-                    user_id, n_recommendations
-                )
-            elif algorithm == "matrix_factorization":
-                recs = recommendation_api.recommender.matrix_factorization_recommendations(
-                    user_id, n_recommendations
+        if deadline_ms is not None and deadline_ms <= 0:
+            raise HTTPException(status_code=400, detail="deadline_ms must be positive")
+        # Bütçe istek geldiği anda başlar (executor kuyruğu da dahil)
+        deadline = time.monotonic() + deadline_ms / 1000.0 if deadline_ms else None
+        
+        recommender = recommendation_api.recommender
+        algorithm_methods = {
+            "collaborative_filtering": recommender.collaborative_filtering_recommendations,
+            "content_based": recommender.content_based_recommendations,
+            "matrix_factorization": recommender.matrix_factorization_recommendations,
+            "popularity": recommender.popularity_based_recommendations,
+        }
+        if algorithm != "hybrid" and algorithm not in algorithm_methods:
+            raise HTTPException(status_code=400, detail="Unknown algorithm")
+        
+        # Sonraki sayfalar: saklanan sıralamadan dilim (hesaplama yok, yük altında da)
+        page_owner = (user_id, algorithm, n_recommendations)
+        if cursor is not None:
+            session_id, offset, cursor_page_size = _decode_page_cursor(cursor)
+            ranked = ranked_lists.get(session_id, page_owner)
+            if ranked is None:
+                raise HTTPException(status_code=410, detail="Cursor expired, request the first page again")
+            return _recommendation_page(user_id, algorithm, ranked, session_id, offset,
+                                        page_limit(page_size or cursor_page_size))
+        
+        if is_degraded(request):
+            return _degraded_recommendations(user_id, algorithm, n_recommendations)
+        
+        async def compute():
+            if algorithm == "hybrid":
+                return await recommendation_api.get_hybrid_recommendations_with_report(
+                    user_id, n_recommendations, deadline
                 )
-            elif algorithm == "popularity":
-                recs = recommendation_api.recommender.popularity_based_recommendations(
-                    user_id, n_recommendations
+            
+            # Get specific algorithm recommendations (CPU executor, initializes if needed)
+            with span(algorithm):
+                recs = await recommendation_api.run_algorithm(
+                    algorithm_methods[algorithm], user_id, n_recommendations
                 )
-            else:
-                raise HTTPException(status_code=400, detail="Unknown algorithm")
             
             # Convert to standard format
-            recommendations = []
-            for movie_id, score in recs:
-                try:
-                    movie_info = recommendation_api.recommender.movies_df[
-                        recommendation_api.recommender.movies_df['movie_id'] == movie_id
-                    ].iloc[0]
-                    
-                    recommendations.append({
-                        'movie_id': int(movie_id),
-                        'title': movie_info['title'],
-                        'genres': movie_info['genres'],
-                        'release_date': movie_info['release_date'],
-                        'avg_rating': float(movie_info['avg_rating']),
-                        'popularity': int(movie_info['popularity']),
-                        'hybrid_score': float(score),
-                        'recommendation_method': f'{algorithm.title()} Algorithm'
-                    })
-                except (IndexError, KeyError):
-                    continue
+            with span('movie_info'):
+                return _format_algorithm_results(recs, algorithm), None
+        
+        # Aynı anda gelen özdeş istekler (retry, çoklu sekme) tek hesaplamayı bekler
+        try:
+            recommendations, report = await recommendation_api.coalesce_recommendations(
+                user_id, algorithm, n_recommendations, compute, deadline_ms
+            )
+        except ExecutorBusy:
+            # CPU executor dolu: admission degrade ile aynı hazır liste
+            return _degraded_recommendations(user_id, algorithm, n_recommendations)
         
         logger.info(f"✅ Generated {len(recommendations)} {algorithm} recommendations for user {user_id}")
+        set_trace_attribute('algorithm', algorithm)
+        set_trace_attribute('count', len(recommendations))
         
-        return {
+        if page_size is not None:
+            session_id = ranked_lists.put(page_owner, recommendations)
+            return _recommendation_page(user_id, algorithm, recommendations, session_id, 0,
+                                        page_limit(page_size), report, deadline_ms)
+        
+        with span('serialize'):
+            body = {
+                "status": "success",
+                "algorithm": algorithm,
+                "user_id": user_id,
+                "count": len(recommendations),
+                "recommendations": _encode_recommendations(recommendations),
+                "system_version": "Enhanced Hybrid v6.0"
+            }
+            if report is not None:
+                body["components"] = {
+                    "used": report['components_used'],
+                    "dropped": report['components_dropped'],
+                    "deadline_ms": deadline_ms
+                }
+            return PreEncodedJSONResponse(body)
+        
+    except HTTPException:
+        raise
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Recommendation error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _decode_page_cursor(cursor: str):
+    session_id, offset, page_size = decode_cursor(cursor, 3)
+    if not (isinstance(session_id, str) and isinstance(offset, int) and isinstance(page_size, int)) or offset < 0:
+        raise InvalidCursor("Malformed cursor")
+    return session_id, offset, page_size
+
+def _recommendation_page(user_id: int, algorithm: str, ranked: List[Dict], session_id: str, offset: int,
+                         page_size: int, report: Optional[Dict] = None, deadline_ms: Optional[float] = None):
+    """Saklanan sıralamadan bir sayfa (+ varsa sonraki sayfanın cursor'ı)"""
+    page = ranked[offset:offset + page_size]
+    next_offset = offset + page_size
+    with span('serialize'):
+        body = {
             "status": "success",
             "algorithm": algorithm,
             "user_id": user_id,
-            "count": len(recommendations),
-            "recommendations": recommendations,
+            "count": len(page),
+            "total": len(ranked),
+            "recommendations": _encode_recommendations(page),
+            "next_cursor": encode_cursor([session_id, next_offset, page_size]) if next_offset < len(ranked) else None,
             "system_version": "Enhanced Hybrid v6.0"
         }
-        
-    except Exception as e:
-        logger.error(f"❌ Recommendation error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        if report is not None:
+            body["components"] = {
+                "used": report['components_used'],
+                "dropped": report['components_dropped'],
+                "deadline_ms": deadline_ms
+            }
+        return PreEncodedJSONResponse(body)
+
+def _degraded_recommendations(user_id: int, algorithm: str, n_recommendations: int):
+    """Yük altında: hazır popülerlik listesi (executor'a iş gönderilmez)"""
+    if not recommendation_api.is_initialized:
+        # Model yüklemek tam da yükü artıracak iş; istemci sonra denesin
+        raise HTTPException(status_code=503, detail="Server overloaded, please retry",
+                            headers={"Retry-After": "1"})
+    
+    recommendations = recommendation_api.recommender.fallback_recommendations(user_id, n_recommendations)
+    set_trace_attribute('algorithm', algorithm)
+    set_trace_attribute('degraded', True)
+    return PreEncodedJSONResponse({
+        "status": "success",
+        "algorithm": algorithm,
+        "user_id": user_id,
+        "count": len(recommendations),
+        "recommendations": _encode_recommendations(recommendations),
+        "degraded": True,
+        "system_version": "Enhanced Hybrid v6.0"
+    })
+
+# Model versiyonu başına encode edilmiş film kartları
+_card_fragments = FragmentCache('v6_movie_cards')
+
+def _encode_recommendations(recommendations: List[Dict]):
+    """Kart alanları hazır JSON fragment'ından, geri kalanı (skorlar) hızlı encoder ile"""
+    recommender = recommendation_api.recommender
+    fragments = []
+    for rec in recommendations:
+        movie_id = int(rec['movie_id'])
+        card = recommender.movie_cards.get(movie_id)
+        if card is None:
+            fragments.append(dumps(rec))
+            continue
+        fragment = _card_fragments.get(recommender.model_version, movie_id, lambda: card)
+        fragments.append(with_fields(fragment, {k: v for k, v in rec.items() if k not in card}))
+    return json_array(fragments)
+
+def _format_algorithm_results(recs, algorithm: str) -> List[Dict]:
+    """Single-algorithm (movie_id, score) tuples -> response dicts"""
+    recommendations = []
+    for movie_id, score in recs:
+        # Hazır film kartı (movies_df filtrelemesi yok)
+        card = recommendation_api.recommender.movie_card(movie_id)
+        if card is None:
+            continue
+        
+        recommendations.append({
+            'movie_id': card['movie_id'],
+            'title': card['title'],
+            'genres': card['genres'],
+            'release_date': card['release_date'],
+            'avg_rating': card['avg_rating'],
+            'popularity': card['popularity'],
+            'hybrid_score': float(score),
+            'recommendation_method': f'{algorithm.title()} Algorithm'
+        })
+    return recommendations
 
 # 🧪 A/B TESTING ENDPOINT
-@app.post("/ab-test")
+@app.post("/ab-test", status_code=202)
 async def run_ab_test(request: ABTestRequest):
     """
     🧪 Run A/B Testing Between Algorithms
+    
+    Runs as a background job; poll /jobs/{job_id} for progress and results.
     """
+    return await _submit_job('ab_test', {'test_users': request.test_users})
+
+async def _submit_job(kind: str, params: Dict):
+    # Worker kendi modelini yükler: serving model'in güncel ağırlıklarıyla çalışsın
+    params = {**params, 'weights': dict(recommendation_api.recommender.algorithm_weights)}
     try:
-        results = await recommendation_api.run_ab_test(request.test_users)
-        
-        logger.info(f"✅ A/B test completed with {len(request.test_users)} users")
-        
-        return {
-            "status": "success",
-            "test_users_count": len(request.test_users),
-            "algorithms_tested": len(results),
-            "results": results,
-            "best_algorithm": max(results.keys(), key=lambda k: results[k]['f1_score']),
-            "timestamp": datetime.now().isoformat()
-        }
-        
+        job_id = await job_runner.submit(kind, params)
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Too many pending jobs, please retry later",
+                            headers={"Retry-After": str(JOB_RETRY_AFTER_SECONDS)})
+    except ExecutorBusy:
+        raise
     except Exception as e:
-        logger.error(f"❌ A/B test error: {e}")
+        logger.error(f"❌ Job submit error ({kind}): {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    
+    logger.info(f"🗂️ Job {job_id} ({kind}) queued")
+    return {
+        "status": "accepted",
+        "job_id": job_id,
+        "kind": kind,
+        "status_url": f"/jobs/{job_id}",
+        "timestamp": datetime.now().isoformat()
+    }
+
+# 🗂️ BACKGROUND JOBS
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status, progress and (when finished) result"""
+    job = await job_runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"status": "success", "job": job}
+
+@app.get("/jobs")
+async def list_jobs(limit: int = 20, kind: Optional[str] = None):
+    """Recent jobs without result bodies"""
+    limit = max(1, min(limit, 100))
+    return {"status": "success", "jobs": await job_runner.recent(limit, kind), "runner": job_runner.stats()}
+
+# 📤 STREAMING EXPORTS (NDJSON / CSV; bellek veri boyutundan bağımsız)
+def _export_response(name: str, fmt: str, body) -> StreamingResponse:
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[fmt], headers={
+        "Content-Disposition": f'attachment; filename="{name}.{fmt}"',
+        "X-Accel-Buffering": "no",  # Reverse proxy satırları biriktirmesin
+    })
+
+@app.get("/export/ratings", dependencies=[Depends(require_admin)])
+async def export_ratings(format: str = "ndjson"):
+    """All ratings, streamed from a server-side cursor block by block"""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    blocks = iter_rating_blocks(recommendation_api.recommender.db_path)
+    return _export_response("ratings", format,
+                            stream_lines_async(blocks, LineEncoder(format, RATING_COLUMNS), run_blocking))
+
+@app.get("/export/recommendations", dependencies=[Depends(require_admin)])
+async def export_recommendations(format: str = "ndjson", algorithm: str = "hybrid",
+                                 n_recommendations: int = 10, block_size: int = EXPORT_BLOCK_USERS):
+    """Recommendations for every user, computed block by block on the CPU executor"""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    if algorithm not in EXPORT_ALGORITHMS:
+        raise HTTPException(status_code=400, detail="Unknown algorithm")
+    n_recommendations = max(1, min(n_recommendations, 100))
+    block_size = max(1, min(block_size, 1000))
+    if not await recommendation_api.initialize():
+        raise HTTPException(status_code=503, detail="Recommendation system not initialized")
+    
+    blocks = iter_recommendation_blocks(recommendation_api.recommender, algorithm, n_recommendations,
+                                        block_users=block_size)
+    encoder = LineEncoder(format, RECOMMENDATION_COLUMNS)
+    return _export_response(f"recommendations_{algorithm}", format,
+                            stream_lines_async(blocks, encoder, recommendation_api.executor.run))
 
 # 📊 ANALYTICS DASHBOARD
 @app.get("/analytics")
@@ -237,39 +508,41 @@ async def get_system_analytics():
     try:
         analytics = await recommendation_api.get_performance_analytics()
         
-        # Add real-time statistics
-        conn = sqlite3.connect('movie_recommendation.db')
-        
-        # Recent activity
-        recent_ratings = pd.read_sql_query("""
-            SELECT COUNT(*) as count 
-            FROM ratings 
-            WHERE datetime(timestamp) > datetime('now', '-7 days')
-        """, conn)
-        
-        recent_users = pd.read_sql_query("""
-            SELECT COUNT(*) as count 
-            FROM users 
-            WHERE datetime(created_at) > datetime('now', '-7 days')
-        """, conn)
+        # Real-time statistics: analytics_counters.py'nin artımlı tablolarından
+        # (son 7 günlük satır + tür tablosu; ratings/users taranmaz). Pencere
+        # kayan 7x24 saat değil, bugün dahil 7 UTC takvim günü.
+        since = (datetime.utcnow().date() - timedelta(days=ANALYTICS_WINDOW_DAYS - 1)).isoformat()
+        with db_timer('analytics_recent_activity'):
+            recent = await fetch_all("""
+                SELECT COALESCE(SUM(ratings), 0) AS ratings,
+                       COALESCE(SUM(rerates), 0) AS rerates,
+                       COALESCE(SUM(new_users), 0) AS new_users
+                FROM analytics_daily
+                WHERE day >= :since
+            """, {'since': since})
         
         # Top genres
-        top_genres = pd.read_sql_query("""
-            SELECT genres, COUNT(*) as count
-            FROM movies m
-            JOIN ratings r ON m.movie_id = r.movie_id
-            GROUP BY genres
-            ORDER BY count DESC
-            LIMIT 10
-        """, conn)
-        
-        conn.close()
-        
+        with db_timer('analytics_top_genres'):
+            top_genres = await fetch_all("""
+                SELECT genre, ratings AS count
+                FROM analytics_genres
+                ORDER BY ratings DESC
+                LIMIT 10
+            """)
+        
+        with db_timer('analytics_watermarks'):
+            last_compacted = await fetch_scalar("SELECT MAX(updated_at) FROM analytics_watermarks")
+        
+        new_ratings, rerates = int(recent[0]['ratings']), int(recent[0]['rerates'])
         analytics['real_time_stats'] = {
-            'recent_ratings_7days': int(recent_ratings.iloc[0]['count']),
-            'new_users_7days': int(recent_users.iloc[0]['count']),
-            'top_genres': top_genres.to_dict('records'),
-            'last_updated': datetime.now().isoformat()
+            # Yeni rating + re-rate (eski sorgu güncellenen satırları da sayıyordu)
+            'recent_ratings_7days': new_ratings + rerates,
+            'new_ratings_7days': new_ratings,
+            'rerates_7days': rerates,
+            'new_users_7days': int(recent[0]['new_users']),
+            'window': {'days': ANALYTICS_WINDOW_DAYS, 'since_utc_date': since},
+            'top_genres': top_genres,
+            'last_updated': last_compacted
         }
         
         return {
@@ -278,6 +551,8 @@ async def get_system_analytics():
             "timestamp": datetime.now().isoformat()
         }
         
+    except ExecutorBusy:
+        raise
     except Exception as e:
         logger.error(f"❌ Analytics error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -296,13 +571,10 @@ async def evaluate_user_recommendations(user_id: int, n_recommendations: int = 1
             user_id, n_recommendations
         )
         
-        # Get user's actual ratings
-        user_ratings = recommendation_api.recommender.user_movie_matrix.loc[user_id].dropna().to_dict()
-        
-        # Evaluate
-        metrics = recommendation_api.recommender.evaluate_recommendations(
-            user_id, recommendations, user_ratings
-        )
+        # Get user's actual ratings + evaluate (CPU executor)
+        recommender = recommendation_api.recommender
+        user_ratings = await run_cpu(lambda: recommender.user_movie_matrix.loc[user_id].dropna().to_dict())
+        metrics = await run_cpu(recommender.evaluate_recommendations, user_id, recommendations, user_ratings)
         
         return {
             "status": "success",
@@ -320,33 +592,25 @@ async def evaluate_user_recommendations(user_id: int, n_recommendations: int = 1
             "recommendations": recommendations[:5]  # Sample recommendations
         }
         
+    except ExecutorBusy:
+        raise
     except Exception as e:
         logger.error(f"❌ Evaluation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # 🔄 ALGORITHM WEIGHT OPTIMIZATION
-@app.post("/optimize-weights")
+@app.post("/optimize-weights", status_code=202)
 async def optimize_algorithm_weights(test_users: List[int]):
     """
     🎯 Optimize Algorithm Weights Dynamically
+    
+    Runs as a background job; the serving model switches to the new
+    weights when it succeeds (see /jobs/{job_id}).
     """
-    try:
-        await recommendation_api.initialize()
-        
-        # Run optimization
-        recommendation_api.recommender.optimize_algorithm_weights(test_users)
-        
-        return {
-            "status": "success",
-            "message": "Algorithm weights optimized successfully",
-            "new_weights": recommendation_api.recommender.algorithm_weights,
-            "test_users_count": len(test_users),
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        logger.error(f"❌ Weight optimization error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    return await _submit_job('optimize_weights', {'test_users': test_users})
+
+job_runner.on_success('optimize_weights', recommendation_api.apply_optimized_weights)
+job_runner.on_success('ab_test', recommendation_api.apply_ab_test_results)
 
 # 📈 REAL-TIME PERFORMANCE MONITORING
 @app.get("/performance-monitor")
@@ -357,82 +621,148 @@ async def get_performance_monitor():
     try:
         await recommendation_api.initialize()
         
-        recent_metrics = recommendation_api.recommender.performance_metrics[-20:]
+        tracker = recommendation_api.recommender.latency_tracker
+        algorithm_performance = tracker.snapshot()
         
-        if not recent_metrics:
+        if not algorithm_performance:
             return {
                 "status": "info",
                 "message": "No recent performance data available"
             }
         
-        # Calculate averages
-        avg_execution_time = np.mean([m.execution_time for m in recent_metrics])
-        algorithm_performance = {}
-        
-        for metric in recent_metrics:
-            if metric.algorithm not in algorithm_performance:
-                algorithm_performance[metric.algorithm] = []
-            algorithm_performance[metric.algorithm].append(metric.execution_time)
-        
-        # Average by algorithm
-        for alg in algorithm_performance:
-            algorithm_performance[alg] = np.mean(algorithm_performance[alg])
+        # Health: son 60 saniyedeki en kötü p99
+        recent = [perf['last_60s'] for perf in algorithm_performance.values()]
+        worst_p99_ms = max((r['p99_ms'] for r in recent if r['count']), default=0.0)
         
         return {
             "status": "success",
             "monitoring_data": {
-                "average_execution_time": avg_execution_time,
                 "algorithm_performance": algorithm_performance,
-                "recent_metrics_count": len(recent_metrics),
-                "system_health": "healthy" if avg_execution_time < 1.0 else "slow"
+                "recent_requests_60s": sum(r['count'] for r in recent),
+                "recent_errors_60s": sum(r['errors'] for r in recent),
+                "worst_p99_ms_60s": worst_p99_ms,
+                "system_health": "healthy" if worst_p99_ms < 1000.0 else "slow",
+                "executors": executor_stats(),
+                "admission": admission.stats(),
+                "sqlite_pools": pool_stats(),
+                "jobs": job_runner.stats(),
+                "recommendation_pages": ranked_lists.stats()
             },
             "timestamp": datetime.now().isoformat()
         }
         
+    except ExecutorBusy:
+        raise
     except Exception as e:
         logger.error(f"❌ Performance monitoring error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# 🔍 REQUEST TRACES
+@app.get("/debug/traces", dependencies=[Depends(require_admin)])
+async def get_debug_traces(limit: int = 50, route: Optional[str] = None, min_duration_ms: float = 0.0):
+    """
+    🔍 Recently sampled request traces (per-stage timings)
+    """
+    return {
+        "status": "success",
+        "tracer": tracer.stats(),
+        "traces": tracer.recent(limit=limit, name=route, min_duration_ms=min_duration_ms),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.put("/debug/traces/sampling", dependencies=[Depends(require_admin)])
+async def set_trace_sampling(rate: float):
+    """
+    🎚️ Change trace sample rate (0.0 - 1.0); admins can send `X-Debug-Trace: 1` to force a single request
+    """
+    tracer.set_sample_rate(rate)
+    return {"status": "success", "tracer": tracer.stats()}
+
+# 🔥 ON-DEMAND PROFILER
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def run_profiler(seconds: float = 10.0, interval_ms: float = 5.0,
+                       format: str = "collapsed", include_idle: bool = False):
+    """
+    🔥 Sample all threads of this worker for `seconds` and return the stacks
+    
+    format=collapsed -> flamegraph.pl / speedscope input, format=json -> summary
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        # Örnekleme ayrı thread'de; event loop istek almaya devam eder (ve örneklenir)
+        profile = await loop.run_in_executor(
+            None, profiler.profile, seconds, interval_ms / 1000.0, include_idle
+        )
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    logger.info(f"🔥 Profile captured: {profile['samples']} samples in {profile['duration_seconds']}s")
+    
+    if format == "json":
+        return {
+            "status": "success",
+            "duration_seconds": profile['duration_seconds'],
+            "samples": profile['samples'],
+            "interval_ms": profile['interval_ms'],
+            "top_functions": top_functions(profile),
+            "stacks": profile['stacks']
+        }
+    
+    filename = f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.collapsed"
+    return PlainTextResponse(
+        to_collapsed(profile),
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
 # Keep existing endpoints (search, rate-movie, favorites, etc.)
 # ... [Previous endpoints from app_complete_v5_fixed.py] ...
 
 # 🚀 SYSTEM HEALTH CHECK
+async def _database_readiness():
+    with db_timer('health_user_count'):
+        return {'users': await fetch_scalar("SELECT COUNT(*) FROM users")}
+
+async def _recommender_readiness():
+    # Model ilk istekte yüklenir; yüklenmemiş olması hazır olmamak demek değil
+    return {'initialized': recommendation_api.is_initialized}
+
+readiness = ReadinessMonitor({
+    'database': _database_readiness,
+    'recommendation_system': _recommender_readiness,
+})
+
+# 🩺 Readiness snapshot arka planda yenilenir (shutdown'da iptal edilir)
+@app.on_event("startup")
+async def start_readiness_monitor():
+    app.state.readiness_monitor = asyncio.create_task(readiness.run())
+
 @app.get("/health")
 async def health_check():
-    """System health check"""
-    try:
-        # Check database
-        conn = sqlite3.connect('movie_recommendation.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM users")
-        user_count = cursor.fetchone()[0]
-        conn.close()
-        
-        # Check recommendation system
-        is_initialized = recommendation_api.is_initialized
-        
-        return {
-            "status": "healthy",
-            "database": "connected",
-            "users": user_count,
-            "recommendation_system": "initialized" if is_initialized else "not initialized",
-            "version": "Enhanced Hybrid v6.0",            
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "error": str(e),
-            "timestamp": datetime.now().isoformat()
-        }
+    """
+    System health check
+    
+    Liveness is answering at all; dependency state comes from the readiness
+    snapshot refreshed in the background, so probes do not query the DB.
+    """
+    snapshot = await readiness.snapshot()
+    checks = snapshot['checks']
+    
+    return {
+        "status": "healthy" if snapshot['ready'] else "unhealthy",
+        "database": "connected" if checks['database']['ok'] else "error",
+        "users": checks['database'].get('users'),
+        "recommendation_system": "initialized" if checks['recommendation_system'].get('initialized') else "not initialized",
+        "version": "Enhanced Hybrid v6.0",
+        "readiness": snapshot,
+        "timestamp": datetime.now().isoformat()
+    }
 
 # 🔍 SEARCH WITH ENHANCED RESULTS
 @app.get("/enhanced-search")
 async def enhanced_search(q: str, limit: int = 20):
     """Enhanced search with recommendation context"""
     try:
-        movies = db_manager.search_movies(q, limit)
+        movies = await run_blocking(db_manager.search_movies, q, limit)
         
         # Add recommendation context
         for movie in movies:
@@ -450,6 +780,8 @@ async def enhanced_search(q: str, limit: int = 20):
             "search_type": "enhanced"
         }
         
+    except ExecutorBusy:
+        raise
     except Exception as e:
         logger.error(f"❌ Enhanced search error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -10,7 +10,9 @@ import json
 
 # Import ettiğimiz modüller
 from database_fixed import get_db, User, Movie, Rating, Favorite, UserActivity
-from auth import UserService, create_access_token, verify_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from genre_index import get_genre_catalog
+from auth import UserService, auth_cache, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from password_service import PASSWORD_RETRY_AFTER_SECONDS, PasswordServiceBusy, password_service
 from datetime import timedelta
 
 # Mevcut data
@@ -57,7 +59,7 @@ async def get_current_user(
     db: Session = Depends(get_db)
 ):
     token = credentials.credentials
-    username = verify_token(token)
+    username = auth_cache.verify(token)
     if username is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -65,9 +67,14 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.username == username).first()
+    # Cache hit: sorgu yok (paylaşılan, session'dan ayrılmış kopya; değiştirmek için yeniden yükle)
+    user = auth_cache.get_user(username)
     if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        db.expunge(user)
+        auth_cache.put_user(username, user)
     return user
 
 # 🆕 AUTH ENDPOINTS
@@ -76,13 +83,23 @@ async def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
     """Kullanıcı kaydı"""
     try:
         user_service = UserService()
+        # Kullanıcı zaten var mı? (bcrypt'ten önce, ucuz kontrol)
+        if user_service.get_user_by_username(user_data.username):
+            raise ValueError("Bu kullanıcı adı zaten kullanılıyor")
+        
+        if user_service.get_user_by_email(user_data.email):
+            raise ValueError("Bu email zaten kullanılıyor")
+        
+        # bcrypt process pool'da (event loop bloklanmaz)
+        hashed_password = await password_service.hash(user_data.password)
         user = user_service.create_user(
             username=user_data.username,
             email=user_data.email,
             password=user_data.password,
             age=user_data.age,
             gender=user_data.gender,
-            favorite_genres=user_data.favorite_genres
+            favorite_genres=user_data.favorite_genres,
+            hashed_password=hashed_password
         )
         
         return {
@@ -93,6 +110,9 @@ async def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
         }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PasswordServiceBusy:
+        raise HTTPException(status_code=503, detail="Çok fazla giriş isteği, lütfen tekrar deneyin",
+                            headers={"Retry-After": str(PASSWORD_RETRY_AFTER_SECONDS)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -100,10 +120,10 @@ async def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
 async def login_user(user_data: UserLogin, db: Session = Depends(get_db)):
     """Kullanıcı girişi"""
     try:
-        user_service = UserService()
-        user = user_service.authenticate_user(user_data.username, user_data.password)
+        user = db.query(User).filter(User.username == user_data.username).first()
         
-        if not user:
+        # Şifre doğrulama (bcrypt) process pool'da
+        if not user or not await password_service.verify(user.username, user_data.password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Yanlış kullanıcı adı veya şifre"
@@ -130,9 +150,18 @@ async def login_user(user_data: UserLogin, db: Session = Depends(get_db)):
         }
     except HTTPException:
         raise
+    except PasswordServiceBusy:
+        raise HTTPException(status_code=503, detail="Çok fazla giriş isteği, lütfen tekrar deneyin",
+                            headers={"Retry-After": str(PASSWORD_RETRY_AFTER_SECONDS)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/logout")
+async def logout_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Çıkış: token süresi dolana kadar reddedilir (diğer worker'lar AUTH_REVOCATION_CHECK_SECONDS içinde görür)"""
+    auth_cache.revoke(credentials.credentials)
+    return {"status": "success", "message": "Çıkış yapıldı"}
+
 @app.get("/profile")
 async def get_user_profile(current_user: User = Depends(get_current_user)):
     """Kullanıcı profili"""
@@ -214,49 +243,39 @@ async def get_user_recommendations(
     """Kullanıcı özel öneriler"""
     try:
         # Kullanıcının puanladığı filmleri al
-        user_ratings = db.query(Rating).filter(Rating.user_id == current_user.id).all()
+        user_ratings = db.query(Rating.movie_id, Rating.rating).filter(Rating.user_id == current_user.id).all()
         
-        # Dictionary formatına çevir
+        # Dictionary formatına çevir (internal -> external ID katalog cache'ten)
+        catalog = get_genre_catalog(db)
         ratings_dict = {}
-        for rating in user_ratings:
-            movie = db.query(Movie).filter(Movie.id == rating.movie_id).first()
-            if movie:
-                ratings_dict[movie.movie_id] = rating.rating
+        for movie_db_id, rating in user_ratings:
+            movie_id = catalog.movie_id_for_db_id(movie_db_id)
+            if movie_id is not None:
+                ratings_dict[movie_id] = rating
         
         # Recommendation engine çalıştır
         if len(ratings_dict) == 0:
             method = "YENİ KULLANICI: Popüler filmler"
             # En popüler filmleri öner
-            popular_movies = db.query(Movie).order_by(Movie.popularity_score.desc()).limit(n_recommendations).all()
-            recommendations = []
-            for movie in popular_movies:
-                recommendations.append({
-                    "movie_id": movie.movie_id,
-                    "title": movie.title,
-                    "avg_rating": movie.avg_rating,
-                    "popularity": movie.rating_count,
-                    "genres": json.loads(movie.genres) if movie.genres else [],
-                    "score": movie.popularity_score
-                })
+            popular_rows = catalog.most_popular_rows(n_recommendations)
         else:
             method = f"KİŞİSELLEŞTİRİLMİŞ: {len(ratings_dict)} puanlamaya dayalı"
             # Burada gelişmiş recommendation algoritması olacak
             # Şimdilik popüler olanları filtreleyelim
-            rated_movie_ids = list(ratings_dict.keys())
-            popular_movies = db.query(Movie).filter(
-                ~Movie.movie_id.in_(rated_movie_ids)
-            ).order_by(Movie.popularity_score.desc()).limit(n_recommendations).all()
-            
-            recommendations = []
-            for movie in popular_movies:
-                recommendations.append({
-                    "movie_id": movie.movie_id,
-                    "title": movie.title,
-                    "avg_rating": movie.avg_rating,
-                    "popularity": movie.rating_count,
-                    "genres": json.loads(movie.genres) if movie.genres else [],
-                    "score": movie.popularity_score
-                })
+            rated_rows = catalog.rows_for_db_ids([movie_db_id for movie_db_id, _ in user_ratings])
+            popular_rows = catalog.most_popular_rows(n_recommendations, exclude_rows=rated_rows)
+        
+        recommendations = []
+        for row in popular_rows:
+            card = catalog.cards[row]
+            recommendations.append({
+                "movie_id": card["movie_id"],
+                "title": card["title"],
+                "avg_rating": card["avg_rating"],
+                "popularity": card["popularity"],
+                "genres": card["genres"],
+                "score": float(catalog.popularity_score[row])
+            })
         
         return {
             "status": "success",
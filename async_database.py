@@ -0,0 +1,45 @@
+import os
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from database_fixed import DATABASE_URL
+
+# Aynı SQLite dosyası, aiosqlite sürücüsü ile
+ASYNC_DATABASE_URL = os.environ.get(
+    'ASYNC_DATABASE_URL', DATABASE_URL.replace('sqlite://', 'sqlite+aiosqlite://', 1)
+)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '10'))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', '5000'))
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_POOL_SIZE)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL: okuyucular yazarı beklemez; busy_timeout: kilitte hemen hata verme
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+# Async database session dependency
+async def get_async_db():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+async def fetch_all(query: str, params: Optional[Dict] = None) -> List[Dict]:
+    """Ham SQL -> satır dict'leri (pandas.read_sql_query yerine)"""
+    async with async_engine.connect() as conn:
+        result = await conn.execute(text(query), params or {})
+        return [dict(row._mapping) for row in result]
+
+
+async def fetch_scalar(query: str, params: Optional[Dict] = None):
+    async with async_engine.connect() as conn:
+        result = await conn.execute(text(query), params or {})
+        return result.scalar()
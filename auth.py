@@ -1,17 +1,29 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from cachetools import TLRUCache, TTLCache
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
-from database_fixed import User, SessionLocal
+from database_fixed import RevokedToken, User, SessionLocal
+from prometheus_metrics import AUTH_CACHE_LOOKUPS
 import json
 import hashlib
+import os
+import threading
+import time
 
 # Security Ayarları
 SECRET_KEY = "your-secret-key-here-make-it-random-and-secure-film-recommendation-system"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Auth cache ayarları
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', '60'))
+AUTH_USER_CACHE_SIZE = int(os.environ.get('AUTH_USER_CACHE_SIZE', '10000'))
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', '20000'))
+# Cache'lenmiş token en geç bu kadar saniyede bir paylaşılan iptal tablosuna tekrar sorulur
+AUTH_REVOCATION_CHECK_SECONDS = float(os.environ.get('AUTH_REVOCATION_CHECK_SECONDS', '30'))
+
 # Bcrypt context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -53,17 +65,199 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
-    """JWT token doğrula"""
+def decode_token(token: str) -> Optional[dict]:
+    """JWT imza + süre kontrolü; geçersizse None"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        return username
     except JWTError as e:
         print(f"❌ JWT Error: {e}")
         return None
+    if payload.get("sub") is None:
+        return None
+    return payload
+
+def verify_token(token: str):
+    """JWT token doğrula"""
+    payload = decode_token(token)
+    return payload["sub"] if payload else None
+
+def check_password(username: str, password: str, hashed_password: str) -> bool:
+    """Hibrit şifre kontrolü: MovieLens kullanıcıları MD5, diğerleri bcrypt (+ MD5 fallback)"""
+    # MovieLens kullanıcıları için MD5 kontrolü (auth.py'de)
+    if username.startswith("ml_user_"):
+        print(f"🎬 MovieLens kullanıcısı tespit edildi")
+        
+        md5_hash = hashlib.md5(password.encode()).hexdigest()
+        print(f"🔐 Hesaplanan MD5: {md5_hash[:20]}...")
+        print(f"🔐 DB'deki hash: {hashed_password[:20]}...")
+        
+        if hashed_password == md5_hash:
+            print(f"✅ MovieLens MD5 hash eşleşti!")
+            return True
+        else:
+            print(f"❌ MovieLens MD5 hash eşleşmedi")
+            return False
+    
+    # Normal kullanıcılar için bcrypt kontrolü
+    else:
+        print(f"👤 Normal kullanıcı - Bcrypt kontrolü")
+        
+        try:
+            if verify_password(password, hashed_password):
+                print(f"✅ Bcrypt hash eşleşti!")
+                return True
+            else:
+                print(f"❌ Bcrypt hash eşleşmedi")
+                return False
+        except Exception as e:
+            print(f"❌ Bcrypt kontrolü hatası: {e}")
+            # Bcrypt başarısız olursa MD5 dene
+            print(f"🔄 Fallback MD5 kontrolü deneniyor...")
+            if verify_md5_password(password, hashed_password):
+                print(f"✅ Fallback MD5 başarılı!")
+                return True
+            else:
+                print(f"❌ Fallback MD5 de başarısız")
+                return False
+
+def _token_key(token: str) -> str:
+    # Token'ın kendisi bellekte anahtar olarak tutulmaz
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _until_expiry(key, value, now):
+    # TLRUCache ttu: kayıt token'ın exp zamanında düşer (value = (..., exp))
+    return value[-1]
+
+class RevocationStore:
+    """
+    🚪 Shared logout table (revoked_tokens) so every worker rejects a revoked token
+
+    Rows are keyed by the token's SHA-256 hash and kept until the token's own
+    `exp`; expired rows are purged on the next revoke. The table is created
+    on first use, so databases built before it existed keep working.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self._session_factory = session_factory
+        self._table_ready = False
+
+    def _session(self):
+        db = self._session_factory()
+        if not self._table_ready:
+            RevokedToken.__table__.create(bind=db.get_bind(), checkfirst=True)
+            self._table_ready = True
+        return db
+
+    def is_revoked(self, key: str) -> bool:
+        db = self._session()
+        try:
+            return db.get(RevokedToken, key) is not None
+        finally:
+            db.close()
+
+    def add(self, key: str, username: str, expires_at: float):
+        db = self._session()
+        try:
+            now = datetime.utcnow()
+            db.query(RevokedToken).filter(RevokedToken.expires_at < now).delete(synchronize_session=False)
+            db.merge(RevokedToken(token_hash=key, username=username, revoked_at=now,
+                                  expires_at=datetime.utcfromtimestamp(expires_at)))
+            db.commit()
+        finally:
+            db.close()
+
+class AuthCache:
+    """
+    🔑 Verified-token and resolved-user cache for the auth dependency
+
+    Tokens are cached by SHA-256 hash until their own `exp`, so a hit skips
+    the JWT signature check; users are cached by token subject for
+    AUTH_USER_CACHE_TTL seconds, so a hit skips the users query. Cached users
+    are detached ORM objects shared between requests: read them, and load
+    the row in the request's session to change it. Profile updates drop the
+    user entry; logout revokes the token until it expires.
+
+    The caches are per process, but revocations are also written to the
+    shared RevocationStore and checked whenever a token entry is filled.
+    Token entries live at most AUTH_REVOCATION_CHECK_SECONDS, so a logout
+    on one worker is honoured by the others within that window.
+    """
+
+    def __init__(self, user_ttl: int = AUTH_USER_CACHE_TTL, user_size: int = AUTH_USER_CACHE_SIZE,
+                 token_size: int = AUTH_TOKEN_CACHE_SIZE, revocations: Optional[RevocationStore] = None,
+                 revocation_check_seconds: float = AUTH_REVOCATION_CHECK_SECONDS):
+        self._users = TTLCache(maxsize=user_size, ttl=user_ttl)
+        self._tokens = TLRUCache(maxsize=token_size, ttu=_until_expiry, timer=time.time)
+        self._revoked = TLRUCache(maxsize=token_size, ttu=_until_expiry, timer=time.time)
+        self._revocations = revocations if revocations is not None else RevocationStore()
+        self._revocation_check_seconds = revocation_check_seconds
+        # cachetools thread-safe değil; sync endpoint'ler threadpool'da çalışır
+        self._lock = threading.Lock()
+        self._lookups = {(cache, result): AUTH_CACHE_LOOKUPS.labels(cache, result)
+                         for cache in ('token', 'user') for result in ('hit', 'miss')}
+
+    def verify(self, token: str) -> Optional[str]:
+        """Geçerli token -> username (sub); geçersiz / süresi dolmuş / çıkış yapılmış -> None"""
+        key = _token_key(token)
+        with self._lock:
+            if key in self._revoked:
+                return None
+            entry = self._tokens.get(key)
+        if entry is not None:
+            self._lookups['token', 'hit'].inc()
+            return entry[0]
+        
+        self._lookups['token', 'miss'].inc()
+        payload = decode_token(token)
+        if payload is None:
+            return None
+        exp = float(payload.get("exp", time.time()))
+        try:
+            revoked = self._revocations.is_revoked(key)
+        except Exception as e:
+            # Tablo okunamazsa yerel durumla devam; entry cache'lenmez, sonraki istek tekrar sorar
+            print(f"⚠️ Token iptal tablosu okunamadı: {e}")
+            return payload["sub"]
+        with self._lock:
+            if revoked:
+                # Başka bir worker'da çıkış yapılmış
+                self._revoked[key] = (payload["sub"], exp)
+                return None
+            self._tokens[key] = (payload["sub"], min(exp, time.time() + self._revocation_check_seconds))
+        return payload["sub"]
+
+    def get_user(self, username: str):
+        with self._lock:
+            user = self._users.get(username)
+        self._lookups['user', 'miss' if user is None else 'hit'].inc()
+        return user
+
+    def put_user(self, username: str, user):
+        with self._lock:
+            self._users[username] = user
+
+    def invalidate_user(self, username: str):
+        with self._lock:
+            self._users.pop(username, None)
+
+    def revoke(self, token: str):
+        """Logout: token süresi dolana kadar tüm worker'larda reddedilir, kullanıcı kaydı düşer"""
+        payload = decode_token(token)
+        if payload is None:
+            return
+        key = _token_key(token)
+        exp = float(payload.get("exp", time.time()))
+        with self._lock:
+            self._tokens.pop(key, None)
+            self._revoked[key] = (payload["sub"], exp)
+            self._users.pop(payload["sub"], None)
+        self._revocations.add(key, payload["sub"], exp)
+
+    def stats(self) -> dict:
+        return {'users': len(self._users), 'tokens': len(self._tokens), 'revoked': len(self._revoked)}
+
+# Global cache (worker başına; iptaller revoked_tokens tablosunda paylaşılır)
+auth_cache = AuthCache()
 
 class UserService:
     def __init__(self, db: Session = None):
@@ -78,8 +272,8 @@ class UserService:
     
     def create_user(self, username: str, email: str, password: str,
                    age: Optional[int] = None, gender: Optional[str] = None,
-                   favorite_genres: Optional[list] = None):
-        """Yeni kullanıcı oluştur"""
+                   favorite_genres: Optional[list] = None, hashed_password: Optional[str] = None):
+        """Yeni kullanıcı oluştur (hashed_password verilirse şifre burada hashlenmez)"""
         
         print(f"🆕 Yeni kullanıcı oluşturuluyor: {username}")
         
@@ -90,8 +284,9 @@ class UserService:
         if self.get_user_by_email(email):
             raise ValueError("Bu email zaten kullanılıyor")
         
-        # Şifreyi hashle
-        hashed_password = get_password_hash(password)
+        # Şifreyi hashle (async servisler bunu process pool'da önceden yapar)
+        if hashed_password is None:
+            hashed_password = get_password_hash(password)
         print(f"✅ Şifre hashli: {hashed_password[:20]}...")
         
         # Favorite genres JSON'a çevir
@@ -132,42 +327,9 @@ class UserService:
         print(f"🔐 DB Hash (ilk 20 kar): {user.hashed_password[:20]}...")
         print(f"🔐 DB Hash uzunluğu: {len(user.hashed_password)}")
         
-        # MovieLens kullanıcıları için MD5 kontrolü (auth.py'de)
-        if username.startswith("ml_user_"):
-            print(f"🎬 MovieLens kullanıcısı tespit edildi")
-            
-            md5_hash = hashlib.md5(password.encode()).hexdigest()
-            print(f"🔐 Hesaplanan MD5: {md5_hash[:20]}...")
-            print(f"🔐 DB'deki hash: {user.hashed_password[:20]}...")
-            
-            if user.hashed_password == md5_hash:
-                print(f"✅ MovieLens MD5 hash eşleşti!")
-                return user
-            else:
-                print(f"❌ MovieLens MD5 hash eşleşmedi")
-                return False
-        
-        # Normal kullanıcılar için bcrypt kontrolü
-        else:
-            print(f"👤 Normal kullanıcı - Bcrypt kontrolü")
-            
-            try:
-                if verify_password(password, user.hashed_password):
-                    print(f"✅ Bcrypt hash eşleşti!")
-                    return user
-                else:
-                    print(f"❌ Bcrypt hash eşleşmedi")
-                    return False
-            except Exception as e:
-                print(f"❌ Bcrypt kontrolü hatası: {e}")
-                # Bcrypt başarısız olursa MD5 dene
-                print(f"🔄 Fallback MD5 kontrolü deneniyor...")
-                if verify_md5_password(password, user.hashed_password):
-                    print(f"✅ Fallback MD5 başarılı!")
-                    return user
-                else:
-                    print(f"❌ Fallback MD5 de başarısız")
-                    return False
+        if check_password(username, password, user.hashed_password):
+            return user
+        return False
     
     def get_user_by_username(self, username: str):
         """Username ile kullanıcı bul"""
@@ -187,6 +349,8 @@ class UserService:
         if not user:
             return None
         
+        # Eski ve (değiştiyse) yeni username için cache'lenmiş kullanıcıyı düşür
+        auth_cache.invalidate_user(user.username)
         for key, value in kwargs.items():
             if key == "favorite_genres" and value:
                 value = json.dumps(value)
@@ -196,6 +360,7 @@ class UserService:
         user.last_active = datetime.utcnow()
         self.db.commit()
         self.db.refresh(user)
+        auth_cache.invalidate_user(user.username)
         
         return user
 
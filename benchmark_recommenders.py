@@ -0,0 +1,273 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from enhanced_hybrid_recommender_v6 import EnhancedHybridRecommender
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Benchmark edilen algoritmalar (EnhancedHybridRecommender metod isimleri)
+ALGORITHMS = [
+    'collaborative_filtering_recommendations',
+    'content_based_recommendations',
+    'matrix_factorization_recommendations',
+    'popularity_based_recommendations',
+    'hybrid_recommendations',
+]
+
+DEFAULT_SIZES = [100, 500, 1000]
+PERCENTILES = [50, 95, 99]
+
+
+def _git_revision() -> Optional[str]:
+    """Çalışılan commit'i kaydet (sürümler arası karşılaştırma için)"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def summarize_latencies(latencies_ms: List[float]) -> Dict:
+    """Latency listesinden p50/p95/p99 özetini çıkar"""
+    if not latencies_ms:
+        return {'count': 0}
+
+    values = np.asarray(latencies_ms, dtype=float)
+    summary = {
+        'count': int(values.size),
+        'mean_ms': round(float(values.mean()), 3),
+        'min_ms': round(float(values.min()), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
+    for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f'p{p}_ms'] = round(float(v), 3)
+    return summary
+
+
+def time_initialization(recommender: EnhancedHybridRecommender) -> Dict:
+    """Model hazırlama adımlarını ayrı ayrı ölç"""
+    n_components = max(1, min(50, recommender.user_movie_matrix.shape[1] - 1))
+
+    start = time.perf_counter()
+    recommender.prepare_content_similarity()
+    content_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    recommender.prepare_matrix_factorization(n_components=n_components)
+    mf_seconds = time.perf_counter() - start
+
+    return {
+        'content_similarity_seconds': round(content_seconds, 4),
+        'matrix_factorization_seconds': round(mf_seconds, 4),
+        'initialize_seconds': round(content_seconds + mf_seconds, 4),
+    }
+
+
+def benchmark_algorithm(recommender: EnhancedHybridRecommender, algorithm: str,
+                        users: List[int], n_recommendations: int,
+                        memory_sample: int) -> Dict:
+    """Tek algoritma için latency dağılımı ve tracemalloc peak değerleri"""
+    func = getattr(recommender, algorithm)
+
+    # Latency turu: tracemalloc kapalı, ölçüm bozulmasın
+    latencies_ms = []
+    for user_id in users:
+        start = time.perf_counter()
+        func(user_id, n_recommendations)
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+
+    # Bellek turu: daha küçük örnek üzerinde çağrı başına peak allocation
+    peaks_kb = []
+    allocated_kb = []
+    for user_id in users[:memory_sample]:
+        tracemalloc.start()
+        try:
+            func(user_id, n_recommendations)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peaks_kb.append(peak / 1024)
+        allocated_kb.append(current / 1024)
+
+    result = {'latency': summarize_latencies(latencies_ms)}
+    if peaks_kb:
+        result['memory'] = {
+            'samples': len(peaks_kb),
+            'peak_kb_mean': round(float(np.mean(peaks_kb)), 1),
+            'peak_kb_max': round(float(np.max(peaks_kb)), 1),
+            'retained_kb_mean': round(float(np.mean(allocated_kb)), 1),
+        }
+    return result
+
+
+def run_benchmarks(sizes: List[int], n_users: int = 50, n_recommendations: int = 10,
+                   memory_sample: int = 10, seed: int = 42,
+                   db_path: str = 'movie_recommendation.db',
+                   matrix_path: str = 'user_movie_matrix.pkl',
+                   algorithms: Optional[List[str]] = None) -> Dict:
+    """🏁 Tüm algoritmaları farklı veri boyutlarında benchmark et"""
+    algorithms = algorithms or ALGORITHMS
+
+    recommender = EnhancedHybridRecommender(db_path=db_path, matrix_path=matrix_path)
+
+    # Startup: dosya/DB yükleme + tam model hazırlığı
+    start = time.perf_counter()
+    if not recommender.load_data():
+        raise RuntimeError("Benchmark data could not be loaded")
+    load_seconds = time.perf_counter() - start
+
+    full_matrix = recommender.user_movie_matrix
+    results = {
+        'metadata': {
+            'timestamp': datetime.now().isoformat(),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'seed': seed,
+            'n_users_sampled': n_users,
+            'n_recommendations': n_recommendations,
+            'memory_sample': memory_sample,
+            'full_matrix_shape': list(full_matrix.shape),
+        },
+        'startup': {'load_data_seconds': round(load_seconds, 4)},
+        'sizes': {},
+    }
+
+    for size in sizes:
+        size = min(size, len(full_matrix.index))
+        logger.info(f"🏁 Benchmarking dataset size: {size} users")
+
+        recommender.user_movie_matrix = full_matrix.iloc[:size]
+        init_timings = time_initialization(recommender)
+
+        # Aynı seed ile sabit kullanıcı örneği -> sürümler arası kıyaslanabilir
+        rng = random.Random(seed)
+        user_pool = list(recommender.user_movie_matrix.index)
+        users = rng.sample(user_pool, min(n_users, len(user_pool)))
+
+        size_result = {
+            'matrix_shape': list(recommender.user_movie_matrix.shape),
+            'initialization': init_timings,
+            'algorithms': {},
+        }
+        for algorithm in algorithms:
+            logger.info(f"   🔄 {algorithm}")
+            size_result['algorithms'][algorithm] = benchmark_algorithm(
+                recommender, algorithm, users, n_recommendations, memory_sample
+            )
+
+        results['sizes'][str(size)] = size_result
+
+    recommender.user_movie_matrix = full_matrix
+    return results
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = 1.10) -> List[Dict]:
+    """İki benchmark JSON'unu karşılaştır, p95'i threshold'dan fazla kötüleşenleri döndür"""
+    regressions = []
+    for size, size_result in current.get('sizes', {}).items():
+        base_size = baseline.get('sizes', {}).get(size)
+        if not base_size:
+            continue
+        for algorithm, algo_result in size_result['algorithms'].items():
+            base_algo = base_size['algorithms'].get(algorithm)
+            if not base_algo:
+                continue
+            old = base_algo['latency'].get('p95_ms')
+            new = algo_result['latency'].get('p95_ms')
+            if old and new and new / old > threshold:
+                regressions.append({
+                    'size': size,
+                    'algorithm': algorithm,
+                    'baseline_p95_ms': old,
+                    'current_p95_ms': new,
+                    'ratio': round(new / old, 3),
+                })
+    return regressions
+
+
+def print_report(results: Dict):
+    """Konsola özet tablo yazdır"""
+    print("\n" + "=" * 80)
+    print("🏁 RECOMMENDER BENCHMARK RESULTS")
+    print("=" * 80)
+    print(f"Startup load_data: {results['startup']['load_data_seconds']:.3f}s")
+
+    for size, size_result in results['sizes'].items():
+        init = size_result['initialization']
+        print(f"\n📊 Users: {size}  matrix={size_result['matrix_shape']}  "
+              f"initialize={init['initialize_seconds']:.3f}s")
+        print(f"   {'algorithm':42s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'peak KB':>10s}")
+        for algorithm, algo_result in size_result['algorithms'].items():
+            latency = algo_result['latency']
+            memory = algo_result.get('memory', {})
+            print(f"   {algorithm:42s} "
+                  f"{latency.get('p50_ms', 0):9.2f} "
+                  f"{latency.get('p95_ms', 0):9.2f} "
+                  f"{latency.get('p99_ms', 0):9.2f} "
+                  f"{memory.get('peak_kb_max', 0):10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency/memory benchmark for recommender algorithms")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Dataset sizes (number of users) to benchmark")
+    parser.add_argument('--users', type=int, default=50, help="Users sampled per size")
+    parser.add_argument('--n', type=int, default=10, help="Recommendations per call")
+    parser.add_argument('--memory-sample', type=int, default=10,
+                        help="Calls per algorithm measured with tracemalloc")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', default='movie_recommendation.db')
+    parser.add_argument('--matrix', default='user_movie_matrix.pkl')
+    parser.add_argument('--algorithms', nargs='+', choices=ALGORITHMS)
+    parser.add_argument('--output', default=None, help="JSON output path")
+    parser.add_argument('--compare', default=None, help="Baseline JSON to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        sizes=args.sizes,
+        n_users=args.users,
+        n_recommendations=args.n,
+        memory_sample=args.memory_sample,
+        seed=args.seed,
+        db_path=args.db,
+        matrix_path=args.matrix,
+        algorithms=args.algorithms,
+    )
+    print_report(results)
+
+    output = args.output or f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"✅ Benchmark results written to {output}")
+
+    if args.compare and os.path.exists(args.compare):
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, results)
+        if regressions:
+            print("\n⚠️ REGRESSIONS (p95):")
+            for r in regressions:
+                print(f"   {r['algorithm']} @ {r['size']} users: "
+                      f"{r['baseline_p95_ms']:.2f}ms -> {r['current_p95_ms']:.2f}ms (x{r['ratio']})")
+        else:
+            print("\n✅ No p95 regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
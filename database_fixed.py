@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Index
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship  # Düzeltme 1
 from datetime import datetime
 
@@ -61,13 +61,13 @@ class Rating(Base):
     __tablename__ = "ratings"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     movie_id = Column(Integer, ForeignKey("movies.id"))
     rating = Column(Float)  # 1.0 - 5.0
     
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)  # Re-rate'ler (analytics_counters)
     
     # İlişkiler
     user = relationship("User", back_populates="ratings")
@@ -76,9 +76,11 @@ class Rating(Base):
 # ❤️ Favorites Model
 class Favorite(Base):
     __tablename__ = "favorites"
+    # /my-favorites keyset sayfalama: kullanıcı başına en yeni önce
+    __table_args__ = (Index("ix_favorites_user_created", "user_id", "created_at", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     movie_id = Column(Integer, ForeignKey("movies.id"))
     
     # Favorite türü
@@ -90,9 +92,78 @@ class Favorite(Base):
     user = relationship("User", back_populates="favorites")
     movie = relationship("Movie", back_populates="favorites")
 
+# 🔗 Precomputed similar-movies table (similar_movies.py ile offline üretilir)
+class MovieSimilarity(Base):
+    __tablename__ = "movie_similarities"
+    
+    movie_id = Column(Integer, primary_key=True)          # Original dataset ID
+    rank = Column(Integer, primary_key=True)              # 0 = en benzer
+    similar_movie_id = Column(Integer)
+    score = Column(Float)                                 # Harmanlanmış skor
+    content_score = Column(Float)
+    cf_score = Column(Float)
+    cooccurrence_score = Column(Float)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+# 📈 Incrementally maintained analytics counters (analytics_counters.py)
+class AnalyticsDaily(Base):
+    __tablename__ = "analytics_daily"
+    
+    day = Column(String, primary_key=True)                # YYYY-MM-DD (UTC)
+    ratings = Column(Integer, default=0)
+    new_users = Column(Integer, default=0)
+    rerates = Column(Integer, default=0)                  # Var olan rating'in güncellenmesi (updated_at günü)
+
+class AnalyticsGenre(Base):
+    __tablename__ = "analytics_genres"
+    
+    genre = Column(String, primary_key=True)
+    ratings = Column(Integer, default=0)
+
+class AnalyticsWatermark(Base):
+    __tablename__ = "analytics_watermarks"
+    
+    source = Column(String, primary_key=True)             # "ratings" / "users" / "rating_updates"
+    last_id = Column(Integer, default=0)                  # Sayılan en büyük satır id'si
+    last_time = Column(String, nullable=True)             # rating_updates: (updated_at, id) keyset'inin zamanı
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+# 🗂️ Background jobs (jobs.py): A/B test, ağırlık optimizasyonu
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(String, primary_key=True)                 # uuid4 hex
+    kind = Column(String, index=True)                     # "ab_test", "optimize_weights"
+    status = Column(String, index=True)                   # queued, running, succeeded, failed
+    params = Column(Text)                                 # JSON
+    progress = Column(Float, default=0.0)                 # 0.0 - 1.0
+    progress_message = Column(String, nullable=True)
+    result = Column(Text, nullable=True)                  # JSON
+    error = Column(Text, nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    # Sahip API process'i ve son heartbeat'i: restart/recovery yalnızca sahibi ölmüş işleri toplar
+    owner = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True, index=True)
+
+# 🚪 Logout ile iptal edilen token'lar (auth.py): tüm worker'lar aynı tabloyu okur
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    token_hash = Column(String, primary_key=True)         # sha256(token), token'ın kendisi saklanmaz
+    username = Column(String, index=True)
+    expires_at = Column(DateTime, index=True)             # Token'ın exp'i; sonrası silinebilir
+    revoked_at = Column(DateTime, default=datetime.utcnow)
+
 # 📊 User Activity Model (metrikler için)
 class UserActivity(Base):
     __tablename__ = "user_activities"
+    # /my-watchlist keyset sayfalama: kullanıcı + aktivite türü başına en yeni önce
+    __table_args__ = (Index("ix_user_activities_user_type_created", "user_id", "activity_type", "created_at", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -105,6 +176,10 @@ class UserActivity(Base):
 # Database oluştur
 def create_database():
     Base.metadata.create_all(bind=engine)
+    # Mevcut tablolara sonradan eklenen index'ler (create_all var olan tabloya index eklemez)
+    for table in (Rating.__table__, Favorite.__table__, UserActivity.__table__):
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
     print("🗄️ Database tabloları oluşturuldu!")
 
 # Database session dependency
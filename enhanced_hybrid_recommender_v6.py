@@ -7,19 +7,68 @@ from sklearn.decomposition import TruncatedSVD
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import precision_score, recall_score, f1_score
 import sqlite3
+from contextvars import ContextVar
 from datetime import datetime
 import json
 import random
-from typing import Dict, List, Tuple, Optional
+import time
+from typing import Callable, Dict, List, Tuple, Optional
 import logging
 from dataclasses import dataclass
 import warnings
+
+from latency_histogram import AlgorithmLatencyTracker
+from request_tracing import span
+from prometheus_metrics import observe_recommendation, set_model_version, db_timer, HYBRID_COMPONENT_DROPPED
+from evaluation_kernels import (apply_no_ratings_fallback, batch_ranking_metrics, catalog_positions,
+                                recommendation_matrix, LIKED_THRESHOLD)
+from genre_index import genre_bitmasks, parse_genres
+from executors import cpu_executor
+from single_flight import SingleFlight
+from sqlite_pool import get_pool
 warnings.filterwarnings('ignore')
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# ⏱️ Deadline-aware hybrid: bileşenler ucuzdan pahalıya çalışır, her biri kalan bütçeden pay alır
+HYBRID_COMPONENT_ORDER = ('popularity_based', 'matrix_factorization', 'content_based', 'collaborative_filtering')
+HYBRID_FUSION_ORDER = ('collaborative_filtering', 'content_based', 'matrix_factorization', 'popularity_based')
+COMPONENT_BUDGET_SHARES = {
+    'popularity_based': 0.1,
+    'matrix_factorization': 0.2,
+    'content_based': 0.3,
+    'collaborative_filtering': 0.4,
+}
+FUSION_BUDGET_SHARE = 0.1  # füzyon + film bilgileri için ayrılan pay
+FLOOR_COMPONENT = 'popularity_based'  # bütçe bitse de her zaman çalışır
+
+# 🚦 Yük altında (admission control) kullanılan hazır listeler
+FALLBACK_LIST_SIZE = 100
+MIN_COHORT_USERS = 20
+AGE_BUCKETS = (18, 25, 35, 45, 55)
+
+
+def user_cohort(age, gender) -> Optional[Tuple[str, int]]:
+    """(cinsiyet, yaş grubu) cohort anahtarı; bilgi eksikse None"""
+    if gender is None or pd.isna(gender) or age is None or pd.isna(age):
+        return None
+    return str(gender), int(np.searchsorted(AGE_BUCKETS, int(age), side='right'))
+
+_component_deadline: ContextVar[Optional[float]] = ContextVar('component_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """A hybrid component ran past its time budget"""
+
+
+def _check_deadline():
+    # Uzun döngülerde kooperatif kontrol (deadline yoksa maliyeti yok denecek kadar az)
+    deadline = _component_deadline.get()
+    if deadline is not None and time.monotonic() > deadline:
+        raise DeadlineExceeded()
+
 @dataclass
 class RecommendationMetrics:
     """Recommendation performance metrics"""
@@ -38,14 +87,26 @@ class EnhancedHybridRecommender:
     🚀 Enhanced Hybrid Recommendation System v6.1 (Fixed)
     """
     
-    def __init__(self, db_path: str = 'movie_recommendation.db'):
+    def __init__(self, db_path: str = 'movie_recommendation.db',
+                 matrix_path: str = 'user_movie_matrix.pkl'):
         self.db_path = db_path
+        self.matrix_path = matrix_path
         self.user_movie_matrix = None
+        self.matrix_stats = {'total_ratings': 0, 'matrix_sparsity': 0.0}
         self.movies_df = None
+        self.movie_row = {}
+        self.movie_cards = {}
+        self.popular_fallback = []
+        self.cohort_fallback = {}
+        self.user_cohorts = {}
         self.users_df = None
         self.content_similarity_matrix = None
         self.svd_model = None
-        self.performance_metrics = []
+        self.model_version = None
+        self._eval_catalog = None
+        self.movie_genre_bits = None
+        self.genre_registry = None
+        self.latency_tracker = AlgorithmLatencyTracker()
         self.ab_test_results = {}
         
         # Algorithm weights for hybrid approach
@@ -64,16 +125,15 @@ class EnhancedHybridRecommender:
         
         try:
             # Load user-movie matrix
-            with open('user_movie_matrix.pkl', 'rb') as f:
+            with open(self.matrix_path, 'rb') as f:
                 self.user_movie_matrix = pickle.load(f)
+            self._compute_matrix_stats()
             logger.info(f"✅ Matrix loaded: {self.user_movie_matrix.shape}")
         except Exception as e:
             logger.error(f"❌ Matrix loading failed: {e}")
             return False
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            
             # Load movies with better genre handling
             movie_query = """
             SELECT movie_id, title, release_date, imdb_url, genres, 
@@ -81,16 +141,22 @@ class EnhancedHybridRecommender:
                    COALESCE(popularity_score, 0) as popularity
             FROM movies
             """
-            self.movies_df = pd.read_sql_query(movie_query, conn)
+            user_query = "SELECT id as user_id, username, email, age, gender, favorite_genres FROM users"
+            
+            # Paylaşılan bağlantı havuzu (her yüklemede yeni bağlantı açılmaz)
+            with get_pool(self.db_path).connection() as conn:
+                with db_timer('load_movies'):
+                    self.movies_df = pd.read_sql_query(movie_query, conn)
+                
+                # Load users
+                with db_timer('load_users'):
+                    self.users_df = pd.read_sql_query(user_query, conn)
             
             # Process genres field safely
             self.movies_df['genres_processed'] = self.movies_df['genres'].apply(self._process_genres)
+            self.movie_genre_bits, self.genre_registry = genre_bitmasks(self.movies_df['genres_processed'])
+            self._build_movie_cards()
             
-            # Load users
-            user_query = "SELECT id as user_id, username, email, age, gender, favorite_genres FROM users"
-            self.users_df = pd.read_sql_query(user_query, conn)
-            
-            conn.close()
             logger.info(f"✅ Data loaded: {len(self.movies_df)} movies, {len(self.users_df)} users")
             return True
             
@@ -98,33 +164,31 @@ class EnhancedHybridRecommender:
             logger.error(f"❌ Database loading failed: {e}")
             return False
 
+    def _build_movie_cards(self):
+        """movie_id -> satır map'i ve hazır film kartları (her load'da yeniden kurulur)"""
+        self.movie_row = {int(m): i for i, m in enumerate(self.movies_df['movie_id'])}
+        self.movie_cards = {}
+        columns = ['movie_id', 'title', 'genres_processed', 'release_date', 'avg_rating', 'popularity']
+        for movie_id, title, genres, release_date, avg_rating, popularity in \
+                self.movies_df[columns].itertuples(index=False, name=None):
+            self.movie_cards[int(movie_id)] = {
+                'movie_id': int(movie_id),
+                'title': str(title),
+                'genres': genres,
+                'genres_str': '|'.join(genres) if genres else "Unknown",
+                'release_date': str(release_date) if pd.notna(release_date) else "Unknown",
+                'avg_rating': float(avg_rating) if pd.notna(avg_rating) else 0.0,
+                'popularity': int(popularity) if pd.notna(popularity) else 0,
+            }
+
+    def movie_card(self, movie_id: int) -> Optional[Dict]:
+        """Hazır film kartının kopyası (yoksa None)"""
+        card = self.movie_cards.get(int(movie_id))
+        return dict(card) if card is not None else None
+
     def _process_genres(self, genres_str):
         """Safely process genres string to list"""
-        try:
-            if pd.isna(genres_str) or not genres_str:
-                return []
-            
-            # If it's already a list (from JSON)
-            if isinstance(genres_str, list):
-                return genres_str
-            
-            # If it's a JSON string
-            if genres_str.startswith('[') and genres_str.endswith(']'):
-                return json.loads(genres_str)
-            
-            # If it's pipe-separated
-            if '|' in genres_str:
-                return [g.strip() for g in genres_str.split('|')]
-            
-            # If it's comma-separated
-            if ',' in genres_str:
-                return [g.strip() for g in genres_str.split(',')]
-            
-            # Single genre
-            return [genres_str.strip()]
-            
-        except Exception:
-            return []
+        return parse_genres(genres_str)
 
     def prepare_content_similarity(self):
         """Prepare content-based similarity matrix with better genre handling"""
@@ -144,6 +208,67 @@ class EnhancedHybridRecommender:
         
         logger.info("✅ Content similarity matrix prepared")
 
+    def prepare_fallback_lists(self, list_size: int = FALLBACK_LIST_SIZE):
+        """Precompute global popularity and per-cohort lists served under load shedding"""
+        movies = self.movies_df
+        eligible = movies[(movies['avg_rating'] >= 3.5) & (movies['popularity'] > 0)]
+        scores = (eligible['popularity'] * eligible['avg_rating']).nlargest(list_size)
+        self.popular_fallback = [
+            (int(movie_id), float(score))
+            for movie_id, score in zip(eligible.loc[scores.index, 'movie_id'], scores)
+        ]
+        
+        # Cohort: aynı (cinsiyet, yaş grubu) kullanıcılarının en çok beğendiği (>= 4) filmler
+        users = self.users_df.set_index('user_id')
+        self.user_cohorts = {
+            int(user_id): cohort
+            for user_id, cohort in zip(users.index, map(user_cohort, users['age'], users['gender']))
+            if cohort is not None
+        }
+        cohort_rows = {}
+        for row, user_id in enumerate(self.user_movie_matrix.index):
+            cohort = self.user_cohorts.get(int(user_id))
+            if cohort is not None:
+                cohort_rows.setdefault(cohort, []).append(row)
+        liked = self.user_movie_matrix.to_numpy() >= LIKED_THRESHOLD
+        movie_ids = self.user_movie_matrix.columns.to_numpy()
+        
+        self.cohort_fallback = {}
+        for cohort, rows in cohort_rows.items():
+            if len(rows) < MIN_COHORT_USERS:
+                continue
+            counts = liked[rows].sum(axis=0)
+            top = np.argsort(-counts, kind='stable')[:list_size]
+            top = top[counts[top] > 0]
+            self.cohort_fallback[cohort] = [(int(movie_ids[i]), float(counts[i])) for i in top]
+        
+        logger.info(f"✅ Fallback lists prepared ({len(self.popular_fallback)} popular, "
+                    f"{len(self.cohort_fallback)} cohorts)")
+
+    def fallback_recommendations(self, user_id: int, n_recommendations: int = 10) -> List[Dict]:
+        """Hazır cohort/popülerlik listesinden öneri (hesaplama yok; yük altında kullanılır)"""
+        cohort = self.user_cohorts.get(int(user_id))
+        source = self.cohort_fallback.get(cohort) or self.popular_fallback
+        method = 'Cohort Popularity (degraded)' if cohort in self.cohort_fallback else 'Popularity (degraded)'
+        
+        rated = set()
+        if user_id in self.user_movie_matrix.index:
+            user_ratings = self.user_movie_matrix.loc[user_id]
+            rated = set(user_ratings[user_ratings.notna()].index)
+        
+        recommendations = []
+        for movie_id, score in source:
+            if movie_id in rated:
+                continue
+            card = self.movie_card(movie_id)
+            if card is None:
+                continue
+            card.update({'hybrid_score': score, 'recommendation_method': method})
+            recommendations.append(card)
+            if len(recommendations) >= n_recommendations:
+                break
+        return recommendations
+
     def prepare_matrix_factorization(self, n_components: int = 50):
         """Prepare matrix factorization model"""
         logger.info("🔄 Preparing matrix factorization model...")
@@ -169,6 +294,7 @@ class EnhancedHybridRecommender:
             user_similarities = []
             
             for other_user in self.user_movie_matrix.index:
+                _check_deadline()
                 if other_user != user_id:
                     other_ratings = self.user_movie_matrix.loc[other_user]
                     
@@ -198,8 +324,11 @@ class EnhancedHybridRecommender:
             
             sorted_recs = sorted(recommendations.items(), key=lambda x: x[1], reverse=True)
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.warning(f"CF Error for user {user_id}: {e}")
+            self._log_performance('collaborative_filtering', (datetime.now() - start_time).total_seconds(), error=True)
             return []
         
         execution_time = (datetime.now() - start_time).total_seconds()
@@ -222,14 +351,16 @@ class EnhancedHybridRecommender:
                 return []
             
             content_scores = {}
+            movie_ids = self.movies_df['movie_id'].to_numpy()
             
             for liked_movie in liked_movies:
+                _check_deadline()
                 try:
-                    movie_idx = self.movies_df[self.movies_df['movie_id'] == liked_movie].index[0]
+                    movie_idx = self.movie_row[int(liked_movie)]
                     similarities = self.content_similarity_matrix[movie_idx]
                     
                     for idx, similarity in enumerate(similarities):
-                        target_movie_id = self.movies_df.iloc[idx]['movie_id']
+                        target_movie_id = movie_ids[idx]
                         
                         if (target_movie_id not in liked_movies and 
                             pd.isna(user_ratings[target_movie_id]) and 
@@ -244,8 +375,11 @@ class EnhancedHybridRecommender:
             
             sorted_recs = sorted(content_scores.items(), key=lambda x: x[1], reverse=True)
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.warning(f"Content-based Error for user {user_id}: {e}")
+            self._log_performance('content_based', (datetime.now() - start_time).total_seconds(), error=True)
             return []
         
         execution_time = (datetime.now() - start_time).total_seconds()
@@ -273,6 +407,7 @@ class EnhancedHybridRecommender:
             
             recommendations = []
             for movie_idx, movie_id in enumerate(self.user_movie_matrix.columns):
+                _check_deadline()
                 if pd.isna(user_ratings[movie_id]):
                     predicted_rating = predicted_ratings[movie_idx]
                     if predicted_rating > 0:  # Only positive predictions
@@ -280,8 +415,11 @@ class EnhancedHybridRecommender:
             
             recommendations.sort(key=lambda x: x[1], reverse=True)
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.warning(f"MF Error for user {user_id}: {e}")
+            self._log_performance('matrix_factorization', (datetime.now() - start_time).total_seconds(), error=True)
             return []
         
         execution_time = (datetime.now() - start_time).total_seconds()
@@ -289,6 +427,30 @@ class EnhancedHybridRecommender:
         
         return recommendations[:n_recommendations]
 
+    def matrix_factorization_block(self, user_ids: List[int],
+                                   n_recommendations: int = 10) -> Dict[int, List[Tuple[int, float]]]:
+        """Matrix factorization for a block of users with one SVD transform (same ranking as per-user)"""
+        rows = self.user_movie_matrix.index.get_indexer(user_ids)
+        known = rows >= 0
+        block_users = [user_id for user_id, ok in zip(user_ids, known) if ok]
+        if not block_users:
+            return {}
+        
+        ratings = self.user_movie_matrix.to_numpy()[rows[known]]
+        unrated = np.isnan(ratings)
+        predicted = self.svd_model.transform(np.where(unrated, 0.0, ratings)) @ self.svd_model.components_
+        # Puanlanmış ve pozitif olmayan tahminler aday değil
+        predicted = np.where(unrated & (predicted > 0), predicted, -np.inf)
+        
+        movie_ids = self.user_movie_matrix.columns.to_numpy()
+        k = min(n_recommendations, predicted.shape[1])
+        top = np.argpartition(-predicted, k - 1, axis=1)[:, :k] if k else np.empty((len(block_users), 0), int)
+        results = {}
+        for user_id, candidates, scores in zip(block_users, top, predicted):
+            order = candidates[np.argsort(-scores[candidates], kind='stable')]
+            results[user_id] = [(movie_ids[i], float(scores[i])) for i in order if np.isfinite(scores[i])]
+        return results
+
     def popularity_based_recommendations(self, user_id: int, n_recommendations: int = 10) -> List[Tuple[int, float]]:
         """Enhanced Popularity-based recommendations"""
         start_time = datetime.now()
@@ -317,6 +479,7 @@ class EnhancedHybridRecommender:
             
         except Exception as e:
             logger.warning(f"Popularity Error for user {user_id}: {e}")
+            self._log_performance('popularity_based', (datetime.now() - start_time).total_seconds(), error=True)
             return []
         
         execution_time = (datetime.now() - start_time).total_seconds()
@@ -324,80 +487,140 @@ class EnhancedHybridRecommender:
         
         return recommendations[:n_recommendations]
 
-    def hybrid_recommendations(self, user_id: int, n_recommendations: int = 10) -> List[Dict]:
+    def hybrid_recommendations(self, user_id: int, n_recommendations: int = 10,
+                               deadline: Optional[float] = None) -> List[Dict]:
         """Enhanced Hybrid Recommendations with better error handling"""
+        return self.hybrid_recommendations_with_report(user_id, n_recommendations, deadline)[0]
+
+    def hybrid_recommendations_with_report(self, user_id: int, n_recommendations: int = 10,
+                                           deadline: Optional[float] = None) -> Tuple[List[Dict], Dict]:
+        """
+        Hybrid recommendations plus a report of which components contributed.
+
+        deadline: absolute time.monotonic() budget end. Each component gets a
+        share of the remaining budget; components that overrun it are dropped
+        and fusion renormalizes the weights over the ones that finished.
+        """
         logger.info(f"🎯 Generating hybrid recommendations for user {user_id}")
+        start_time = datetime.now()
         
         # Get recommendations from all algorithms
-        cf_recs = self.collaborative_filtering_recommendations(user_id, 20)
-        content_recs = self.content_based_recommendations(user_id, 20)
-        mf_recs = self.matrix_factorization_recommendations(user_id, 20)
-        pop_recs = self.popularity_based_recommendations(user_id, 20)
+        component_recs, dropped = self._run_hybrid_components(user_id, deadline)
         
-        # Combine with weighted scoring
-        combined_scores = {}
+        with span('fusion'):
+            weights = self._renormalized_weights(component_recs)
+            sorted_recommendations = self._fuse_scores(component_recs, weights)
         
-        # Collaborative Filtering
-        for movie_id, score in cf_recs:
-            combined_scores[movie_id] = combined_scores.get(movie_id, 0) + \
-                                      score * self.algorithm_weights['collaborative_filtering']
+        with span('movie_info'):
+            final_recommendations = self._enrich_hybrid_results(
+                sorted_recommendations[:n_recommendations], component_recs, weights
+            )
         
-        # Content-Based
-        for movie_id, score in content_recs:
-            combined_scores[movie_id] = combined_scores.get(movie_id, 0) + \
-                                      score * self.algorithm_weights['content_based']
+        self._log_performance('hybrid', (datetime.now() - start_time).total_seconds())
+        logger.info(f"✅ Generated {len(final_recommendations)} hybrid recommendations")
+        report = {
+            'components_used': [c for c in HYBRID_FUSION_ORDER if c in component_recs],
+            'components_dropped': dropped,
+            'remaining_ms': None if deadline is None else round((deadline - time.monotonic()) * 1000, 1),
+        }
+        return final_recommendations, report
+
+    def _run_hybrid_components(self, user_id: int, deadline: Optional[float]):
+        """Bileşenleri sırayla, bütçe payları ile çalıştır; (sonuçlar, düşenler) döndürür"""
+        component_methods = {
+            'collaborative_filtering': (self.collaborative_filtering_recommendations, 'cf'),
+            'content_based': (self.content_based_recommendations, 'content'),
+            'matrix_factorization': (self.matrix_factorization_recommendations, 'mf'),
+            'popularity_based': (self.popularity_based_recommendations, 'popularity'),
+        }
+        component_recs, dropped = {}, {}
+        
+        for i, component in enumerate(HYBRID_COMPONENT_ORDER):
+            method, span_name = component_methods[component]
+            component_deadline = None
+            if deadline is not None and component != FLOOR_COMPONENT:
+                remaining_shares = sum(COMPONENT_BUDGET_SHARES[c] for c in HYBRID_COMPONENT_ORDER[i:])
+                # Kalan süre (füzyon payı hariç) kalan bileşenlere paylarına göre dağıtılır
+                remaining = (deadline - time.monotonic()) * (1 - FUSION_BUDGET_SHARE)
+                if remaining <= 0:
+                    dropped[component] = 'budget_exhausted'
+                    HYBRID_COMPONENT_DROPPED.labels(component, 'budget_exhausted').inc()
+                    continue
+                component_deadline = time.monotonic() + remaining * COMPONENT_BUDGET_SHARES[component] / remaining_shares
+            
+            token = _component_deadline.set(component_deadline)
+            try:
+                with span(span_name):
+                    recs = method(user_id, 20)
+            except DeadlineExceeded:
+                dropped[component] = 'timeout'
+                HYBRID_COMPONENT_DROPPED.labels(component, 'timeout').inc()
+                continue
+            finally:
+                _component_deadline.reset(token)
+            
+            if component_deadline is not None and time.monotonic() > component_deadline:
+                # Kooperatif kontrolü olmayan kısım bütçeyi aştı
+                dropped[component] = 'over_budget'
+                HYBRID_COMPONENT_DROPPED.labels(component, 'over_budget').inc()
+                continue
+            component_recs[component] = recs
         
-        # Matrix Factorization
-        for movie_id, score in mf_recs:
-            combined_scores[movie_id] = combined_scores.get(movie_id, 0) + \
-                                      score * self.algorithm_weights['matrix_factorization']
+        return component_recs, dropped
+
+    def _renormalized_weights(self, component_recs: Dict[str, List]) -> Dict[str, float]:
+        """Düşen bileşen yoksa ağırlıklar aynen; varsa kalanlar toplam ağırlığı koruyacak şekilde ölçeklenir"""
+        weights = {c: self.algorithm_weights[c] for c in component_recs}
+        finished = sum(weights.values())
+        total = sum(self.algorithm_weights[c] for c in HYBRID_COMPONENT_ORDER)
+        if finished <= 0 or len(component_recs) == len(HYBRID_COMPONENT_ORDER):
+            return weights
+        return {c: w * total / finished for c, w in weights.items()}
+
+    def _fuse_scores(self, component_recs: Dict[str, List], weights: Dict[str, float]) -> List[Tuple[int, float]]:
+        """Weighted fusion of component scores, sorted by combined score"""
+        combined_scores = {}
         
-        # Popularity-Based
-        for movie_id, score in pop_recs:
-            combined_scores[movie_id] = combined_scores.get(movie_id, 0) + \
-                                      score * self.algorithm_weights['popularity_based']
+        for component in HYBRID_FUSION_ORDER:
+            weight = weights.get(component)
+            if weight is None:
+                continue
+            for movie_id, score in component_recs[component]:
+                combined_scores[movie_id] = combined_scores.get(movie_id, 0) + score * weight
         
         # Sort by combined score
-        sorted_recommendations = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
+        return sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
+
+    def _enrich_hybrid_results(self, top_scores, component_recs: Dict[str, List],
+                               weights: Dict[str, float]) -> List[Dict]:
+        """Attach movie details and per-algorithm contributions"""
+        def contribution(component, movie_id):
+            return sum([score * weights[component]
+                        for mid, score in component_recs.get(component, ()) if mid == movie_id])
         
-        # Enrich with movie details
         final_recommendations = []
-        for movie_id, hybrid_score in sorted_recommendations[:n_recommendations]:
+        for movie_id, hybrid_score in top_scores:
             try:
-                movie_info = self.movies_df[self.movies_df['movie_id'] == movie_id].iloc[0]
-                
-                # Safe genre handling
-                genres = movie_info['genres_processed'] if 'genres_processed' in movie_info else []
-                genres_str = '|'.join(genres) if genres else "Unknown"
+                recommendation = self.movie_card(movie_id)
+                if recommendation is None:
+                    continue
                 
-                recommendation = {
-                    'movie_id': int(movie_id),
-                    'title': str(movie_info['title']),
-                    'genres': genres,  # Use processed genres list
-                    'genres_str': genres_str,  # String version for display
-                    'release_date': str(movie_info['release_date']) if pd.notna(movie_info['release_date']) else "Unknown",
-                    'avg_rating': float(movie_info['avg_rating']) if pd.notna(movie_info['avg_rating']) else 0.0,
-                    'popularity': int(movie_info['popularity']) if pd.notna(movie_info['popularity']) else 0,
+                recommendation.update({
                     'hybrid_score': float(hybrid_score),
                     'recommendation_method': 'Enhanced Hybrid v6.1',
                     'algorithm_breakdown': {
-                        'cf_contribution': sum([score * self.algorithm_weights['collaborative_filtering']
-                                              for mid, score in cf_recs if mid == movie_id]),
-                        'content_contribution': sum([score * self.algorithm_weights['content_based']
-                                                   for mid, score in content_recs if mid == movie_id]),
-                        'mf_contribution': sum([score * self.algorithm_weights['matrix_factorization']
-                                              for mid, score in mf_recs if mid == movie_id]),
-                        'popularity_contribution': sum([score * self.algorithm_weights['popularity_based']
-                                                      for mid, score in pop_recs if mid == movie_id])
+                        'cf_contribution': contribution('collaborative_filtering', movie_id),
+                        'content_contribution': contribution('content_based', movie_id),
+                        'mf_contribution': contribution('matrix_factorization', movie_id),
+                        'popularity_contribution': contribution('popularity_based', movie_id)
                     }
-                }
+                })
                 final_recommendations.append(recommendation)
                 
             except (IndexError, KeyError) as e:
                 logger.warning(f"Error enriching movie {movie_id}: {e}")
                 continue
         
-        logger.info(f"✅ Generated {len(final_recommendations)} hybrid recommendations")
         return final_recommendations
 
     def evaluate_recommendations(self, test_user_id: int, recommendations: List[Dict],
@@ -409,9 +632,12 @@ class EnhancedHybridRecommender:
             # Extract recommended movie IDs
             recommended_movies = [rec['movie_id'] for rec in recommendations]
             
+            movies_df, catalog_index, popularity, genre_bits = self._evaluation_catalog()
+            
             # Filter actual ratings to only include movies in our dataset
-            valid_actual_ratings = {mid: rating for mid, rating in actual_ratings.items() 
-                                  if mid in self.movies_df['movie_id'].values}
+            actual_ids = list(actual_ratings.keys())
+            in_catalog = catalog_index.get_indexer(actual_ids) >= 0 if actual_ids else np.array([], dtype=bool)
+            valid_actual_ratings = {mid: actual_ratings[mid] for mid, ok in zip(actual_ids, in_catalog) if ok}
             
             if not valid_actual_ratings:
                 # If no valid ratings, use dummy metrics
@@ -426,40 +652,20 @@ class EnhancedHybridRecommender:
                     execution_time=(datetime.now() - start_time).total_seconds()
                 )
             
-            # True Positives: Recommended movies that user actually liked (rating >= 4)
-            true_positives = len([mid for mid in recommended_movies
-                                if mid in valid_actual_ratings and valid_actual_ratings[mid] >= 4.0])
-            
-            # False Positives: Recommended movies that user didn't like (rating < 4)
-            false_positives = len([mid for mid in recommended_movies
-                                 if mid in valid_actual_ratings and valid_actual_ratings[mid] < 4.0])
-            
-            # False Negatives: Movies user liked but weren't recommended
-            all_liked_movies = [mid for mid, rating in valid_actual_ratings.items() if rating >= 4.0]
-            false_negatives = len([mid for mid in all_liked_movies if mid not in recommended_movies])
-            
-            # Calculate metrics with safe division
-            precision = true_positives / len(recommended_movies) if recommended_movies else 0
-            recall = true_positives / len(all_liked_movies) if all_liked_movies else 0
-            f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
-            
-            # Coverage: Percentage of items in catalog that can be recommended
-            total_movies = len(self.movies_df)
-            coverage = len(set(recommended_movies)) / total_movies
-            
-            # Diversity: Genre diversity in recommendations
-            genres_in_recs = set()
-            for rec in recommendations:
-                if rec.get('genres') and isinstance(rec['genres'], list):
-                    genres_in_recs.update(rec['genres'])
-            diversity = min(len(genres_in_recs) / 20, 1.0)  # Cap at 1.0
-            
-            # Novelty: Average inverse popularity
-            novelty_scores = []
-            for rec in recommendations:
-                popularity = rec.get('popularity', 1)
-                novelty_scores.append(1 / (popularity + 1))
-            novelty = np.mean(novelty_scores) if novelty_scores else 0.5
+            # Liked = rating >= 4; single-row batch through the vectorized kernel
+            liked_movies = [mid for mid, rating in valid_actual_ratings.items() if rating >= LIKED_THRESHOLD]
+            liked_cols = catalog_index.get_indexer(liked_movies) if liked_movies else np.array([], dtype=np.int64)
+            batch = batch_ranking_metrics(
+                recommendation_matrix([self._recommended_positions(catalog_index, recommended_movies)]),
+                np.zeros(len(liked_cols), dtype=np.int64), liked_cols,
+                len(catalog_index), popularity, genre_bits
+            )
+            precision = float(batch['precision'][0])
+            recall = float(batch['recall'][0])
+            f1 = float(batch['f1_score'][0])
+            coverage = float(batch['coverage'][0])
+            diversity = float(batch['diversity'][0])
+            novelty = float(batch['novelty'][0])
             
             execution_time = (datetime.now() - start_time).total_seconds()
             
@@ -490,8 +696,9 @@ class EnhancedHybridRecommender:
                 execution_time=(datetime.now() - start_time).total_seconds()
             )
 
-    def ab_test_algorithms(self, test_users: List[int], n_recommendations: int = 10) -> Dict:
-        """Enhanced A/B Testing with better error handling"""
+    def ab_test_algorithms(self, test_users: List[int], n_recommendations: int = 10,
+                           progress: Optional[Callable[[float, str], None]] = None) -> Dict:
+        """Enhanced A/B Testing with better error handling (progress(fraction, message) per user)"""
         logger.info(f"🧪 Starting A/B test with {len(test_users)} users")
         
         algorithms = {
@@ -503,59 +710,56 @@ class EnhancedHybridRecommender:
         }
         
         results = {}
+        total_steps = max(1, len(algorithms) * len(test_users))
         
-        for algorithm_name, algorithm_func in algorithms.items():
+        for algorithm_index, (algorithm_name, algorithm_func) in enumerate(algorithms.items()):
             logger.info(f"🔄 Testing {algorithm_name}...")
             
-            algorithm_metrics = []
+            evaluated_users = []
+            evaluated_recs = []
+            execution_times = []
             
-            for user_id in test_users:
+            for user_index, user_id in enumerate(test_users):
+                if progress is not None:
+                    progress((algorithm_index * len(test_users) + user_index) / total_steps,
+                             f"{algorithm_name}: user {user_index + 1}/{len(test_users)}")
                 try:
                     # Get recommendations
+                    start_time = datetime.now()
                     recommendations = algorithm_func(user_id, n_recommendations)
                     
                     if not recommendations:
                         continue
                     
-                    # Get user's actual ratings for evaluation
-                    if user_id in self.user_movie_matrix.index:
-                        user_ratings = self.user_movie_matrix.loc[user_id].dropna().to_dict()
-                    else:
-                        user_ratings = {}
-                    
-                    # Evaluate
-                    metrics = self.evaluate_recommendations(user_id, recommendations, user_ratings)
-                    algorithm_metrics.append(metrics)
+                    evaluated_users.append(user_id)
+                    evaluated_recs.append(recommendations)
+                    execution_times.append((datetime.now() - start_time).total_seconds())
                     
                 except Exception as e:
                     logger.warning(f"⚠️ Error testing {algorithm_name} for user {user_id}: {e}")
                     continue
             
-            # Aggregate metrics
-            if algorithm_metrics:
-                avg_precision = np.mean([m.precision for m in algorithm_metrics])
-                avg_recall = np.mean([m.recall for m in algorithm_metrics])
-                avg_f1 = np.mean([m.f1_score for m in algorithm_metrics])
-                avg_coverage = np.mean([m.coverage for m in algorithm_metrics])
-                avg_diversity = np.mean([m.diversity for m in algorithm_metrics])
-                avg_novelty = np.mean([m.novelty for m in algorithm_metrics])
-                avg_execution_time = np.mean([m.execution_time for m in algorithm_metrics])
+            # Evaluate all users of this algorithm in one vectorized batch
+            if evaluated_users:
+                metrics = self.evaluate_batch(evaluated_users, evaluated_recs)
                 
                 results[algorithm_name] = {
-                    'precision': avg_precision,
-                    'recall': avg_recall,
-                    'f1_score': avg_f1,
-                    'coverage': avg_coverage,
-                    'diversity': avg_diversity,
-                    'novelty': avg_novelty,
-                    'execution_time': avg_execution_time,
-                    'test_users': len(algorithm_metrics)
+                    'precision': float(metrics['precision'].mean()),
+                    'recall': float(metrics['recall'].mean()),
+                    'f1_score': float(metrics['f1_score'].mean()),
+                    'ndcg': float(metrics['ndcg'].mean()),
+                    'coverage': float(metrics['coverage'].mean()),
+                    'diversity': float(metrics['diversity'].mean()),
+                    'novelty': float(metrics['novelty'].mean()),
+                    'execution_time': float(np.mean(execution_times)),
+                    'test_users': len(evaluated_users)
                 }
             else:
                 results[algorithm_name] = {
                     'precision': 0.0,
                     'recall': 0.0,
                     'f1_score': 0.0,
+                    'ndcg': 0.0,
                     'coverage': 0.0,
                     'diversity': 0.0,
                     'novelty': 0.0,
@@ -567,6 +771,69 @@ class EnhancedHybridRecommender:
         logger.info("✅ A/B testing completed")
         return results
 
+    def _evaluation_catalog(self):
+        """Catalog-aligned arrays (movie index, popularity, genre bitmask) for metric kernels"""
+        if self._eval_catalog is None or self._eval_catalog[0] is not self.movies_df:
+            catalog_index = pd.Index(self.movies_df['movie_id'])
+            popularity = self.movies_df['popularity'].fillna(0).to_numpy(dtype=float)
+            self._eval_catalog = (self.movies_df, catalog_index, popularity, self.movie_genre_bits)
+        return self._eval_catalog
+
+    def _recommended_positions(self, catalog_index: pd.Index, movie_ids: List[int]) -> np.ndarray:
+        """Kernel indices of recommended movies; ids missing from the catalog still count as recommended"""
+        if not movie_ids:
+            return np.array([], dtype=np.int64)
+        return catalog_positions(catalog_index.get_indexer(movie_ids), movie_ids, len(catalog_index))
+
+    def _liked_pairs(self, user_ids: List[int], catalog_index: pd.Index, chunk_size: int = 1000):
+        """
+        (row, catalog_idx) pairs of movies each user rated >= 4, read in row chunks,
+        plus a per-row flag for users with at least one rating inside the catalog
+        """
+        matrix = self.user_movie_matrix
+        values = matrix.to_numpy(dtype=float, copy=False)
+        row_pos = matrix.index.get_indexer(user_ids)
+        col_map = catalog_index.get_indexer(matrix.columns)
+        catalog_cols = np.flatnonzero(col_map >= 0)
+        all_in_catalog = len(catalog_cols) == len(col_map)
+        col_map = col_map[catalog_cols]
+        
+        rows_out, cols_out = [], []
+        has_ratings = np.zeros(len(user_ids), dtype=bool)
+        for offset in range(0, len(user_ids), chunk_size):
+            positions = row_pos[offset:offset + chunk_size]
+            present = np.flatnonzero(positions >= 0)
+            if len(present) == 0:
+                continue
+            block = values[positions[present]]
+            if not all_in_catalog:
+                block = block[:, catalog_cols]
+            has_ratings[present + offset] = ~np.isnan(block).all(axis=1)
+            with np.errstate(invalid='ignore'):
+                rows, cols = np.nonzero(block >= LIKED_THRESHOLD)
+            rows_out.append(present[rows] + offset)
+            cols_out.append(col_map[cols])
+        
+        if not rows_out:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64), has_ratings
+        return np.concatenate(rows_out), np.concatenate(cols_out), has_ratings
+
+    def evaluate_batch(self, user_ids: List[int], recommendations_per_user: List[List[Dict]]) -> Dict[str, np.ndarray]:
+        """
+        Vectorized evaluation of many users against their rating-matrix ground truth;
+        same numbers as evaluate_recommendations per user, including its fixed
+        metrics for users without any rating in the catalog
+        """
+        movies_df, catalog_index, popularity, genre_bits = self._evaluation_catalog()
+        rec_idx = recommendation_matrix([
+            self._recommended_positions(catalog_index, [rec['movie_id'] for rec in recs])
+            for recs in recommendations_per_user
+        ])
+        liked_rows, liked_cols, has_ratings = self._liked_pairs(user_ids, catalog_index)
+        metrics = batch_ranking_metrics(rec_idx, liked_rows, liked_cols,
+                                        len(catalog_index), popularity, genre_bits)
+        return apply_no_ratings_fallback(metrics, ~has_ratings)
+
     def _wrap_algorithm_for_testing(self, algorithm_func):
         """Wrap single algorithm functions to return proper format for testing"""
         def wrapper(user_id: int, n_recommendations: int = 10):
@@ -576,18 +843,15 @@ class EnhancedHybridRecommender:
                 
                 for movie_id, score in recs:
                     try:
-                        movie_info = self.movies_df[self.movies_df['movie_id'] == movie_id].iloc[0]
-                        
-                        # Safe genre handling
-                        genres = movie_info['genres_processed'] if 'genres_processed' in movie_info else []
+                        card = self.movie_cards[int(movie_id)]
                         
                         rec = {
-                            'movie_id': int(movie_id),
-                            'title': str(movie_info['title']),
-                            'genres': genres,
+                            'movie_id': card['movie_id'],
+                            'title': card['title'],
+                            'genres': card['genres'],
                             'hybrid_score': float(score),
-                            'avg_rating': float(movie_info['avg_rating']) if pd.notna(movie_info['avg_rating']) else 0.0,
-                            'popularity': int(movie_info['popularity']) if pd.notna(movie_info['popularity']) else 0
+                            'avg_rating': card['avg_rating'],
+                            'popularity': card['popularity']
                         }
                         formatted_recs.append(rec)
                     except (IndexError, KeyError):
@@ -600,28 +864,32 @@ class EnhancedHybridRecommender:
         
         return wrapper
 
+    def _compute_matrix_stats(self):
+        # Tam matris taraması yalnızca yüklemede: /analytics her istekte tekrar saymasın
+        total_ratings = int(self.user_movie_matrix.count().sum())
+        matrix_size = self.user_movie_matrix.size
+        sparsity = (1 - total_ratings / matrix_size) * 100 if matrix_size else 0.0
+        self.matrix_stats = {'total_ratings': total_ratings, 'matrix_sparsity': round(sparsity, 2)}
+
     def get_performance_analytics(self) -> Dict:
         """Enhanced analytics with better data handling"""
         try:
-            total_ratings = self.user_movie_matrix.count().sum()
-            matrix_size = self.user_movie_matrix.size
-            sparsity = (self.user_movie_matrix.isnull().sum().sum() / matrix_size) * 100
-            
+            hybrid_quality = self.ab_test_results.get('hybrid_v6', {})
             analytics = {
                 'system_overview': {
                     'total_users': len(self.users_df) if self.users_df is not None else 0,
                     'total_movies': len(self.movies_df) if self.movies_df is not None else 0,
-                    'total_ratings': int(total_ratings),
-                    'matrix_sparsity': round(sparsity, 2),
+                    'total_ratings': self.matrix_stats['total_ratings'],
+                    'matrix_sparsity': self.matrix_stats['matrix_sparsity'],
                     'system_version': 'Enhanced Hybrid v6.1'
                 },
                 'algorithm_weights': self.algorithm_weights,
-                'recent_performance': self.performance_metrics[-50:] if self.performance_metrics else [],
+                'recent_performance': self.latency_tracker.snapshot(),
                 'ab_test_results': self.ab_test_results,
                 'recommendation_quality': {
-                    'avg_precision': np.mean([m.precision for m in self.performance_metrics[-20:]]) if len(self.performance_metrics) >= 20 else 0,
-                    'avg_recall': np.mean([m.recall for m in self.performance_metrics[-20:]]) if len(self.performance_metrics) >= 20 else 0,
-                    'avg_f1_score': np.mean([m.f1_score for m in self.performance_metrics[-20:]]) if len(self.performance_metrics) >= 20 else 0
+                    'avg_precision': hybrid_quality.get('precision', 0),
+                    'avg_recall': hybrid_quality.get('recall', 0),
+                    'avg_f1_score': hybrid_quality.get('f1_score', 0)
                 }
             }
             
@@ -630,8 +898,9 @@ class EnhancedHybridRecommender:
             logger.error(f"Analytics generation error: {e}")
             return {'error': str(e)}
 
-    def optimize_algorithm_weights(self, test_users: List[int]):
-        """Enhanced weight optimization"""
+    def optimize_algorithm_weights(self, test_users: List[int],
+                                   progress: Optional[Callable[[float, str], None]] = None) -> Dict:
+        """Enhanced weight optimization; returns the chosen weights and their F1"""
         logger.info("🎯 Optimizing algorithm weights...")
         
         best_weights = self.algorithm_weights.copy()
@@ -646,30 +915,32 @@ class EnhancedHybridRecommender:
             {'collaborative_filtering': 0.5, 'content_based': 0.2, 'matrix_factorization': 0.2, 'popularity_based': 0.1}
         ]
         
-        for weights in weight_combinations:
+        total_steps = max(1, len(weight_combinations) * len(test_users))
+        
+        for combination_index, weights in enumerate(weight_combinations):
             self.algorithm_weights = weights
             
-            total_f1 = 0
-            valid_tests = 0
+            evaluated_users = []
+            evaluated_recs = []
             
-            for user_id in test_users:
+            for user_index, user_id in enumerate(test_users):
+                if progress is not None:
+                    progress((combination_index * len(test_users) + user_index) / total_steps,
+                             f"weights {combination_index + 1}/{len(weight_combinations)}: "
+                             f"user {user_index + 1}/{len(test_users)}")
                 try:
                     recommendations = self.hybrid_recommendations(user_id, 10)
                     if not recommendations:
                         continue
-                    
-                    if user_id in self.user_movie_matrix.index:
-                        user_ratings = self.user_movie_matrix.loc[user_id].dropna().to_dict()
-                    else:
-                        user_ratings = {}
-                    
-                    metrics = self.evaluate_recommendations(user_id, recommendations, user_ratings)
-                    total_f1 += metrics.f1_score
-                    valid_tests += 1
+                    evaluated_users.append(user_id)
+                    evaluated_recs.append(recommendations)
                 except:
                     continue
             
-            avg_f1 = total_f1 / valid_tests if valid_tests > 0 else 0
+            if evaluated_users:
+                avg_f1 = float(self.evaluate_batch(evaluated_users, evaluated_recs)['f1_score'].mean())
+            else:
+                avg_f1 = 0
             
             if avg_f1 > best_f1_score:
                 best_f1_score = avg_f1
@@ -677,20 +948,12 @@ class EnhancedHybridRecommender:
         
         self.algorithm_weights = best_weights
         logger.info(f"✅ Optimized weights: {best_weights}, F1: {best_f1_score:.3f}")
+        return {'weights': best_weights, 'f1_score': best_f1_score}
 
-    def _log_performance(self, algorithm: str, execution_time: float):
-        """Log performance metrics"""
-        metric = RecommendationMetrics(
-            algorithm=algorithm,
-            precision=0,  # Will be filled by evaluation
-            recall=0,
-            f1_score=0,
-            coverage=0,
-            diversity=0,
-            novelty=0,
-            execution_time=execution_time
-        )
-        self.performance_metrics.append(metric)
+    def _log_performance(self, algorithm: str, execution_time: float, error: bool = False):
+        """Record execution time in the bounded per-algorithm histogram"""
+        self.latency_tracker.record(algorithm, execution_time, error)
+        observe_recommendation(algorithm, execution_time, error)
 
     def validate_system_requirements(self):
         """Sistem gereksinimlerini kontrol et"""
@@ -698,8 +961,8 @@ class EnhancedHybridRecommender:
         
         try:
             import os
-            if not os.path.exists('user_movie_matrix.pkl'):
-                logger.error("❌ user_movie_matrix.pkl file not found!")
+            if not os.path.exists(self.matrix_path):
+                logger.error(f"❌ {self.matrix_path} file not found!")
                 return False
         except Exception as e:
             logger.error(f"❌ File check failed: {e}")
@@ -719,6 +982,7 @@ class EnhancedHybridRecommender:
     def initialize_system(self):
         """🚀 Complete System Initialization"""
         logger.info("🚀 Initializing Enhanced Hybrid Recommendation System v6.1")
+        start_time = datetime.now()
         
         if not self.validate_system_requirements():
             logger.error("❌ System requirements validation failed!")
@@ -730,46 +994,93 @@ class EnhancedHybridRecommender:
         
         self.prepare_content_similarity()
         self.prepare_matrix_factorization()
+        self.prepare_fallback_lists()
+        
+        self.model_version = f"v6.1-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        set_model_version(self.model_version, (datetime.now() - start_time).total_seconds())
         
-        logger.info("✅ System initialization completed!")
+        logger.info(f"✅ System initialization completed! (model {self.model_version})")
         return True
 
 # 🔧 ENHANCED FASTAPI INTEGRATION
 class EnhancedRecommendationAPI:
-    """FastAPI integration for Enhanced Hybrid Recommender"""
+    """
+    FastAPI integration for Enhanced Hybrid Recommender
+
+    Interactive calls run on `executor`; long batch jobs (A/B tests, weight
+    optimization) run as background jobs in separate worker processes
+    (jobs.JobRunner) so they cannot take the threads that serve
+    recommendation requests. Concurrent
+    identical recommendation requests and cold-start initialize() calls are
+    coalesced into a single computation.
+    """
     
-    def __init__(self):
+    def __init__(self, executor=cpu_executor):
         self.recommender = EnhancedHybridRecommender()
+        self.executor = executor
         self.is_initialized = False
+        self._init_flight = SingleFlight('initialize')
+        self._recommendation_flight = SingleFlight('recommendations')
 
     async def initialize(self):
-        """Initialize the recommendation system"""
-        if not self.is_initialized:
-            success = self.recommender.initialize_system()
-            self.is_initialized = success
-            return success
-        return True
+        """Initialize the recommendation system (off the event loop, once)"""
+        if self.is_initialized:
+            return True
+        # Cold start'ta eşzamanlı istekler tek initialize_system() çalıştırmasını bekler
+        return await self._init_flight.do('initialize', self._initialize)
+
+    async def _initialize(self):
+        with span('initialize'):
+            self.is_initialized = await self.executor.run(self.recommender.initialize_system)
+        return self.is_initialized
+
+    async def coalesce_recommendations(self, user_id: int, algorithm: str,
+                                       n_recommendations: int, compute, deadline_ms: Optional[float] = None):
+        """Aynı (user, algorithm, n, model version, bütçe) için eşzamanlı istekler tek hesaplamayı paylaşır"""
+        key = (user_id, algorithm, n_recommendations, self.recommender.model_version, deadline_ms)
+        return await self._recommendation_flight.do(key, compute)
 
     async def get_hybrid_recommendations(self, user_id: int, n_recommendations: int = 10):
         """Get hybrid recommendations for a user"""
         if not await self.initialize():
             raise Exception("System not initialized")
         
-        return self.recommender.hybrid_recommendations(user_id, n_recommendations)
+        return await self.executor.run(self.recommender.hybrid_recommendations, user_id, n_recommendations)
 
-    async def get_performance_analytics(self):
-        """Get system performance analytics"""
+    async def get_hybrid_recommendations_with_report(self, user_id: int, n_recommendations: int = 10,
+                                                     deadline: Optional[float] = None):
+        """Hybrid recommendations + component report; deadline is an absolute time.monotonic()"""
+        if not await self.initialize():
+            raise Exception("System not initialized")
+        
+        return await self.executor.run(
+            self.recommender.hybrid_recommendations_with_report, user_id, n_recommendations, deadline
+        )
+
+    async def run_algorithm(self, method, *args):
+        """Run any recommender method on the interactive executor"""
         if not await self.initialize():
             raise Exception("System not initialized")
         
-        return self.recommender.get_performance_analytics()
+        return await self.executor.run(method, *args)
 
-    async def run_ab_test(self, test_users: List[int]):
-        """Run A/B test comparison"""
+    async def get_performance_analytics(self):
+        """Get system performance analytics"""
         if not await self.initialize():
             raise Exception("System not initialized")
         
-        return self.recommender.ab_test_algorithms(test_users)
+        return await self.executor.run(self.recommender.get_performance_analytics)
+
+    # Job success hook'ları (jobs.JobRunner.on_success): iş worker process'te kendi
+    # recommender kopyasında çalışır, sonuç burada serving model'e uygulanır
+    def apply_optimized_weights(self, result: Dict):
+        self.recommender.algorithm_weights = result['new_weights']
+        logger.info(f"🎯 Serving weights updated: {result['new_weights']}")
+
+    def apply_ab_test_results(self, result: Dict):
+        # /analytics serving model'den okur
+        self.recommender.ab_test_results = result['results']
+        logger.info(f"🧪 A/B test results updated (best: {result['best_algorithm']})")
 
 def create_sample_data_if_needed():
     """Eğer gerekli dosyalar yoksa örnek veri oluştur"""
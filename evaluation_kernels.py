@@ -0,0 +1,120 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Eski evaluate_recommendations ile aynı eşikler
+LIKED_THRESHOLD = 4.0
+GENRE_DIVERSITY_NORM = 20
+# Katalogda puanı olmayan kullanıcı için eski evaluate_recommendations'ın sabit değerleri
+NO_RATINGS_METRICS = {'precision': 0.0, 'recall': 0.0, 'f1_score': 0.0, 'ndcg': 0.0,
+                      'coverage': 0.1, 'diversity': 0.5, 'novelty': 0.5}
+# Popülerliği bilinmeyen (katalog dışı) öneri: eski rec.get('popularity', 1) varsayılanı
+UNKNOWN_ITEM_POPULARITY = 1.0
+
+
+def recommendation_matrix(rec_item_lists: List[Sequence[int]], pad: int = -1) -> np.ndarray:
+    """Değişken uzunluklu öneri listelerini (n_users, k) int64 matrise çevir (-1 dolgu)"""
+    k = max((len(r) for r in rec_item_lists), default=0)
+    matrix = np.full((len(rec_item_lists), max(k, 1)), pad, dtype=np.int64)
+    for row, items in enumerate(rec_item_lists):
+        if len(items):
+            matrix[row, :len(items)] = items
+    return matrix
+
+
+def catalog_positions(positions: np.ndarray, item_ids: Sequence[int], n_items: int) -> np.ndarray:
+    """
+    get_indexer çıktısı -> kernel indeksleri: katalogda olmayan id'ler (-1) n_items'tan
+    başlayan, id başına ayrı indekslere taşınır (önerilmiş sayılır, hiç isabet etmez)
+    """
+    positions = np.asarray(positions, dtype=np.int64).copy()
+    unknown = positions < 0
+    if unknown.any():
+        _, codes = np.unique(np.asarray(item_ids)[unknown], return_inverse=True)
+        positions[unknown] = n_items + codes
+    return positions
+
+
+def apply_no_ratings_fallback(metrics: Dict[str, np.ndarray], no_ratings: np.ndarray) -> Dict[str, np.ndarray]:
+    """Katalogda hiç puanı olmayan satırlara eski sabit metrikleri yaz"""
+    if no_ratings.any():
+        for name, value in NO_RATINGS_METRICS.items():
+            metrics[name] = np.where(no_ratings, value, metrics[name])
+    return metrics
+
+
+def batch_ranking_metrics(rec_idx: np.ndarray, liked_rows: np.ndarray, liked_cols: np.ndarray,
+                          n_items: int, item_popularity: np.ndarray,
+                          item_genre_bits: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    🧮 Precision/recall/F1/NDCG/coverage/diversity/novelty for a batch of users
+
+    rec_idx:   (n_users, k) catalog indices of recommended items, -1 = padding;
+               indices >= n_items are items outside the catalog (see catalog_positions)
+    liked_*:   (row, item) pairs of relevant items (rating >= LIKED_THRESHOLD)
+    Returns one array per metric, aligned with the rows of rec_idx. As in the
+    old per-user loop, precision and coverage count every recommended entry,
+    including ones outside the catalog; those never hit, add no genres and
+    count with UNKNOWN_ITEM_POPULARITY for novelty.
+    """
+    n_users, k = rec_idx.shape
+    valid = rec_idx >= 0
+    in_catalog = valid & (rec_idx < n_items)
+    safe_idx = np.where(in_catalog, rec_idx, 0)
+
+    # İlgili (user, item) çiftleri: sıralı anahtar dizisi üzerinde searchsorted
+    relevant_keys = np.unique(liked_rows.astype(np.int64) * n_items + liked_cols)
+    rec_keys = np.arange(n_users, dtype=np.int64)[:, None] * n_items + safe_idx
+    if len(relevant_keys):
+        pos = np.searchsorted(relevant_keys, rec_keys).clip(0, len(relevant_keys) - 1)
+        hits = in_catalog & (relevant_keys[pos] == rec_keys)
+    else:
+        hits = np.zeros_like(valid)
+
+    n_relevant = np.bincount((relevant_keys // n_items).astype(np.int64), minlength=n_users)[:n_users]
+    n_recommended = valid.sum(axis=1)
+    true_positives = hits.sum(axis=1)
+
+    precision = np.divide(true_positives, n_recommended,
+                          out=np.zeros(n_users), where=n_recommended > 0)
+    recall = np.divide(true_positives, n_relevant,
+                       out=np.zeros(n_users), where=n_relevant > 0)
+    denom = precision + recall
+    f1 = np.divide(2 * precision * recall, denom, out=np.zeros(n_users), where=denom > 0)
+
+    # NDCG@k (ikili relevance)
+    discounts = 1.0 / np.log2(np.arange(k) + 2.0)
+    dcg = (hits * discounts).sum(axis=1)
+    ideal_cum = np.concatenate(([0.0], np.cumsum(discounts)))
+    idcg = ideal_cum[np.minimum(n_relevant, k)]
+    ndcg = np.divide(dcg, idcg, out=np.zeros(n_users), where=idcg > 0)
+
+    # Coverage: kullanıcı başına tekil öneri / katalog boyutu
+    sorted_idx = np.sort(np.where(valid, rec_idx, -1), axis=1)
+    unique_counts = (sorted_idx[:, :1] >= 0).sum(axis=1) + \
+        ((np.diff(sorted_idx, axis=1) != 0) & (sorted_idx[:, 1:] >= 0)).sum(axis=1)
+    coverage = unique_counts / max(n_items, 1)
+
+    # Diversity: önerilerin tür bitmask'lerinin OR'u -> popcount
+    genre_union = np.bitwise_or.reduce(
+        np.where(in_catalog, item_genre_bits[safe_idx], np.uint32(0)), axis=1
+    )
+    diversity = np.minimum(np.bitwise_count(genre_union) / GENRE_DIVERSITY_NORM, 1.0)
+
+    # Novelty: ortalama 1 / (popularity + 1)
+    inv_pop = np.where(in_catalog, 1.0 / (item_popularity[safe_idx] + 1.0),
+                       np.where(valid, 1.0 / (UNKNOWN_ITEM_POPULARITY + 1.0), 0.0))
+    novelty = np.divide(inv_pop.sum(axis=1), n_recommended,
+                        out=np.full(n_users, 0.5), where=n_recommended > 0)
+
+    return {
+        'precision': precision,
+        'recall': recall,
+        'f1_score': f1,
+        'ndcg': ndcg,
+        'coverage': coverage,
+        'diversity': diversity,
+        'novelty': novelty,
+        'genre_coverage': np.bitwise_count(genre_union).astype(np.int64),
+        'n_relevant': n_relevant,
+    }
@@ -0,0 +1,171 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_metrics import EXECUTOR_ACTIVE, EXECUTOR_QUEUE_DEPTH, EXECUTOR_REJECTED, EXECUTOR_WAIT
+
+# Thread sayıları env ile ayarlanabilir
+DB_THREADS = int(os.environ.get('DB_EXECUTOR_THREADS', '8'))
+CPU_THREADS = int(os.environ.get('CPU_EXECUTOR_THREADS', str(min(4, os.cpu_count() or 1))))
+DEFAULT_MAX_QUEUE = int(os.environ.get('EXECUTOR_MAX_QUEUE', '64'))
+WAIT_EWMA_ALPHA = 0.2  # queue_delay() için kuyruk bekleme süresinin üstel ortalaması
+EXECUTOR_RETRY_AFTER_SECONDS = int(os.environ.get('EXECUTOR_RETRY_AFTER_SECONDS', '1'))
+
+
+class ExecutorBusy(Exception):
+    """Çalışan + kuyruktaki iş limitte: çağrı beklemeden reddedilir (handler 503 döner)"""
+
+
+class BoundedExecutor:
+    """
+    ⚙️ Thread pool with a bound on running + queued work
+
+    Blocking calls (sync SQLAlchemy, sqlite3, pandas, recommender math) run
+    here instead of on the event loop. When max_workers + max_queue calls are
+    in flight, further calls are rejected at once with ExecutorBusy (503 via
+    install_busy_handler) rather than waiting, so a burst grows neither the
+    pool's queue nor the number of parked requests. The caller's
+    contextvars (e.g. the active trace) are copied into the worker thread.
+    Queue depth, active workers, submit-to-start wait and rejections are
+    exported per executor name.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int = DEFAULT_MAX_QUEUE):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        # Semaphore event loop'a bağlıdır; loop başına bir tane
+        self._slots = weakref.WeakKeyDictionary()
+
+        self._queued = 0
+        self._active = 0
+        self._wait_ewma = 0.0
+        self._waiting = {}  # ticket id -> submit zamanı (ekleme sırası = en eski başta)
+        self._counter_lock = threading.Lock()
+        self._queue_gauge = EXECUTOR_QUEUE_DEPTH.labels(name)
+        self._active_gauge = EXECUTOR_ACTIVE.labels(name)
+        self._wait_histogram = EXECUTOR_WAIT.labels(name)
+        self._rejected = EXECUTOR_REJECTED.labels(name)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._slots.get(loop)
+        if semaphore is None:
+            semaphore = self._slots[loop] = asyncio.Semaphore(self.max_workers + self.max_queue)
+        return semaphore
+
+    def _claim(self, ticket: list, by_worker: bool) -> bool:
+        # ticket[0]: None -> henüz sahipsiz; worker başlatır ya da iptal eden çağıran geri alır
+        with self._counter_lock:
+            if ticket[0] is not None:
+                return False
+            ticket[0] = by_worker
+            self._queued -= 1
+            submitted_at = self._waiting.pop(id(ticket), None)
+            if by_worker:
+                self._active += 1
+                if submitted_at is not None:
+                    wait = time.perf_counter() - submitted_at
+                    self._wait_ewma += WAIT_EWMA_ALPHA * (wait - self._wait_ewma)
+        self._queue_gauge.dec()
+        if by_worker:
+            self._active_gauge.inc()
+        return True
+
+    def _run_in_worker(self, submitted_at: float, ticket: list, call):
+        if not self._claim(ticket, by_worker=True):
+            return None  # çağıran iptal etti
+        # Kuyrukta bekleme süresi: submit -> worker thread'de başlama
+        self._wait_histogram.observe(time.perf_counter() - submitted_at)
+        try:
+            return call()
+        finally:
+            with self._counter_lock:
+                self._active -= 1
+            self._active_gauge.dec()
+
+    async def run(self, func, *args, **kwargs):
+        """func(*args, **kwargs)'ı havuzda çalıştır ve sonucu bekle (slot yoksa ExecutorBusy)"""
+        semaphore = self._semaphore()
+        if semaphore.locked():
+            self._rejected.inc()
+            raise ExecutorBusy(f"{self.name} executor is full ({self.max_workers + self.max_queue} calls in flight)")
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        submitted_at = time.perf_counter()
+        ticket = [None]
+        with self._counter_lock:
+            self._queued += 1
+            self._waiting[id(ticket)] = submitted_at
+        self._queue_gauge.inc()
+        try:
+            # Boş slot var: acquire beklemeden döner
+            async with semaphore:
+                return await asyncio.get_running_loop().run_in_executor(
+                    self._pool, self._run_in_worker, submitted_at, ticket, call
+                )
+        finally:
+            # İptal / hata: worker hiç başlamadıysa kuyruk sayacını geri al
+            self._claim(ticket, by_worker=False)
+
+    def queue_delay(self) -> float:
+        """Kuyruk gecikmesi tahmini (saniye): ortalama bekleme ya da en eski bekleyen işin yaşı"""
+        with self._counter_lock:
+            oldest = next(iter(self._waiting.values()), None)
+            ewma = self._wait_ewma
+            saturated = self._active >= self.max_workers
+        if oldest is None:
+            # Bekleyen yok: boş worker varsa yeni iş hemen başlar
+            return ewma if saturated else 0.0
+        return max(ewma, time.perf_counter() - oldest)
+
+    def stats(self) -> dict:
+        return {
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'active': self._active,
+            'queued': self._queued,
+            'queue_delay_ms': round(self.queue_delay() * 1000, 1),
+        }
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+
+# Global havuzlar: I/O (DB, dosya) ve CPU (interaktif öneri hesapları) ayrı tutulur
+# (uzun batch işleri jobs.py'deki process pool'da çalışır)
+db_executor = BoundedExecutor('db', DB_THREADS)
+cpu_executor = BoundedExecutor('cpu', CPU_THREADS)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Bloklayan I/O çağrısı (sync DB session, sqlite3, pandas read_sql)"""
+    return await db_executor.run(func, *args, **kwargs)
+
+
+async def run_cpu(func, *args, **kwargs):
+    """CPU ağırlıklı çağrı (öneri algoritmaları, değerlendirme)"""
+    return await cpu_executor.run(func, *args, **kwargs)
+
+
+def install_busy_handler(app):
+    """FastAPI app'e ExecutorBusy -> 503 + Retry-After eşlemesini ekle"""
+    from fastapi import Request
+    from fastapi.responses import JSONResponse
+
+    @app.exception_handler(ExecutorBusy)
+    async def executor_busy_handler(request: Request, exc: ExecutorBusy):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Server busy, please retry"},
+            headers={"Retry-After": str(EXECUTOR_RETRY_AFTER_SECONDS)},
+        )
+
+
+def executor_stats() -> dict:
+    return {executor.name: executor.stats() for executor in (db_executor, cpu_executor)}
@@ -0,0 +1,218 @@
+import argparse
+import asyncio
+import csv
+import io
+import logging
+import os
+import sqlite3
+import sys
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Iterator, List, Optional, Sequence
+
+from analytics_counters import table_columns
+from executors import ExecutorBusy
+from json_fragments import dumps
+from sqlite_pool import DB_BUSY_TIMEOUT_MS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = 'movie_recommendation.db'
+# Blok boyutları env ile ayarlanabilir: bellek blok başına sabit kalır
+EXPORT_FETCH_ROWS = int(os.environ.get('EXPORT_FETCH_ROWS', '5000'))
+EXPORT_BLOCK_USERS = int(os.environ.get('EXPORT_BLOCK_USERS', '64'))
+EXPORT_BUSY_RETRY_SECONDS = 0.05
+
+EXPORT_MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+RATING_COLUMNS = ('user_id', 'movie_id', 'rating', 'rated_at')
+RECOMMENDATION_COLUMNS = ('user_id', 'rank', 'movie_id', 'title', 'score', 'algorithm')
+EXPORT_ALGORITHMS = ('hybrid', 'collaborative_filtering', 'content_based', 'matrix_factorization', 'popularity')
+
+
+class LineEncoder:
+    """Satır blokları -> NDJSON / CSV byte'ları (CSV'de başlık ilk parça)"""
+
+    def __init__(self, fmt: str, columns: Sequence[str]):
+        if fmt not in EXPORT_MEDIA_TYPES:
+            raise ValueError(f"Unknown export format: {fmt}")
+        self.fmt = fmt
+        self.columns = columns
+
+    def header(self) -> bytes:
+        return self._csv([self.columns]) if self.fmt == 'csv' else b''
+
+    def encode(self, rows: Iterable[tuple]) -> bytes:
+        if self.fmt == 'csv':
+            return self._csv(rows)
+        return b''.join(dumps(dict(zip(self.columns, row))) + b'\n' for row in rows)
+
+    @staticmethod
+    def _csv(rows: Iterable[Sequence]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerows(rows)
+        return buffer.getvalue().encode()
+
+
+# ---- Kaynaklar: blok blok satır üreten generator'lar ----
+
+def iter_rating_blocks(db_path: str = DEFAULT_DB_PATH, fetch_rows: int = EXPORT_FETCH_ROWS) -> Iterator[List[tuple]]:
+    """
+    Ratings as (user_id, movie_id, rating, rated_at) tuples, `fetch_rows` at a time
+
+    Uses its own read-only connection rather than the shared pool: a long
+    export holds its cursor (and WAL snapshot) for minutes and must not take
+    a slot from request handlers. Rows come from the cursor with fetchmany,
+    so memory does not grow with the table.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=DB_BUSY_TIMEOUT_MS / 1000,
+                           check_same_thread=False)  # Bloklar farklı executor thread'lerinde okunabilir
+    try:
+        # İki şema: ORM (created_at, movies.id) ve setup_complete_system (unix timestamp, movies.movie_id)
+        rating_columns = table_columns(conn, 'ratings')
+        if 'created_at' in rating_columns:
+            rated_at = "r.created_at"
+        elif 'timestamp' in rating_columns:
+            rated_at = "datetime(r.timestamp, 'unixepoch')"
+        else:
+            rated_at = "NULL"
+        join_column = 'id' if 'id' in table_columns(conn, 'movies') else 'movie_id'
+        cursor = conn.execute(
+            f"SELECT r.user_id, m.movie_id, r.rating, {rated_at} FROM ratings r "
+            f"JOIN movies m ON m.{join_column} = r.movie_id ORDER BY r.id"
+        )
+        while True:
+            rows = cursor.fetchmany(fetch_rows)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+
+def iter_recommendation_blocks(recommender, algorithm: str = 'hybrid', n_recommendations: int = 10,
+                               user_ids: Optional[Sequence[int]] = None,
+                               block_users: int = EXPORT_BLOCK_USERS) -> Iterator[List[tuple]]:
+    """
+    Recommendations as (user_id, rank, movie_id, title, score, algorithm) tuples
+
+    Users are processed `block_users` at a time; matrix_factorization scores
+    a whole block with one SVD transform, the other algorithms run per user
+    and yield after each one so the first lines leave without waiting for
+    the block. Only the current block's results are held in memory.
+    """
+    if algorithm not in EXPORT_ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    if user_ids is None:
+        user_ids = recommender.user_movie_matrix.index.tolist()
+    per_user = {
+        'collaborative_filtering': recommender.collaborative_filtering_recommendations,
+        'content_based': recommender.content_based_recommendations,
+        'popularity': recommender.popularity_based_recommendations,
+    }
+
+    def rows_for(user_id, recs) -> List[tuple]:
+        rows = []
+        for movie_id, score in recs:
+            card = recommender.movie_card(movie_id)
+            if card is not None:
+                rows.append((int(user_id), len(rows) + 1, card['movie_id'], card['title'],
+                             round(float(score), 6), algorithm))
+        return rows
+
+    for start in range(0, len(user_ids), block_users):
+        block = [int(user_id) for user_id in user_ids[start:start + block_users]]
+        if algorithm == 'matrix_factorization':
+            block_recs = recommender.matrix_factorization_block(block, n_recommendations)
+            yield [row for user_id in block for row in rows_for(user_id, block_recs.get(user_id, []))]
+            continue
+        for user_id in block:
+            if algorithm == 'hybrid':
+                recs = [(rec['movie_id'], rec['hybrid_score'])
+                        for rec in recommender.hybrid_recommendations(user_id, n_recommendations)]
+            else:
+                recs = per_user[algorithm](user_id, n_recommendations)
+            yield rows_for(user_id, recs)
+
+
+# ---- Tüketiciler: CLI (sync) ve StreamingResponse (async) ----
+
+def stream_lines(blocks: Iterator[List[tuple]], encoder: LineEncoder) -> Iterator[bytes]:
+    header = encoder.header()
+    if header:
+        yield header
+    for rows in blocks:
+        if rows:
+            yield encoder.encode(rows)
+
+
+async def stream_lines_async(blocks: Iterator[List[tuple]], encoder: LineEncoder,
+                             run: Callable[..., Awaitable]) -> AsyncIterator[bytes]:
+    """
+    Async version for StreamingResponse: each next(block) runs through `run`
+    (run_blocking / run_cpu), so the event loop only encodes and writes.
+    The client's read speed sets the pace; a disconnect closes the generator
+    and with it the cursor. The response has already started, so a full
+    executor (ExecutorBusy) pauses the stream instead of failing it.
+    """
+    try:
+        header = encoder.header()
+        if header:
+            yield header
+        while True:
+            try:
+                rows = await run(next, blocks, None)
+            except ExecutorBusy:
+                await asyncio.sleep(EXPORT_BUSY_RETRY_SECONDS)
+                continue
+            if rows is None:
+                break
+            if rows:
+                yield encoder.encode(rows)
+    finally:
+        try:
+            blocks.close()
+        except ValueError:
+            # Blok hâlâ executor thread'inde okunuyor: generator o adım bitince
+            # referanssız kalır ve kapanırken bağlantıyı kapatır
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream ratings or recommendations as NDJSON / CSV")
+    parser.add_argument('source', choices=['ratings', 'recommendations'])
+    parser.add_argument('--format', choices=sorted(EXPORT_MEDIA_TYPES), default='ndjson')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="SQLite database path")
+    parser.add_argument('--output', '-o', default='-', help="Output file ('-' for stdout)")
+    parser.add_argument('--algorithm', choices=EXPORT_ALGORITHMS, default='hybrid')
+    parser.add_argument('--n', type=int, default=10, help="Recommendations per user")
+    parser.add_argument('--users', type=int, nargs='*', help="Only these user ids (default: all)")
+    parser.add_argument('--block-size', type=int, default=None, help="Rows fetched / users computed per block")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    if args.source == 'ratings':
+        blocks = iter_rating_blocks(args.db, args.block_size or EXPORT_FETCH_ROWS)
+        encoder = LineEncoder(args.format, RATING_COLUMNS)
+    else:
+        from enhanced_hybrid_recommender_v6 import EnhancedHybridRecommender
+
+        recommender = EnhancedHybridRecommender(db_path=args.db)
+        if not recommender.initialize_system():
+            sys.exit("Recommender initialization failed")
+        blocks = iter_recommendation_blocks(recommender, args.algorithm, args.n, args.users,
+                                            args.block_size or EXPORT_BLOCK_USERS)
+        encoder = LineEncoder(args.format, RECOMMENDATION_COLUMNS)
+
+    out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for chunk in stream_lines(blocks, encoder):
+            out.write(chunk)
+            out.flush()
+    except BrokenPipeError:
+        # `| head` gibi erken kapanan tüketiciler
+        pass
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from json_fragments import FragmentCache
+from prometheus_metrics import record_cache
+
+# uint32 bitmask -> en fazla 32 tür
+MAX_GENRES = 32
+
+# Tür başına taranacak en popüler N film (0 = tüm posting listesi)
+POSTING_SCAN_LIMIT = int(os.environ.get('GENRE_POSTING_SCAN_LIMIT', '0')) or None
+
+# Katalog versiyonu başına encode edilmiş film kartları
+card_fragments = FragmentCache('catalog_cards')
+
+# Film tablosu değişti mi kontrolü en fazla bu aralıkla yapılır (saniye)
+CATALOG_CHECK_SECONDS = float(os.environ.get('CATALOG_CHECK_SECONDS', '30'))
+
+
+@lru_cache(maxsize=4096)
+def _parse_genre_string(value: str) -> tuple:
+    # Aynı tür string'i (örn. '["Action", "Drama"]') katalogda çok kez tekrar eder
+    if value.startswith('[') and value.endswith(']'):
+        parsed = json.loads(value)
+        return tuple(parsed) if isinstance(parsed, list) else ()
+    if '|' in value:
+        return tuple(g.strip() for g in value.split('|'))
+    if ',' in value:
+        return tuple(g.strip() for g in value.split(','))
+    return (value,)
+
+
+def parse_genres(value) -> List[str]:
+    """JSON / '|' / ',' ayrılmış tür alanını listeye çevir (hatalı değer -> [])"""
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if not isinstance(value, str) or not value.strip():
+        return []
+    try:
+        return list(_parse_genre_string(value.strip()))
+    except (ValueError, TypeError):
+        return []
+
+
+class GenreRegistry:
+    """Tür adı <-> bit numarası eşlemesi (ilk görülen sırayla)"""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.bits: Dict[str, int] = {}
+        self.names: List[str] = []
+        for name in names:
+            self.register(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def register(self, name: str) -> Optional[int]:
+        bit = self.bits.get(name)
+        if bit is None:
+            if len(self.names) >= MAX_GENRES:
+                return None
+            bit = len(self.names)
+            self.bits[name] = bit
+            self.names.append(name)
+        return bit
+
+    def mask(self, genres: Iterable[str], register: bool = False) -> int:
+        """Tür listesinin bitmask'i; kayıtsız türler (register=False) yok sayılır"""
+        bits = 0
+        for genre in genres or ():
+            bit = self.register(genre) if register else self.bits.get(genre)
+            if bit is not None:
+                bits |= 1 << bit
+        return bits
+
+    def decode(self, mask: int) -> List[str]:
+        mask = int(mask)
+        return [name for bit, name in enumerate(self.names) if mask >> bit & 1]
+
+
+def genre_bitmasks(genre_lists: Iterable[Sequence[str]],
+                   registry: Optional[GenreRegistry] = None):
+    """Tür listelerini uint32 bitmask array'ine çevir; (masks, registry) döndürür"""
+    registry = GenreRegistry() if registry is None else registry
+    masks = np.fromiter((registry.mask(genres, register=True) for genres in genre_lists),
+                        dtype=np.uint32)
+    return masks, registry
+
+
+# 🧮 Vektörel yardımcılar (masks: uint32 array, query_mask: int)
+
+def popcount(masks) -> np.ndarray:
+    return np.bitwise_count(np.asarray(masks, dtype=np.uint32))
+
+
+def union_mask(masks) -> int:
+    masks = np.asarray(masks, dtype=np.uint32)
+    return int(np.bitwise_or.reduce(masks)) if len(masks) else 0
+
+
+def intersection_counts(masks: np.ndarray, query_mask: int) -> np.ndarray:
+    """Her film için sorgu ile ortak tür sayısı"""
+    return np.bitwise_count(masks & np.uint32(query_mask))
+
+
+def jaccard(masks: np.ndarray, query_mask: int) -> np.ndarray:
+    """|A ∩ B| / |A ∪ B|"""
+    union = np.bitwise_count(masks | np.uint32(query_mask))
+    return np.divide(intersection_counts(masks, query_mask), union,
+                     out=np.zeros(len(masks)), where=union > 0)
+
+
+def match_fraction(masks: np.ndarray, query_mask: int,
+                   n_query: Optional[int] = None) -> np.ndarray:
+    """|A ∩ B| / |B| (n_query: kayıtsız türler dahil sorgu boyutu)"""
+    if n_query is None:
+        n_query = int(query_mask).bit_count()
+    if n_query <= 0:
+        return np.zeros(len(masks))
+    return intersection_counts(masks, query_mask) / n_query
+
+
+class GenreCatalog:
+    """
+    🎭 In-memory movie catalog with per-movie genre bitmasks
+
+    Loaded once from the movies table; genre JSON is parsed at build time
+    so request handlers only run bitwise NumPy ops over `masks`. `postings`
+    is the genre -> rows inverted index (most popular first) used to score
+    only movies that share at least one genre with the query.
+
+    Also the shared serving cache: internal (movies.id) <-> external
+    (movies.movie_id) id maps and prebuilt movie cards, so handlers resolve
+    movie metadata without a query. `version` increases on every reload;
+    `content_version` is derived from the table fingerprint, so every worker
+    (and a restarted one) reports the same value for the same data (ETags).
+    """
+
+    def __init__(self, rows: Sequence[tuple], version: int = 0, fingerprint: Optional[tuple] = None):
+        # rows: (id, movie_id, title, release_date, avg_rating, rating_count, imdb_url, genres[, popularity_score])
+        self.version = version
+        self.fingerprint = fingerprint
+        self.content_version = (hashlib.sha1(repr(fingerprint).encode()).hexdigest()[:16]
+                                if fingerprint is not None else f"local-{version}")
+        self.registry = GenreRegistry()
+        self.db_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.movie_ids = np.array([r[1] for r in rows], dtype=np.int64)
+        self.titles = [r[2] for r in rows]
+        self.release_dates = [r[3] for r in rows]
+        self.avg_rating = np.array([r[4] or 0 for r in rows], dtype=np.float64)
+        self.rating_count = np.array([r[5] or 0 for r in rows], dtype=np.int64)
+        self.imdb_urls = [r[6] for r in rows]
+        self.genres = [parse_genres(r[7]) for r in rows]
+        self.popularity_score = np.array([(r[8] if len(r) > 8 else 0) or 0 for r in rows],
+                                         dtype=np.float64)
+        self.masks, _ = genre_bitmasks(self.genres, self.registry)
+
+        self._row_by_movie_id = {int(m): i for i, m in enumerate(self.movie_ids)}
+        self._row_by_db_id = {int(d): i for i, d in enumerate(self.db_ids)}
+        self.postings = self._build_postings()
+        self.cards = [self._build_card(i) for i in range(len(self.db_ids))]
+        # popularity_score'a göre azalan satır sırası (popüler film listeleri için)
+        self.by_popularity_score = np.argsort(-self.popularity_score, kind='stable')
+
+    def _build_postings(self) -> List[np.ndarray]:
+        """Inverted index: bit -> satır numaraları, popülerliğe göre azalan"""
+        by_popularity = np.argsort(-self.rating_count, kind='stable')
+        sorted_masks = self.masks[by_popularity]
+        return [
+            by_popularity[(sorted_masks >> np.uint32(bit)) & np.uint32(1) == 1]
+            for bit in range(len(self.registry))
+        ]
+
+    @classmethod
+    def from_session(cls, db, version: int = 0) -> 'GenreCatalog':
+        from database_fixed import Movie
+        fingerprint = catalog_fingerprint(db)
+        rows = db.query(
+            Movie.id, Movie.movie_id, Movie.title, Movie.release_date,
+            Movie.avg_rating, Movie.rating_count, Movie.imdb_url, Movie.genres,
+            Movie.popularity_score
+        ).order_by(Movie.id).all()
+        return cls(rows, version=version, fingerprint=fingerprint)
+
+    def __len__(self):
+        return len(self.db_ids)
+
+    def row_for_movie_id(self, movie_id: int) -> Optional[int]:
+        return self._row_by_movie_id.get(int(movie_id))
+
+    def row_for_db_id(self, db_id: int) -> Optional[int]:
+        return self._row_by_db_id.get(int(db_id))
+
+    def movie_id_for_db_id(self, db_id: int) -> Optional[int]:
+        row = self._row_by_db_id.get(int(db_id))
+        return None if row is None else int(self.movie_ids[row])
+
+    def db_id_for_movie_id(self, movie_id: int) -> Optional[int]:
+        row = self._row_by_movie_id.get(int(movie_id))
+        return None if row is None else int(self.db_ids[row])
+
+    def rows_for_db_ids(self, db_ids: Iterable[int]) -> np.ndarray:
+        rows = [self._row_by_db_id.get(int(i)) for i in db_ids]
+        return np.array([r for r in rows if r is not None], dtype=np.int64)
+
+    def union_mask(self, rows: np.ndarray) -> int:
+        return union_mask(self.masks[rows])
+
+    def genre_matches(self, query_mask: int, exclude_rows=None,
+                      per_genre_limit: Optional[int] = POSTING_SCAN_LIMIT):
+        """
+        Sorgu türlerinin posting listelerini birleştir.
+        Döner: (aday satırlar, ortak tür sayısı); exclude_rows (izlenenler) hariç.
+        """
+        query_mask = int(query_mask)
+        lists = [self.postings[bit][:per_genre_limit]
+                 for bit in range(len(self.postings)) if query_mask >> bit & 1]
+        if not lists:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+        rows, counts = np.unique(np.concatenate(lists), return_counts=True)
+        if exclude_rows is not None and len(exclude_rows):
+            keep = ~np.isin(rows, exclude_rows)
+            rows, counts = rows[keep], counts[keep]
+        return rows, counts
+
+    def rank_rows(self, rows: np.ndarray, scores: np.ndarray, n: int):
+        """Skora göre azalan, eşitlikte popülerlik sırası; ilk n (satır, skor)"""
+        order = np.lexsort((-self.rating_count[rows], -scores))[:max(n, 0)]
+        return rows[order], scores[order]
+
+    def most_popular_rows(self, n: int, exclude_rows=None) -> np.ndarray:
+        """popularity_score'a göre ilk n satır; exclude_rows hariç"""
+        order = self.by_popularity_score
+        if exclude_rows is not None and len(exclude_rows):
+            order = order[~np.isin(order, exclude_rows)]
+        return order[:max(n, 0)]
+
+    def genre_names(self) -> List[str]:
+        """Katalogda en az bir filmde geçen türler (sıralı)"""
+        return sorted(self.registry.decode(union_mask(self.masks)))
+
+    def top_rows(self, scores: np.ndarray, n: int) -> np.ndarray:
+        """Skoru > 0 olan satırlar, skora göre azalan (eşitlikte katalog sırası)"""
+        candidates = np.flatnonzero(scores > 0)
+        order = np.argsort(-scores[candidates], kind='stable')
+        return candidates[order[:max(n, 0)]]
+
+    def _build_card(self, row: int) -> Dict:
+        return {
+            "movie_id": int(self.movie_ids[row]),
+            "title": self.titles[row],
+            "release_date": self.release_dates[row],
+            "avg_rating": float(self.avg_rating[row]),
+            "popularity": int(self.rating_count[row]),
+            "genres": list(self.genres[row]),
+            "imdb_url": self.imdb_urls[row],
+        }
+
+    def movie_card(self, row: int) -> Dict:
+        """Hazır kartın kopyası (handler'lar skor alanı ekleyebilir)"""
+        return dict(self.cards[row])
+
+    def card_fragment(self, row: int) -> bytes:
+        """Kartın JSON bytes hali (katalog versiyonu başına bir kez encode edilir)"""
+        return card_fragments.get(self.version, int(row), lambda: self.cards[row])
+
+    def card_for_db_id(self, db_id: int) -> Optional[Dict]:
+        row = self._row_by_db_id.get(int(db_id))
+        return None if row is None else dict(self.cards[row])
+
+    def card_for_movie_id(self, movie_id: int) -> Optional[Dict]:
+        row = self._row_by_movie_id.get(int(movie_id))
+        return None if row is None else dict(self.cards[row])
+
+
+_catalog: Optional[GenreCatalog] = None
+_catalog_lock = threading.Lock()
+_catalog_checked_at = 0.0
+_catalog_force_reload = False
+
+
+def catalog_fingerprint(db) -> tuple:
+    """Film tablosunun ucuz özeti; değişirse katalog yeniden yüklenir"""
+    from sqlalchemy import text
+    row = db.execute(text(
+        "SELECT COUNT(*), COALESCE(MAX(id), 0), TOTAL(rating_count), TOTAL(avg_rating), "
+        "TOTAL(LENGTH(genres)) + TOTAL(LENGTH(title)) FROM movies"
+    )).one()
+    return tuple(row)
+
+
+def _check_due() -> bool:
+    return time.monotonic() - _catalog_checked_at >= CATALOG_CHECK_SECONDS
+
+
+def get_genre_catalog(db) -> GenreCatalog:
+    """Süreç başına yüklenen katalog; film tablosu değişince yeni versiyon yüklenir"""
+    global _catalog, _catalog_checked_at, _catalog_force_reload
+    if _catalog is not None and not _check_due():
+        record_cache('genre_catalog', True)
+        return _catalog
+    with _catalog_lock:
+        loaded = _catalog
+        if _catalog is None:
+            _catalog = GenreCatalog.from_session(db, version=1)
+        elif _check_due() and (_catalog_force_reload or
+                               catalog_fingerprint(db) != _catalog.fingerprint):
+            _catalog = GenreCatalog.from_session(db, version=_catalog.version + 1)
+        _catalog_force_reload = False
+        _catalog_checked_at = time.monotonic()
+    # Miss: katalog (yeniden) yüklendi; fingerprint aynıysa eldeki kopya kullanıldı
+    record_cache('genre_catalog', _catalog is loaded)
+    return _catalog
+
+
+async def get_genre_catalog_async() -> GenreCatalog:
+    """Async handler'lar için; yükleme / değişiklik kontrolü DB executor'ında"""
+    if _catalog is not None and not _check_due():
+        record_cache('genre_catalog', True)
+        return _catalog
+    from database_fixed import SessionLocal
+    from executors import run_blocking
+
+    def _load():
+        with SessionLocal() as db:
+            return get_genre_catalog(db)
+
+    return await run_blocking(_load)
+
+
+def invalidate_genre_catalog():
+    """Film tablosu değiştiğinde çağır; bir sonraki istek yeni versiyonu yükler"""
+    global _catalog_checked_at, _catalog_force_reload
+    _catalog_force_reload = True
+    _catalog_checked_at = 0.0
@@ -0,0 +1,53 @@
+import hashlib
+import os
+from typing import Optional
+
+from fastapi import Request, Response
+
+from prometheus_metrics import record_cache
+
+# Katalog verisi için istemci / proxy cache süresi (saniye)
+CATALOG_CACHE_MAX_AGE = int(os.environ.get('CATALOG_CACHE_MAX_AGE', '60'))
+
+PUBLIC_CATALOG_CACHE = f"public, max-age={CATALOG_CACHE_MAX_AGE}"
+# Authorization isteyen endpoint'ler: yalnızca tarayıcı cache'i (paylaşılan proxy saklamaz)
+PRIVATE_CATALOG_CACHE = f"private, max-age={CATALOG_CACHE_MAX_AGE}"
+
+
+def make_etag(*parts) -> str:
+    """
+    Weak ETag from the data version and the request parameters
+
+    The tag depends only on values known before any query runs (catalog
+    version, path/query parameters), so a matching If-None-Match is answered
+    without touching the database.
+    """
+    digest = hashlib.sha1('\x1f'.join(map(str, parts)).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match karşılaştırması (RFC 9110: weak comparison, '*' ve liste destekli)"""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == opaque for tag in header.split(','))
+
+
+def not_modified(request: Request, etag: str, cache_control: str = PUBLIC_CATALOG_CACHE,
+                 cache: str = 'http_etag') -> Optional[Response]:
+    """İstemcinin kopyası güncelse 304 response, değilse None (handler devam eder)"""
+    hit = etag_matches(request, etag)
+    record_cache(cache, hit)
+    if not hit:
+        return None
+    return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': cache_control})
+
+
+def set_cache_headers(response: Response, etag: str, cache_control: str = PUBLIC_CATALOG_CACHE) -> Response:
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = cache_control
+    return response
@@ -0,0 +1,378 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import create_engine
+
+from analytics_counters import table_columns
+from database_fixed import Base, Job
+from executors import ExecutorBusy, run_blocking
+from json_fragments import dumps
+from sqlite_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = 'movie_recommendation.db'
+DEFAULT_MATRIX_PATH = 'user_movie_matrix.pkl'
+# Worker process sayısı ve bekleyen iş limiti env ile ayarlanabilir
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '1'))
+JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', '16'))
+JOB_WORKER_NICE = int(os.environ.get('JOB_WORKER_NICE', '10'))
+PROGRESS_MIN_INTERVAL = 1.0  # İlerleme satırı en fazla saniyede bir yazılır
+JOB_RETRY_AFTER_SECONDS = 30
+# Sahip process her işini bu aralıkla "canlı" işaretler; bu sürede heartbeat'i
+# gelmeyen işlerin sahibi ölmüş sayılır ve başka bir process onları toplar
+JOB_HEARTBEAT_SECONDS = float(os.environ.get('JOB_HEARTBEAT_SECONDS', '10'))
+JOB_STALE_SECONDS = float(os.environ.get('JOB_STALE_SECONDS', '60'))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+_JOB_COLUMNS = ('id', 'kind', 'status', 'params', 'progress', 'progress_message', 'result', 'error',
+                'created_at', 'started_at', 'finished_at')
+
+
+class JobQueueFull(Exception):
+    """Bekleyen iş sayısı limitte: yeni iş kabul edilmez (handler 503 döner)"""
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(sep=' ')
+
+
+class JobStore:
+    """jobs tablosu üzerinde ham SQLite işlemleri (API ve worker process'leri ortak kullanır)"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+
+    def ensure_table(self):
+        engine = create_engine(f"sqlite:///{self.db_path}")
+        Base.metadata.create_all(bind=engine, tables=[Job.__table__])
+        engine.dispose()
+        # owner / heartbeat_at sonradan eklendi: eski jobs tablosuna sütunları ekle
+        with get_pool(self.db_path).connection() as conn, conn:
+            columns = table_columns(conn, 'jobs')
+            for column, sql_type in (('owner', 'VARCHAR'), ('heartbeat_at', 'DATETIME')):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {sql_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_heartbeat_at ON jobs (heartbeat_at)")
+
+    def _execute(self, query: str, params: tuple = ()) -> int:
+        with get_pool(self.db_path).connection() as conn, conn:
+            return conn.execute(query, params).rowcount
+
+    def create(self, kind: str, params: Dict, owner: Optional[str] = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = _now()
+        self._execute(
+            "INSERT INTO jobs (id, kind, status, params, progress, created_at, owner, heartbeat_at) "
+            "VALUES (?, ?, ?, ?, 0.0, ?, ?, ?)",
+            (job_id, kind, QUEUED, dumps(params).decode(), now, owner, now),
+        )
+        return job_id
+
+    def heartbeat(self, owner: str):
+        """Bu process'in kuyruktaki / çalışan işlerini canlı işaretle"""
+        self._execute("UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status IN (?, ?)",
+                      (_now(), owner, QUEUED, RUNNING))
+
+    def mark_running(self, job_id: str):
+        self._execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?", (RUNNING, _now(), job_id))
+
+    def set_progress(self, job_id: str, progress: float, message: Optional[str] = None):
+        self._execute("UPDATE jobs SET progress = ?, progress_message = ? WHERE id = ?",
+                      (round(progress, 4), message, job_id))
+
+    def finish(self, job_id: str, result: Dict):
+        self._execute(
+            "UPDATE jobs SET status = ?, progress = 1.0, result = ?, finished_at = ? WHERE id = ?",
+            (SUCCEEDED, dumps(result).decode(), _now(), job_id),
+        )
+
+    def fail(self, job_id: str, error: str):
+        self._execute("UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status != ?",
+                      (FAILED, error, _now(), job_id, SUCCEEDED))
+
+    @staticmethod
+    def _row_to_dict(row) -> Dict:
+        job = dict(zip(_JOB_COLUMNS, row))
+        for key in ('params', 'result'):
+            if job[key] is not None:
+                job[key] = orjson.loads(job[key])
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with get_pool(self.db_path).connection() as conn:
+            row = conn.execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def recent(self, limit: int = 20, kind: Optional[str] = None) -> List[Dict]:
+        """Son işler (sonuç gövdesi hariç)"""
+        columns = [c for c in _JOB_COLUMNS if c != 'result']
+        query = f"SELECT {', '.join(columns)} FROM jobs"
+        params: tuple = ()
+        if kind:
+            query += " WHERE kind = ?"
+            params = (kind,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with get_pool(self.db_path).connection() as conn:
+            rows = conn.execute(query, params + (limit,)).fetchall()
+        jobs = []
+        for row in rows:
+            job = dict(zip(columns, row))
+            job['params'] = orjson.loads(job['params']) if job['params'] else None
+            jobs.append(job)
+        return jobs
+
+    def recover(self, owner: str, limit: int, stale_seconds: float = JOB_STALE_SECONDS) -> List[Tuple[str, str, Dict]]:
+        """
+        Sahibi ölmüş işleri topla: heartbeat'i `stale_seconds`'tan eski olan
+        running işler failed olur; aynı durumdaki queued işlerden en fazla
+        `limit` tanesi `owner` adına sahiplenilip döndürülür. Sahiplenme tek
+        satırlık koşullu UPDATE'tir, aynı işi iki process birden alamaz.
+        """
+        cutoff = (datetime.utcnow() - timedelta(seconds=stale_seconds)).isoformat(sep=' ')
+        stale = "(heartbeat_at IS NULL OR heartbeat_at < ?)"
+        self._execute(f"UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND {stale}",
+                      (FAILED, "interrupted: owning API process stopped", _now(), RUNNING, cutoff))
+        if limit <= 0:
+            return []
+        with get_pool(self.db_path).connection() as conn:
+            rows = conn.execute(f"SELECT id, kind, params FROM jobs WHERE status = ? AND {stale} "
+                                "ORDER BY created_at LIMIT ?", (QUEUED, cutoff, limit)).fetchall()
+        claimed = []
+        for job_id, kind, params in rows:
+            if self._execute(f"UPDATE jobs SET owner = ?, heartbeat_at = ? WHERE id = ? AND status = ? AND {stale}",
+                             (owner, _now(), job_id, QUEUED, cutoff)) == 1:
+                claimed.append((job_id, kind, orjson.loads(params)))
+        return claimed
+
+
+# ---- Worker process tarafı (spawn ile başlar; fonksiyonlar modül seviyesinde olmalı) ----
+
+_worker_state: Dict = {}
+
+
+def _init_worker(nice: int):
+    # Batch işleri interaktif isteklerle CPU yarışmasın
+    if nice > 0:
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+
+
+def _worker_recommender(db_path: str, matrix_path: str):
+    """Worker başına bir model; matrix dosyası değişirse yeniden yüklenir"""
+    from enhanced_hybrid_recommender_v6 import EnhancedHybridRecommender
+
+    key = (db_path, matrix_path, os.path.getmtime(matrix_path))
+    if _worker_state.get('key') != key:
+        recommender = EnhancedHybridRecommender(db_path, matrix_path)
+        if not recommender.initialize_system():
+            raise RuntimeError("Recommender initialization failed in job worker")
+        _worker_state.update(key=key, recommender=recommender)
+    return _worker_state['recommender']
+
+
+class _ProgressReporter:
+    def __init__(self, store: JobStore, job_id: str):
+        self.store = store
+        self.job_id = job_id
+        self._last_write = 0.0
+
+    def __call__(self, fraction: float, message: Optional[str] = None):
+        now = time.monotonic()
+        if now - self._last_write < PROGRESS_MIN_INTERVAL:
+            return
+        self._last_write = now
+        self.store.set_progress(self.job_id, fraction, message)
+
+
+def _ab_test_job(recommender, params: Dict, progress: _ProgressReporter) -> Dict:
+    results = recommender.ab_test_algorithms(params['test_users'], progress=progress)
+    return {
+        "test_users_count": len(params['test_users']),
+        "algorithms_tested": len(results),
+        "results": results,
+        "best_algorithm": max(results, key=lambda k: results[k]['f1_score']) if results else None,
+    }
+
+
+def _optimize_weights_job(recommender, params: Dict, progress: _ProgressReporter) -> Dict:
+    outcome = recommender.optimize_algorithm_weights(params['test_users'], progress=progress)
+    return {
+        "new_weights": outcome['weights'],
+        "f1_score": outcome['f1_score'],
+        "test_users_count": len(params['test_users']),
+    }
+
+
+JOB_HANDLERS: Dict[str, Callable] = {
+    'ab_test': _ab_test_job,
+    'optimize_weights': _optimize_weights_job,
+}
+
+
+def _execute_job(db_path: str, matrix_path: str, job_id: str, kind: str, params: Dict) -> Dict:
+    store = JobStore(db_path)
+    store.mark_running(job_id)
+    try:
+        recommender = _worker_recommender(db_path, matrix_path)
+        if params.get('weights'):
+            # Worker'daki model varsayılan ağırlıklarla yüklenir: serving model'in ağırlıkları
+            # her işte yeniden uygulanır (önceki optimize işinden kalanlar taşınmaz)
+            recommender.algorithm_weights = dict(params['weights'])
+        result = JOB_HANDLERS[kind](recommender, params, _ProgressReporter(store, job_id))
+    except Exception as e:
+        store.fail(job_id, f"{type(e).__name__}: {e}")
+        raise
+    store.finish(job_id, result)
+    return result
+
+
+# ---- API tarafı ----
+
+class JobRunner:
+    """
+    🗂️ Background jobs on a local worker process pool
+
+    submit() stores the job as queued and returns its id; a worker process
+    (own recommender instance, lowered priority) runs it, writes progress
+    to the jobs table at most once per second and persists the result. The
+    HTTP request only waits for the insert, so a disconnecting client does
+    not stop the job. On startup, jobs left running by a previous API
+    process are marked failed and queued ones are resubmitted. Hooks
+    registered with on_success() run in the API process with the result
+    (e.g. to apply optimized weights to the serving model).
+
+    Each job row records the API process that owns it; run() refreshes the
+    owner's heartbeat and periodically picks up jobs whose owner stopped
+    heartbeating. With several API workers (or a rolling restart) a process
+    therefore never fails or re-runs jobs another live process is handling,
+    and each orphaned queued job is claimed by exactly one process, within
+    that process's max_pending limit.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, matrix_path: str = DEFAULT_MATRIX_PATH,
+                 workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING):
+        self.store = JobStore(db_path)
+        self.matrix_path = matrix_path
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._hooks: Dict[str, Callable[[Dict], None]] = {}
+        self._started = False
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def on_success(self, kind: str, hook: Callable[[Dict], None]):
+        self._hooks[kind] = hook
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(JOB_WORKER_NICE,),
+            )
+        return self._pool
+
+    async def start(self):
+        """Tabloyu oluştur ve sahibi ölmüş işleri toparla (idempotent)"""
+        if self._started:
+            return
+        self._started = True
+        await run_blocking(self.store.ensure_table)
+        await self.recover()
+
+    async def recover(self):
+        # submit() ile aynı limit: toplanan işler de bekleyen iş sayısına dahil
+        claimed = await run_blocking(self.store.recover, self.owner, self.max_pending - self._pending)
+        for job_id, kind, params in claimed:
+            logger.info(f"🔁 Resubmitting orphaned job {job_id} ({kind})")
+            self._dispatch(job_id, kind, params)
+
+    async def run(self):
+        """Heartbeat + periyodik recovery (startup'ta task olarak başlatılır)"""
+        await self.start()
+        logger.info(f"🗂️ Job heartbeat started (owner {self.owner}, every {JOB_HEARTBEAT_SECONDS:.0f}s)")
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                await run_blocking(self.store.heartbeat, self.owner)
+                await self.recover()
+            except Exception as e:
+                logger.warning(f"⚠️ Job heartbeat failed: {e}")
+
+    async def submit(self, kind: str, params: Dict) -> str:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        await self.start()
+        if self._pending >= self.max_pending:
+            raise JobQueueFull(f"{self._pending} jobs pending")
+        job_id = await run_blocking(self.store.create, kind, params, self.owner)
+        self._dispatch(job_id, kind, params)
+        return job_id
+
+    def _dispatch(self, job_id: str, kind: str, params: Dict):
+        self._pending += 1
+        future = asyncio.get_running_loop().run_in_executor(
+            self._get_pool(), _execute_job, self.store.db_path, self.matrix_path, job_id, kind, params
+        )
+        future.add_done_callback(functools.partial(self._finished, job_id, kind))
+
+    def _finished(self, job_id: str, kind: str, future: asyncio.Future):
+        self._pending -= 1
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.error(f"❌ Job {job_id} ({kind}) failed: {error}")
+            if isinstance(error, BrokenProcessPool):
+                # Worker öldü: satırı kendisi güncelleyemedi; havuz yeniden kurulur
+                self._pool = None
+                asyncio.ensure_future(self._mark_crashed(job_id, f"worker crashed: {error}"))
+            return
+
+        logger.info(f"✅ Job {job_id} ({kind}) succeeded")
+        hook = self._hooks.get(kind)
+        if hook is not None:
+            try:
+                hook(future.result())
+            except Exception as e:
+                logger.error(f"❌ Job {job_id} ({kind}) success hook failed: {e}")
+
+    async def _mark_crashed(self, job_id: str, error: str):
+        # Sahip process canlı ve heartbeat atıyor: satır burada güncellenmezse running kalır
+        while True:
+            try:
+                return await run_blocking(self.store.fail, job_id, error)
+            except ExecutorBusy:
+                await asyncio.sleep(JOB_HEARTBEAT_SECONDS / 10)
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        await self.start()
+        return await run_blocking(self.store.get, job_id)
+
+    async def recent(self, limit: int = 20, kind: Optional[str] = None) -> List[Dict]:
+        await self.start()
+        return await run_blocking(self.store.recent, limit, kind)
+
+    def stats(self) -> Dict:
+        return {'workers': self.workers, 'max_pending': self.max_pending, 'pending': self._pending,
+                'owner': self.owner}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,100 @@
+import threading
+from datetime import date, datetime
+from typing import Callable, Dict, Hashable, Iterable, Mapping, Optional
+
+import numpy as np
+import orjson
+from fastapi.responses import Response
+
+from prometheus_metrics import record_cache
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value):
+    # orjson'un doğrudan bilmediği tipler (numpy scalar alt tipleri, set, tarih)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value) -> bytes:
+    """Hızlı JSON encode (orjson, numpy destekli)"""
+    return orjson.dumps(value, default=_default, option=_OPTIONS)
+
+
+class RawJSON(bytes):
+    """Önceden encode edilmiş JSON; render() içine olduğu gibi yazılır"""
+
+
+def with_fields(fragment: bytes, fields: Optional[Mapping] = None) -> bytes:
+    """Nesne fragment'ına ({...}) dinamik alanları ekle: skor, tarih vb."""
+    if not fields:
+        return fragment
+    extra = dumps(fields)
+    if fragment == b'{}':
+        return extra
+    return fragment[:-1] + b',' + extra[1:]
+
+
+def json_array(fragments: Iterable[bytes]) -> RawJSON:
+    return RawJSON(b'[' + b','.join(fragments) + b']')
+
+
+def render(envelope: Mapping) -> bytes:
+    """Üst seviye dict'i encode et; RawJSON değerler birleştirilerek eklenir (sıra korunur)"""
+    parts = []
+    for key, value in envelope.items():
+        encoded = value if isinstance(value, RawJSON) else dumps(value)
+        parts.append(dumps(str(key)) + b':' + encoded)
+    return b'{' + b','.join(parts) + b'}'
+
+
+class FragmentCache:
+    """
+    🧱 Pre-encoded per-movie JSON fragments for one catalog version
+
+    Movie cards are identical across requests, so each one is encoded once
+    and reused as bytes; responses are assembled by concatenation. The cache
+    is dropped as a whole when the catalog / model version changes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._version = None
+        self._fragments: Dict[Hashable, bytes] = {}
+        self._lock = threading.Lock()
+
+    def get(self, version, key: Hashable, build: Callable[[], Optional[Mapping]]) -> Optional[bytes]:
+        """build() kart dict'i döndürür (yoksa None); sonuç version ile birlikte cache'lenir"""
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._fragments = {}
+                    self._version = version
+        fragments = self._fragments
+        fragment = fragments.get(key)
+        record_cache(self.name, fragment is not None)
+        if fragment is None:
+            card = build()
+            if card is None:
+                return None
+            fragment = fragments[key] = dumps(card)
+        return fragment
+
+    def __len__(self):
+        return len(self._fragments)
+
+
+class PreEncodedJSONResponse(Response):
+    """Gövdesi hazır JSON bytes olan response (jsonable_encoder / json.dumps atlanır)"""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return render(content)
@@ -0,0 +1,179 @@
+import math
+import time
+from typing import Dict, List, Optional
+
+# Log-bucket ayarları: 1µs .. ~150s, bucket başına ~%9 göreli hata
+MIN_LATENCY = 1e-6
+BUCKETS_PER_DOUBLING = 8
+N_BUCKETS = BUCKETS_PER_DOUBLING * 28
+
+DEFAULT_SLICE_SECONDS = 5
+DEFAULT_N_SLICES = 60          # 5 dakikalık pencere
+DEFAULT_WINDOWS = (60, 300)
+
+
+def bucket_index(seconds: float) -> int:
+    """Latency değerini log-bucket indeksine çevir"""
+    if seconds <= MIN_LATENCY:
+        return 0
+    idx = int(math.log2(seconds / MIN_LATENCY) * BUCKETS_PER_DOUBLING) + 1
+    return idx if idx < N_BUCKETS else N_BUCKETS - 1
+
+
+def bucket_upper_bound(index: int) -> float:
+    """Bucket'ın üst sınırı (saniye)"""
+    return MIN_LATENCY * 2 ** (index / BUCKETS_PER_DOUBLING)
+
+
+class _Slice:
+    """Tek bir zaman dilimi için sabit boyutlu sayaçlar"""
+    __slots__ = ('epoch', 'counts', 'total', 'errors', 'max')
+
+    def __init__(self):
+        self.epoch = -1
+        self.counts = [0] * N_BUCKETS
+        self.total = 0
+        self.errors = 0
+        self.max = 0.0
+
+    def reset(self, epoch: int):
+        self.counts = [0] * N_BUCKETS
+        self.total = 0
+        self.errors = 0
+        self.max = 0.0
+        self.epoch = epoch
+
+
+class LatencyHistogram:
+    """
+    📈 Fixed-memory latency histogram with sliding windows
+
+    Memory is N_SLICES × N_BUCKETS counters regardless of traffic. Updates
+    take no lock: under the GIL a concurrent slice rotation can at worst
+    drop a handful of samples, which is acceptable for telemetry.
+    """
+
+    def __init__(self, slice_seconds: int = DEFAULT_SLICE_SECONDS,
+                 n_slices: int = DEFAULT_N_SLICES):
+        self.slice_seconds = slice_seconds
+        self.n_slices = n_slices
+        self._slices = [_Slice() for _ in range(n_slices)]
+
+        # Başlangıçtan beri toplamlar (pencereden bağımsız)
+        self.lifetime_count = 0
+        self.lifetime_errors = 0
+        self.lifetime_max = 0.0
+
+    def _current_slice(self, now: float) -> _Slice:
+        epoch = int(now // self.slice_seconds)
+        current = self._slices[epoch % self.n_slices]
+        if current.epoch != epoch:
+            current.reset(epoch)
+        return current
+
+    def record(self, seconds: float, error: bool = False, now: Optional[float] = None):
+        """Bir ölçüm ekle"""
+        current = self._current_slice(time.time() if now is None else now)
+        current.counts[bucket_index(seconds)] += 1
+        current.total += 1
+        if seconds > current.max:
+            current.max = seconds
+        if error:
+            current.errors += 1
+            self.lifetime_errors += 1
+
+        self.lifetime_count += 1
+        if seconds > self.lifetime_max:
+            self.lifetime_max = seconds
+
+    def _merged(self, window_seconds: int, now: float):
+        newest = int(now // self.slice_seconds)
+        oldest = newest - max(1, math.ceil(window_seconds / self.slice_seconds)) + 1
+
+        counts = [0] * N_BUCKETS
+        total = errors = 0
+        max_latency = 0.0
+        for s in self._slices:
+            if oldest <= s.epoch <= newest:
+                for i, c in enumerate(s.counts):
+                    if c:
+                        counts[i] += c
+                total += s.total
+                errors += s.errors
+                max_latency = max(max_latency, s.max)
+        return counts, total, errors, max_latency
+
+    @staticmethod
+    def _percentile(counts: List[int], total: int, p: float) -> float:
+        if total == 0:
+            return 0.0
+        rank = math.ceil(total * p / 100.0)
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= rank:
+                return bucket_upper_bound(i)
+        return bucket_upper_bound(N_BUCKETS - 1)
+
+    def snapshot(self, window_seconds: int = 60, now: Optional[float] = None) -> Dict:
+        """Pencere için p50/p90/p99/max, throughput ve hata sayısı"""
+        now = time.time() if now is None else now
+        window_seconds = min(window_seconds, self.slice_seconds * self.n_slices)
+        counts, total, errors, max_latency = self._merged(window_seconds, now)
+
+        def pct(p):
+            # Bucket üst sınırı gerçek max'ı aşmasın
+            return round(min(self._percentile(counts, total, p), max_latency) * 1000, 3)
+
+        return {
+            'window_seconds': window_seconds,
+            'count': total,
+            'errors': errors,
+            'error_rate': round(errors / total, 4) if total else 0.0,
+            'throughput_per_sec': round(total / window_seconds, 3),
+            'p50_ms': pct(50),
+            'p90_ms': pct(90),
+            'p99_ms': pct(99),
+            'max_ms': round(max_latency * 1000, 3),
+        }
+
+
+class AlgorithmLatencyTracker:
+    """Algoritma başına LatencyHistogram tutan kayıt defteri"""
+
+    def __init__(self, slice_seconds: int = DEFAULT_SLICE_SECONDS,
+                 n_slices: int = DEFAULT_N_SLICES):
+        self.slice_seconds = slice_seconds
+        self.n_slices = n_slices
+        self._histograms: Dict[str, LatencyHistogram] = {}
+
+    def histogram(self, algorithm: str) -> LatencyHistogram:
+        hist = self._histograms.get(algorithm)
+        if hist is None:
+            # setdefault: iki thread aynı anda oluşturursa tek nesne kalır
+            hist = self._histograms.setdefault(
+                algorithm, LatencyHistogram(self.slice_seconds, self.n_slices)
+            )
+        return hist
+
+    def record(self, algorithm: str, seconds: float, error: bool = False):
+        self.histogram(algorithm).record(seconds, error)
+
+    def algorithms(self) -> List[str]:
+        return sorted(self._histograms)
+
+    def snapshot(self, windows=DEFAULT_WINDOWS) -> Dict:
+        """Tüm algoritmalar için pencere bazlı özet"""
+        now = time.time()
+        result = {}
+        for algorithm in self.algorithms():
+            hist = self._histograms[algorithm]
+            result[algorithm] = {
+                f'last_{w}s': hist.snapshot(w, now) for w in windows
+            }
+            result[algorithm]['lifetime'] = {
+                'count': hist.lifetime_count,
+                'errors': hist.lifetime_errors,
+                'max_ms': round(hist.lifetime_max * 1000, 3),
+            }
+        return result
@@ -1,6 +1,7 @@
 from simple_ml_recommender import simple_ml
 from sqlalchemy.orm import Session
 from database_fixed import Rating, Movie, User
+from genre_index import get_genre_catalog
 import json
 from typing import List, Dict
 
@@ -58,19 +59,20 @@ class MLService:
             # ML önerilerini al
             ml_recs = simple_ml.get_user_recommendations(user_id, n_recommendations)
             
-            # Movie detaylarını ekle
+            # Movie detaylarını katalog cache'ten ekle (internal ID -> kart)
+            catalog = get_genre_catalog(db)
             detailed_recs = []
             for rec in ml_recs:
-                movie = db.query(Movie).filter(Movie.id == rec['movie_id']).first()
-                if movie:
+                card = catalog.card_for_db_id(rec['movie_id'])
+                if card:
                     detailed_recs.append({
-                        "movie_id": movie.movie_id,  # External movie ID
-                        "title": movie.title,
+                        "movie_id": card["movie_id"],  # External movie ID
+                        "title": card["title"],
                         "predicted_rating": round(rec['predicted_rating'], 2),
                         "ml_confidence": round(rec['ml_confidence'], 2),
-                        "release_date": movie.release_date,
-                        "avg_rating": movie.avg_rating,
-                        "genres": json.loads(movie.genres) if movie.genres else []
+                        "release_date": card["release_date"],
+                        "avg_rating": card["avg_rating"],
+                        "genres": card["genres"]
                     })
             
             return detailed_recs
@@ -0,0 +1,106 @@
+import base64
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Hashable, List, Optional, Sequence, Tuple
+
+import orjson
+from cachetools import TTLCache
+
+from prometheus_metrics import record_cache
+
+# Sayfa boyutu varsayılanı / üst sınırı env ile ayarlanabilir
+PAGE_DEFAULT_LIMIT = int(os.environ.get('PAGE_DEFAULT_LIMIT', '20'))
+PAGE_MAX_LIMIT = int(os.environ.get('PAGE_MAX_LIMIT', '100'))
+# Sayfalanan öneri listeleri bu süre boyunca saklanır (saniye)
+RANKING_SESSION_TTL = float(os.environ.get('RANKING_SESSION_TTL', '600'))
+RANKING_SESSION_MAX = int(os.environ.get('RANKING_SESSION_MAX', '10000'))
+
+
+class InvalidCursor(ValueError):
+    """Çözülemeyen / başka bir listeye ait cursor (handler 400 döner)"""
+
+
+def page_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return PAGE_DEFAULT_LIMIT
+    return max(1, min(int(limit), PAGE_MAX_LIMIT))
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Son satırın sıralama anahtarı -> opak, URL-safe cursor"""
+    return base64.urlsafe_b64encode(orjson.dumps(list(values))).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor") from None
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Malformed cursor")
+    return values
+
+
+def decode_id_cursor(cursor: str) -> int:
+    """Tek sütunlu (id ASC) listeler için: son görülen id"""
+    (row_id,) = decode_cursor(cursor, 1)
+    if not isinstance(row_id, int):
+        raise InvalidCursor("Malformed cursor")
+    return row_id
+
+
+def encode_time_cursor(created_at: datetime, row_id: int) -> str:
+    """(created_at DESC, id DESC) sıralı listeler için cursor"""
+    return encode_cursor([created_at.isoformat(), row_id])
+
+
+def decode_time_cursor(cursor: str) -> Tuple[datetime, int]:
+    created_at, row_id = decode_cursor(cursor, 2)
+    try:
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError):
+        raise InvalidCursor("Malformed cursor") from None
+
+
+def split_page(rows: Sequence, limit: int) -> Tuple[Sequence, bool]:
+    """limit + 1 satır çekilir: fazlası varsa bir sonraki sayfa var demektir"""
+    return rows[:limit], len(rows) > limit
+
+
+class RankedListCache:
+    """
+    📑 Ranked result lists kept for paging
+
+    The first page stores the full ranked list under a random session id;
+    later pages slice that snapshot instead of recomputing it, and keep the
+    order the user started with even if the model reloads meanwhile.
+    Sessions are bound to an owner key (user, algorithm, ...) so a cursor
+    cannot be replayed against another user's list.
+    """
+
+    def __init__(self, name: str, ttl: float = RANKING_SESSION_TTL, maxsize: int = RANKING_SESSION_MAX):
+        self.name = name
+        self._lists = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def put(self, owner: Hashable, items: List) -> str:
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._lists[session_id] = (owner, items)
+        return session_id
+
+    def get(self, session_id: str, owner: Hashable) -> Optional[List]:
+        """Snapshot; süresi dolmuşsa None, başka owner'a aitse InvalidCursor"""
+        with self._lock:
+            entry = self._lists.get(session_id)
+        record_cache(self.name, entry is not None)
+        if entry is None:
+            return None
+        if entry[0] != owner:
+            raise InvalidCursor("Cursor does not belong to this list")
+        return entry[1]
+
+    def stats(self) -> dict:
+        return {'sessions': len(self._lists), 'max_sessions': self._lists.maxsize, 'ttl_seconds': self._lists.ttl}
@@ -0,0 +1,103 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from auth import check_password, get_password_hash
+from prometheus_metrics import EXECUTOR_ACTIVE, EXECUTOR_QUEUE_DEPTH, PASSWORD_DURATION, PASSWORD_OPERATIONS
+
+# Worker sayısı ve kuyruk limiti env ile ayarlanabilir
+PASSWORD_WORKERS = int(os.environ.get('PASSWORD_WORKERS', str(os.cpu_count() or 1)))
+PASSWORD_MAX_QUEUE = int(os.environ.get('PASSWORD_MAX_QUEUE', '64'))
+PASSWORD_RETRY_AFTER_SECONDS = 1
+
+
+class PasswordServiceBusy(Exception):
+    """Kuyruk dolu: istek bekletilmeden reddedilir (handler 503 döner)"""
+
+
+class PasswordService:
+    """
+    🔐 Async bcrypt hashing / verification on a bounded process pool
+
+    bcrypt costs 100-300 ms of CPU per call. Running it in worker processes
+    keeps it off the event loop and the shared thread pools, and lets login
+    throughput scale with cores instead of one GIL. At most
+    workers + max_queue calls are in flight; beyond that callers get
+    PasswordServiceBusy immediately instead of queueing without bound.
+    MovieLens MD5 accounts are checked inline, they cost microseconds.
+    """
+
+    def __init__(self, workers: int = PASSWORD_WORKERS, max_queue: int = PASSWORD_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._in_flight = 0
+        self._queue_gauge = EXECUTOR_QUEUE_DEPTH.labels('password')
+        self._active_gauge = EXECUTOR_ACTIVE.labels('password')
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # İlk kullanımda oluştur; spawn: thread'li (executor, aiosqlite) süreci fork etme.
+        # Spawn edilen worker ana modülü yeniden import eder: giriş script'leri
+        # uvicorn.run'ı `if __name__ == "__main__"` altında tutmalı
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                    )
+        return self._pool
+
+    def _update_gauges(self):
+        self._active_gauge.set(min(self._in_flight, self.workers))
+        self._queue_gauge.set(max(0, self._in_flight - self.workers))
+
+    async def _submit(self, operation: str, func, *args):
+        # Sayaçlar yalnızca event loop thread'inde değişir
+        if self._in_flight >= self.workers + self.max_queue:
+            PASSWORD_OPERATIONS.labels(operation, 'rejected').inc()
+            raise PasswordServiceBusy(f"Password service queue is full ({self._in_flight} in flight)")
+
+        self._in_flight += 1
+        self._update_gauges()
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_pool(), func, *args)
+        except Exception:
+            PASSWORD_OPERATIONS.labels(operation, 'error').inc()
+            raise
+        finally:
+            self._in_flight -= 1
+            self._update_gauges()
+            PASSWORD_DURATION.labels(operation).observe(time.perf_counter() - start)
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._submit('hash', get_password_hash, password)
+        PASSWORD_OPERATIONS.labels('hash', 'ok').inc()
+        return hashed
+
+    async def verify(self, username: str, password: str, hashed_password: Optional[str]) -> bool:
+        """auth.check_password ile aynı kurallar (MD5 / bcrypt / MD5 fallback)"""
+        if not hashed_password:
+            return False
+        if username.startswith("ml_user_"):
+            ok = check_password(username, password, hashed_password)
+        else:
+            ok = await self._submit('verify', check_password, username, password, hashed_password)
+        PASSWORD_OPERATIONS.labels('verify', 'ok' if ok else 'mismatch').inc()
+        return ok
+
+    def stats(self) -> dict:
+        return {'workers': self.workers, 'max_queue': self.max_queue, 'in_flight': self._in_flight}
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+
+
+# Global servis (worker başına bir process pool)
+password_service = PasswordService()
@@ -0,0 +1,195 @@
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+)
+from sqlalchemy import event
+
+# 📊 Paylaşılan collector'lar (tüm API modülleri aynı nesneleri kullanır)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency by route template',
+    ['method', 'route', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    'http_requests_in_flight',
+    'HTTP requests currently being served',
+)
+RECOMMENDATION_DURATION = Histogram(
+    'recommendation_duration_seconds',
+    'Recommender latency per algorithm',
+    ['algorithm'],
+    buckets=LATENCY_BUCKETS,
+)
+RECOMMENDATION_ERRORS = Counter(
+    'recommendation_errors_total',
+    'Recommender calls that failed, per algorithm',
+    ['algorithm'],
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total',
+    'Cache lookups by cache and result (hit/miss)',
+    ['cache', 'result'],
+)
+DB_QUERY_DURATION = Histogram(
+    'db_query_duration_seconds',
+    'Database query time by query name or SQL operation',
+    ['query'],
+    buckets=LATENCY_BUCKETS,
+)
+MODEL_INFO = Gauge(
+    'recommender_model_info',
+    'Currently loaded recommender model (value is always 1)',
+    ['version'],
+)
+MODEL_INITIALIZE_DURATION = Gauge(
+    'recommender_initialize_duration_seconds',
+    'Duration of the last recommender initialize_system() run',
+)
+MODEL_LOADED_TIMESTAMP = Gauge(
+    'recommender_model_loaded_timestamp_seconds',
+    'Unix time the current model finished loading',
+)
+
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    'executor_queue_depth',
+    'Calls submitted to an executor and not yet started',
+    ['executor'],
+)
+EXECUTOR_ACTIVE = Gauge(
+    'executor_active_workers',
+    'Calls currently running on an executor',
+    ['executor'],
+)
+EXECUTOR_WAIT = Histogram(
+    'executor_wait_seconds',
+    'Time from submit to start of a call on an executor',
+    ['executor'],
+    buckets=LATENCY_BUCKETS,
+)
+EXECUTOR_REJECTED = Counter(
+    'executor_rejected_total',
+    'Calls rejected because the executor had max_workers + max_queue calls in flight',
+    ['executor'],
+)
+
+HYBRID_COMPONENT_DROPPED = Counter(
+    'hybrid_component_dropped_total',
+    'Hybrid components left out of fusion because of the request deadline',
+    ['component', 'reason'],
+)
+ADMISSION_DECISIONS = Counter(
+    'admission_decisions_total',
+    'Admission control decisions per request (admit, degrade, shed)',
+    ['decision'],
+)
+PASSWORD_OPERATIONS = Counter(
+    'password_operations_total',
+    'Password hash/verify calls by result (ok, mismatch, rejected, error)',
+    ['operation', 'result'],
+)
+PASSWORD_DURATION = Histogram(
+    'password_operation_seconds',
+    'Password hash/verify latency including process pool queueing',
+    ['operation'],
+    buckets=LATENCY_BUCKETS,
+)
+AUTH_CACHE_LOOKUPS = Counter(
+    'auth_cache_lookups_total',
+    'Auth dependency cache lookups by cache (token, user) and result (hit, miss)',
+    ['cache', 'result'],
+)
+SINGLE_FLIGHT_CALLS = Counter(
+    'single_flight_calls_total',
+    'Single-flight calls that started a computation (leader) or joined one (coalesced)',
+    ['flight', 'role'],
+)
+
+
+def observe_recommendation(algorithm: str, seconds: float, error: bool = False):
+    RECOMMENDATION_DURATION.labels(algorithm).observe(seconds)
+    if error:
+        RECOMMENDATION_ERRORS.labels(algorithm).inc()
+
+
+_cache_counters = {}
+
+
+def record_cache(cache: str, hit: bool):
+    # Sıcak yollarda (kart fragment'ları) her çağrıda labels() çözümlenmesin
+    counter = _cache_counters.get((cache, hit))
+    if counter is None:
+        counter = _cache_counters[(cache, hit)] = CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss')
+    counter.inc()
+
+
+def set_model_version(version: str, initialize_seconds: float):
+    MODEL_INFO.clear()
+    MODEL_INFO.labels(version).set(1)
+    MODEL_INITIALIZE_DURATION.set(initialize_seconds)
+    MODEL_LOADED_TIMESTAMP.set(time.time())
+
+
+@contextmanager
+def db_timer(query: str):
+    """Raw sqlite/pandas sorguları için süre ölçer"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        DB_QUERY_DURATION.labels(query).observe(time.perf_counter() - start)
+
+
+def instrument_sqlalchemy(engine):
+    """SQLAlchemy engine üzerindeki tüm sorguları SQL operasyonuna göre ölç"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_start')
+        if not starts:
+            return
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else 'UNKNOWN'
+        DB_QUERY_DURATION.labels(f"orm_{operation.lower()}").observe(time.perf_counter() - starts.pop())
+
+
+def _route_label(request) -> str:
+    # Route template ('/movie/{movie_id}') -> düşük kardinalite
+    route = request.scope.get('route')
+    return getattr(route, 'path', 'unmatched')
+
+
+def install_metrics(app):
+    """FastAPI app'e latency middleware'i ve /metrics endpoint'ini ekle"""
+    from fastapi import Request, Response
+
+    @app.middleware("http")
+    async def prometheus_middleware(request: Request, call_next):
+        if request.url.path == '/metrics':
+            return await call_next(request)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            HTTP_REQUEST_DURATION.labels(
+                request.method, _route_label(request), str(status)
+            ).observe(time.perf_counter() - start)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus exposition format"""
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,74 @@
+import json
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+# Binary rating store: kolon başına bir ham dosya + meta.json
+# users.u4 / movies.u4 / ratings.u1 / timestamps.u4  (np.memmap ile okunur)
+STORE_COLUMNS = {
+    'users': np.uint32,
+    'movies': np.uint32,
+    'ratings': np.uint8,
+    'timestamps': np.uint32,
+}
+META_FILE = 'meta.json'
+
+
+class RatingStoreWriter:
+    """Append-only writer; chunk chunk diske yazar, tüm veriyi bellekte tutmaz"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.count = 0
+        self._files = {
+            name: open(os.path.join(path, f"{name}.{np.dtype(dtype).str[1:]}"), 'wb')
+            for name, dtype in STORE_COLUMNS.items()
+        }
+
+    def append(self, users: np.ndarray, movies: np.ndarray,
+               ratings: np.ndarray, timestamps: np.ndarray):
+        """Bir chunk rating ekle (tüm kolonlar aynı uzunlukta olmalı)"""
+        n = len(users)
+        if not (len(movies) == len(ratings) == len(timestamps) == n):
+            raise ValueError("Rating store columns must have equal length")
+
+        columns = {'users': users, 'movies': movies, 'ratings': ratings, 'timestamps': timestamps}
+        for name, values in columns.items():
+            np.ascontiguousarray(values, dtype=STORE_COLUMNS[name]).tofile(self._files[name])
+        self.count += n
+
+    def close(self, extra_meta: Optional[Dict] = None):
+        for f in self._files.values():
+            f.close()
+
+        meta = {
+            'count': self.count,
+            'columns': {name: np.dtype(dtype).str for name, dtype in STORE_COLUMNS.items()},
+        }
+        if extra_meta:
+            meta.update(extra_meta)
+        with open(os.path.join(self.path, META_FILE), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_rating_store(path: str) -> Dict[str, np.ndarray]:
+    """Store'u read-only memmap olarak aç; kolon adı -> array"""
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+
+    store = {'meta': meta}
+    for name, dtype in STORE_COLUMNS.items():
+        file_path = os.path.join(path, f"{name}.{np.dtype(dtype).str[1:]}")
+        if meta['count'] == 0:
+            store[name] = np.empty(0, dtype=dtype)
+        else:
+            store[name] = np.memmap(file_path, dtype=dtype, mode='r', shape=(meta['count'],))
+    return store
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+HEALTH_REFRESH_SECONDS = float(os.environ.get('HEALTH_REFRESH_SECONDS', '15'))
+HEALTH_CHECK_TIMEOUT = float(os.environ.get('HEALTH_CHECK_TIMEOUT', '5'))
+
+
+class ReadinessMonitor:
+    """
+    🩺 Readiness snapshot refreshed in the background
+
+    Dependency checks (DB, model) run every `interval` seconds in a
+    background task; /health only returns the last snapshot, so probe
+    frequency does not turn into DB load. A check returns a dict of details
+    (ok unless it raises or times out). Before the first background pass the
+    snapshot is computed once on demand, shared by concurrent callers.
+    """
+
+    def __init__(self, checks: Dict[str, Callable[[], Awaitable[Dict]]],
+                 interval: float = HEALTH_REFRESH_SECONDS, timeout: float = HEALTH_CHECK_TIMEOUT):
+        self.checks = checks
+        self.interval = interval
+        self.timeout = timeout
+        self._snapshot: Optional[Dict] = None
+        self._checked_at = 0.0
+        self._flight = SingleFlight('readiness')
+
+    async def _run_check(self, check: Callable[[], Awaitable[Dict]]) -> Dict:
+        start = time.perf_counter()
+        try:
+            details = await asyncio.wait_for(check(), self.timeout)
+            result = {'ok': True, **(details or {})}
+        except asyncio.TimeoutError:
+            result = {'ok': False, 'error': f"timed out after {self.timeout:.0f}s"}
+        except Exception as e:
+            result = {'ok': False, 'error': str(e)}
+        result['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    async def refresh(self) -> Dict:
+        results = await asyncio.gather(*(self._run_check(check) for check in self.checks.values()))
+        checks = dict(zip(self.checks, results))
+        self._snapshot = {
+            'ready': all(result['ok'] for result in results),
+            'checks': checks,
+            'checked_at': datetime.now().isoformat(),
+        }
+        self._checked_at = time.monotonic()
+        return self._snapshot
+
+    async def snapshot(self) -> Dict:
+        """Son snapshot + yaşı (henüz yoksa bir kez hesaplanır)"""
+        if self._snapshot is None:
+            await self._flight.do('refresh', self.refresh)
+        return {**self._snapshot, 'age_seconds': round(time.monotonic() - self._checked_at, 1)}
+
+    async def run(self):
+        logger.info(f"🩺 Readiness monitor started (every {self.interval:.0f}s)")
+        while True:
+            await self._flight.do('refresh', self.refresh)
+            await asyncio.sleep(self.interval)
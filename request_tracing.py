@@ -0,0 +1,162 @@
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Varsayılan: isteklerin %1'i izlenir (overhead < %1 hedefi)
+DEFAULT_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '0.01'))
+DEFAULT_BUFFER_SIZE = int(os.environ.get('TRACE_BUFFER_SIZE', '500'))
+FORCE_TRACE_HEADER = 'x-debug-trace'
+
+_current_trace: ContextVar[Optional['Trace']] = ContextVar('current_trace', default=None)
+
+
+class Trace:
+    """Tek bir isteğin span kayıtları"""
+    __slots__ = ('trace_id', 'name', 'started_at', '_t0', 'duration', 'spans', 'attributes')
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started_at = datetime.now().isoformat()
+        self._t0 = time.perf_counter()
+        self.duration = None
+        self.spans: List[tuple] = []     # (name, start_offset_s, duration_s)
+        self.attributes: Dict = {}
+
+    def add_span(self, name: str, start: float, duration: float):
+        # list.append GIL altında atomik; executor thread'lerinden de güvenli
+        self.spans.append((name, start - self._t0, duration))
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._t0
+
+    def stage_totals(self) -> Dict[str, float]:
+        """Aynı isimli span'ları topla (saniye)"""
+        totals: Dict[str, float] = {}
+        for name, _, duration in self.spans:
+            totals[name] = totals.get(name, 0.0) + duration
+        return totals
+
+    def server_timing(self) -> str:
+        """Server-Timing header değeri: 'cf;dur=12.3, content;dur=4.1, total;dur=20.0'"""
+        parts = [f"{name};dur={duration * 1000:.1f}" for name, duration in self.stage_totals().items()]
+        if self.duration is not None:
+            parts.append(f"total;dur={self.duration * 1000:.1f}")
+        return ', '.join(parts)
+
+    def to_dict(self) -> Dict:
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'attributes': self.attributes,
+            'stages_ms': {k: round(v * 1000, 3) for k, v in self.stage_totals().items()},
+            'spans': [
+                {'name': name, 'start_ms': round(start * 1000, 3), 'duration_ms': round(duration * 1000, 3)}
+                for name, start, duration in self.spans
+            ],
+        }
+
+
+class RequestTracer:
+    """
+    🔍 Sampled per-request stage tracer
+
+    Unsampled requests pay one ContextVar lookup per span. Finished traces
+    are kept in a fixed-size ring buffer for /debug/traces.
+    """
+
+    def __init__(self, sample_rate: float = DEFAULT_SAMPLE_RATE,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.sample_rate = sample_rate
+        self._buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self.sampled_count = 0
+
+    def set_sample_rate(self, rate: float):
+        self.sample_rate = min(max(rate, 0.0), 1.0)
+
+    def should_sample(self, force: bool = False) -> bool:
+        return force or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def start(self, name: str, force: bool = False):
+        """İstek başında çağrılır; örneklenmediyse (None, None) döner"""
+        if not self.should_sample(force):
+            return None, None
+        trace = Trace(name)
+        token = _current_trace.set(trace)
+        return trace, token
+
+    def finish(self, trace: Optional[Trace], token=None):
+        if trace is None:
+            return
+        trace.finish()
+        if token is not None:
+            _current_trace.reset(token)
+        with self._lock:
+            self._buffer.append(trace)
+            self.sampled_count += 1
+
+    def recent(self, limit: int = 50, name: Optional[str] = None,
+               min_duration_ms: float = 0.0) -> List[Dict]:
+        """Ring buffer'dan en yeni trace'ler (name: trace adında geçen parça)"""
+        with self._lock:
+            traces = list(self._buffer)
+        result = []
+        for trace in reversed(traces):
+            if name and name not in trace.name:
+                continue
+            if trace.duration is not None and trace.duration * 1000 < min_duration_ms:
+                continue
+            result.append(trace.to_dict())
+            if len(result) >= limit:
+                break
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._buffer.clear()
+
+    def stats(self) -> Dict:
+        return {
+            'sample_rate': self.sample_rate,
+            'buffer_size': self._buffer.maxlen,
+            'buffered': len(self._buffer),
+            'sampled_total': self.sampled_count,
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str):
+    """Aktif trace varsa süreyi kaydet, yoksa hiçbir şey yapma"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(name, start, time.perf_counter() - start)
+
+
+def set_trace_attribute(key: str, value):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attributes[key] = value
+
+
+# Global tracer (tüm API modülleri paylaşır)
+tracer = RequestTracer()
@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+MAX_PROFILE_SECONDS = 60
+DEFAULT_INTERVAL = 0.005   # 5 ms -> ~200 örnek/sn
+
+
+class ProfilerBusyError(RuntimeError):
+    """Aynı anda ikinci bir profil isteği geldiğinde"""
+
+
+class SamplingProfiler:
+    """
+    🔥 Time-boxed statistical profiler for a live worker
+
+    While a profile runs, a daemon thread snapshots every thread's stack via
+    sys._current_frames() at a fixed interval. Nothing is installed when idle
+    (no sys.setprofile / settrace hooks), so an inactive profiler costs
+    nothing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_profile: Optional[Dict] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._lock.locked()
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+    def _collapse(self, frame, thread_name: str) -> str:
+        stack = []
+        while frame is not None:
+            stack.append(self._frame_label(frame))
+            frame = frame.f_back
+        stack.append(thread_name)
+        # flamegraph formatı: kök solda, yaprak sağda, ';' ile ayrılmış
+        # (sayı son boşluktan ayrıldığı için frame içindeki boşluklar sorun değil)
+        return ';'.join(reversed(stack))
+
+    def profile(self, seconds: float, interval: float = DEFAULT_INTERVAL,
+                include_idle: bool = False) -> Dict:
+        """Belirtilen süre boyunca tüm thread'leri örnekle (bloklayıcı çağrı)"""
+        seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+        interval = max(interval, 0.001)
+
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running on this worker")
+
+        try:
+            own_ident = threading.get_ident()
+            stacks: Counter = Counter()
+            samples = 0
+            started = time.perf_counter()
+            deadline = started + seconds
+
+            while time.perf_counter() < deadline:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own_ident:
+                        continue
+                    if not include_idle and self._is_idle(frame):
+                        continue
+                    stacks[self._collapse(frame, names.get(ident, f"thread-{ident}"))] += 1
+                samples += 1
+                time.sleep(interval)
+
+            result = {
+                'duration_seconds': round(time.perf_counter() - started, 3),
+                'interval_ms': interval * 1000,
+                'samples': samples,
+                'stacks': dict(stacks),
+            }
+            self.last_profile = result
+            return result
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _is_idle(frame) -> bool:
+        """Kilit/kuyruk/selector beklemesindeki thread'leri ele (gürültü)"""
+        name = frame.f_code.co_name
+        filename = frame.f_code.co_filename
+        if name in ('wait', 'select', 'poll', 'epoll', '_worker', 'accept'):
+            return filename.endswith(('threading.py', 'selectors.py', 'queue.py', 'thread.py', 'socket.py'))
+        return False
+
+
+def to_collapsed(profile: Dict) -> str:
+    """Brendan Gregg collapsed formatı (flamegraph.pl / speedscope ile açılır)"""
+    lines = [f"{stack} {count}" for stack, count in
+             sorted(profile['stacks'].items(), key=lambda x: x[1], reverse=True)]
+    return '\n'.join(lines) + '\n'
+
+
+def top_functions(profile: Dict, limit: int = 20) -> Dict[str, int]:
+    """Yaprak (self) örnek sayısına göre en sık görülen fonksiyonlar"""
+    leaf_counts: Counter = Counter()
+    for stack, count in profile['stacks'].items():
+        leaf_counts[stack.rsplit(';', 1)[-1]] += count
+    return dict(leaf_counts.most_common(limit))
+
+
+# Global profiler (worker başına tek)
+profiler = SamplingProfiler()
@@ -0,0 +1,488 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import create_engine
+
+from database_fixed import Base, MovieSimilarity
+from genre_index import genre_bitmasks, parse_genres
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_K = 20
+DEFAULT_STORE_DIR = 'similar_store'
+DEFAULT_WEIGHTS = {'content': 0.3, 'item_cf': 0.4, 'cooccurrence': 0.3}
+COMPONENTS = ('content', 'item_cf', 'cooccurrence')
+LIKED_THRESHOLD = 4.0
+BLOCK_ROWS = 256
+# Değişen film oranı bunu aşarsa artımlı yerine tam yeniden hesapla
+FULL_REBUILD_FRACTION = 0.25
+
+META_FILE = 'meta.json'
+STORE_ARRAYS = ('movie_ids', 'neighbors', 'scores', 'components')
+
+
+class SimilarityInputs:
+    """Offline job girdileri: film satırları, tür bitmask'leri, seyrek rating matrisleri"""
+
+    def __init__(self, db_ids: np.ndarray, movie_ids: np.ndarray, masks: np.ndarray,
+                 user_idx: np.ndarray, movie_rows: np.ndarray, ratings: np.ndarray):
+        self.db_ids = db_ids
+        self.movie_ids = movie_ids
+        self.masks = masks
+        n_users = int(user_idx.max()) + 1 if len(user_idx) else 0
+        shape = (n_users, len(movie_ids))
+
+        # (users × movies) CSC: kolon (film) dilimleri ucuz
+        self.ratings = sp.csc_matrix((ratings.astype(np.float32), (user_idx, movie_rows)), shape=shape)
+        liked = ratings >= LIKED_THRESHOLD
+        self.liked = sp.csc_matrix(
+            (np.ones(int(liked.sum()), dtype=np.float32), (user_idx[liked], movie_rows[liked])), shape=shape
+        )
+        self.item_norms = np.sqrt(np.asarray(self.ratings.multiply(self.ratings).sum(axis=0)).ravel())
+        self.liked_counts = np.asarray(self.liked.sum(axis=0)).ravel()
+
+    def __len__(self):
+        return len(self.movie_ids)
+
+
+def load_inputs(conn: sqlite3.Connection, fetch_size: int = 200000) -> SimilarityInputs:
+    """Filmleri ve rating'leri SQLite'tan chunk chunk oku"""
+    movies = conn.execute("SELECT id, movie_id, genres FROM movies ORDER BY id").fetchall()
+    db_ids = np.array([m[0] for m in movies], dtype=np.int64)
+    movie_ids = np.array([m[1] for m in movies], dtype=np.int64)
+    masks, _ = genre_bitmasks(parse_genres(m[2]) for m in movies)
+
+    users, items, values = [], [], []
+    cursor = conn.execute("SELECT user_id, movie_id, rating FROM ratings WHERE rating IS NOT NULL")
+    while True:
+        batch = cursor.fetchmany(fetch_size)
+        if not batch:
+            break
+        arr = np.array(batch, dtype=np.float64)
+        users.append(arr[:, 0].astype(np.int64))
+        items.append(arr[:, 1].astype(np.int64))
+        values.append(arr[:, 2])
+
+    if users:
+        user_ids, item_db_ids, ratings = np.concatenate(users), np.concatenate(items), np.concatenate(values)
+    else:
+        user_ids = item_db_ids = np.array([], dtype=np.int64)
+        ratings = np.array([], dtype=np.float64)
+
+    # ratings.movie_id -> movies.id -> satır numarası (db_ids sıralı)
+    pos = np.searchsorted(db_ids, item_db_ids).clip(0, max(len(db_ids) - 1, 0))
+    known = (db_ids[pos] == item_db_ids) if len(db_ids) else np.zeros(len(item_db_ids), dtype=bool)
+    _, user_idx = np.unique(user_ids[known], return_inverse=True)
+
+    logger.info(f"📥 Loaded {len(movie_ids):,} movies, {int(known.sum()):,} ratings")
+    return SimilarityInputs(db_ids, movie_ids, masks, user_idx, pos[known], ratings[known])
+
+
+def score_block(inputs: SimilarityInputs, rows: np.ndarray,
+                weights: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Verilen film satırlarının tüm kataloğa benzerliği.
+    Döner: blended (b, n) ve components (b, n, 3) = content / item-CF / co-occurrence
+    """
+    masks = inputs.masks
+    block_masks = masks[rows][:, None]
+
+    # Content: tür Jaccard'ı (bitmask popcount)
+    inter = np.bitwise_count(block_masks & masks[None, :]).astype(np.float32)
+    union = np.bitwise_count(block_masks | masks[None, :]).astype(np.float32)
+    content = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+    # Item-CF: rating kolonları arasında cosine
+    dots = (inputs.ratings[:, rows].T @ inputs.ratings).toarray()
+    denom = inputs.item_norms[rows][:, None] * inputs.item_norms[None, :]
+    item_cf = np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+    # Co-occurrence: ikisini de beğenen kullanıcılar (beğenen kümelerinin Jaccard'ı)
+    both = (inputs.liked[:, rows].T @ inputs.liked).toarray()
+    either = inputs.liked_counts[rows][:, None] + inputs.liked_counts[None, :] - both
+    cooccurrence = np.divide(both, either, out=np.zeros_like(both), where=either > 0)
+
+    components = np.stack([content, item_cf, cooccurrence], axis=-1).astype(np.float32)
+    blended = components @ np.array([weights[c] for c in COMPONENTS], dtype=np.float32)
+    blended[np.arange(len(rows)), rows] = -np.inf   # kendisi hariç
+    return blended, components
+
+
+def select_top_k(candidate_idx: np.ndarray, candidate_scores: np.ndarray,
+                 candidate_components: np.ndarray, k: int):
+    """Satır başına en yüksek k aday; skoru <= 0 olanlar -1 ile doldurulur"""
+    m, width = candidate_scores.shape
+    k_eff = min(k, width)
+    part = np.argpartition(-candidate_scores, k_eff - 1, axis=1)[:, :k_eff]
+    part_scores = np.take_along_axis(candidate_scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind='stable')
+    part = np.take_along_axis(part, order, axis=1)
+
+    neighbors = np.full((m, k), -1, dtype=np.int32)
+    scores = np.zeros((m, k), dtype=np.float32)
+    components = np.zeros((m, k, len(COMPONENTS)), dtype=np.float32)
+
+    chosen_scores = np.take_along_axis(candidate_scores, part, axis=1)
+    valid = chosen_scores > 0
+    neighbors[:, :k_eff] = np.where(valid, np.take_along_axis(candidate_idx, part, axis=1), -1)
+    scores[:, :k_eff] = np.where(valid, chosen_scores, 0.0)
+    components[:, :k_eff] = np.where(
+        valid[..., None], np.take_along_axis(candidate_components, part[..., None], axis=1), 0.0
+    )
+    return neighbors, scores, components
+
+
+def compute_rows(inputs: SimilarityInputs, rows: np.ndarray, k: int, weights: Dict[str, float],
+                 block_rows: int = BLOCK_ROWS):
+    """Verilen satırların top-k listeleri (blok blok; bellek ~ block × n)"""
+    neighbors = np.full((len(rows), k), -1, dtype=np.int32)
+    scores = np.zeros((len(rows), k), dtype=np.float32)
+    components = np.zeros((len(rows), k, len(COMPONENTS)), dtype=np.float32)
+
+    all_idx = np.arange(len(inputs), dtype=np.int32)
+    for start in range(0, len(rows), block_rows):
+        block = rows[start:start + block_rows]
+        blended, comps = score_block(inputs, block, weights)
+        end = start + len(block)
+        neighbors[start:end], scores[start:end], components[start:end] = select_top_k(
+            np.broadcast_to(all_idx, blended.shape), blended, comps, k
+        )
+    return neighbors, scores, components
+
+
+# 💾 Depolama: memmap (.npy) + SQLite tablosu
+
+def _store_path(store_dir: str, name: str) -> str:
+    return os.path.join(store_dir, f"{name}.npy")
+
+
+def _load_meta(store_dir: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(store_dir, META_FILE)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_meta(store_dir: str, meta: Dict):
+    tmp = os.path.join(store_dir, META_FILE + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(store_dir, META_FILE))
+
+
+def _write_store(store_dir: str, arrays: Dict[str, np.ndarray]):
+    """Tam yazım: geçici dosya + os.replace (açık memmap'li okuyucular eski dosyayı görmeye devam eder)"""
+    os.makedirs(store_dir, exist_ok=True)
+    for name, values in arrays.items():
+        tmp = os.path.join(store_dir, f"{name}.tmp.npy")
+        np.save(tmp, values)
+        os.replace(tmp, _store_path(store_dir, name))
+
+
+def _prepare_table(db_path: str):
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine, tables=[MovieSimilarity.__table__])
+    engine.dispose()
+
+
+def _write_sqlite(conn: sqlite3.Connection, movie_ids: np.ndarray, rows: np.ndarray,
+                  neighbors: np.ndarray, scores: np.ndarray, components: np.ndarray,
+                  built_at: str, full: bool):
+    """Verilen satırların top-k listelerini movie_similarities tablosuna yaz"""
+    if full:
+        conn.execute("DELETE FROM movie_similarities")
+    else:
+        conn.executemany("DELETE FROM movie_similarities WHERE movie_id = ?",
+                         ((int(movie_ids[r]),) for r in rows))
+
+    def records():
+        for r in rows:
+            movie_id = int(movie_ids[r])
+            for rank, nb in enumerate(neighbors[r]):
+                if nb < 0:
+                    break
+                c = components[r, rank]
+                yield (movie_id, rank, int(movie_ids[nb]), float(scores[r, rank]),
+                       float(c[0]), float(c[1]), float(c[2]), built_at)
+
+    conn.executemany(
+        "INSERT INTO movie_similarities (movie_id, rank, similar_movie_id, score, "
+        "content_score, cf_score, cooccurrence_score, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        records()
+    )
+    conn.commit()
+
+
+def _rating_watermark(conn: sqlite3.Connection) -> Dict:
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM ratings").fetchone()[0]
+    return {'max_rating_id': int(max_id), 'timestamp': str(datetime.utcnow())}
+
+
+def _changed_movie_rows(conn: sqlite3.Connection, inputs: SimilarityInputs, watermark: Dict) -> np.ndarray:
+    """Son build'den sonra eklenen/güncellenen rating'i olan filmler"""
+    changed = conn.execute(
+        "SELECT DISTINCT movie_id FROM ratings WHERE id > ? OR created_at > ? OR updated_at > ?",
+        (watermark['max_rating_id'], watermark['timestamp'], watermark['timestamp'])
+    ).fetchall()
+    changed_db_ids = np.array([c[0] for c in changed], dtype=np.int64)
+    pos = np.searchsorted(inputs.db_ids, changed_db_ids).clip(0, max(len(inputs) - 1, 0))
+    return np.unique(pos[inputs.db_ids[pos] == changed_db_ids])
+
+
+def build_full(conn: sqlite3.Connection, inputs: SimilarityInputs, store_dir: str, k: int,
+               weights: Dict[str, float], watermark: Dict, block_rows: int = BLOCK_ROWS) -> Dict:
+    """Tüm katalog için top-k tablosu"""
+    started = time.perf_counter()
+    rows = np.arange(len(inputs))
+    neighbors, scores, components = compute_rows(inputs, rows, k, weights, block_rows)
+
+    _write_store(store_dir, {
+        'movie_ids': inputs.movie_ids,
+        'neighbors': neighbors,
+        'scores': scores,
+        'components': components,
+    })
+    _write_sqlite(conn, inputs.movie_ids, rows, neighbors, scores, components,
+                  watermark['timestamp'], full=True)
+
+    meta = {
+        'k': k,
+        'weights': weights,
+        'n_movies': len(inputs),
+        'built_at': watermark['timestamp'],
+        'mode': 'full',
+        'updated_rows': len(rows),
+        'rating_watermark': watermark,
+        'duration_seconds': round(time.perf_counter() - started, 3),
+    }
+    _write_meta(store_dir, meta)
+    logger.info(f"✅ Full similar-movies build: {len(rows):,} movies in {meta['duration_seconds']}s")
+    return meta
+
+
+def build_incremental(conn: sqlite3.Connection, inputs: SimilarityInputs, store_dir: str,
+                      meta: Dict, weights: Dict[str, float], watermark: Dict,
+                      block_rows: int = BLOCK_ROWS, merge_rows: int = 4096) -> Optional[Dict]:
+    """
+    Yalnızca rating'i değişen filmlerin satırlarını yeniden hesapla.
+
+    Item-CF ve co-occurrence iki filmin kendi kolonlarına bağlı olduğundan,
+    değişmeyen filmler arasındaki skorlar aynı kalır. Değişen filmler ve
+    listesinde değişen bir film bulunanlar tam hesaplanır; geri kalan
+    listeler yalnızca değişen filmlerin skor kolonlarıyla birleştirilir.
+    Tam build gerekiyorsa None döner.
+    """
+    movie_ids = np.load(_store_path(store_dir, 'movie_ids'))
+    if not np.array_equal(movie_ids, inputs.movie_ids):
+        logger.info("🔄 Catalog changed since last build, falling back to full rebuild")
+        return None
+
+    changed = _changed_movie_rows(conn, inputs, meta['rating_watermark'])
+
+    started = time.perf_counter()
+    k = meta['k']
+    touched = np.zeros(len(inputs), dtype=bool)
+
+    if len(changed):
+        # n × k listeler bellekte küçük; birleştirmeyi kopyada yap, sonra yeni dosya olarak yaz
+        neighbors = np.load(_store_path(store_dir, 'neighbors'))
+        scores = np.load(_store_path(store_dir, 'scores'))
+        components = np.load(_store_path(store_dir, 'components'))
+        old_neighbors, old_scores = neighbors.copy(), scores.copy()
+
+        is_changed = np.zeros(len(inputs), dtype=bool)
+        is_changed[changed] = True
+
+        # Listesinde değişen bir film olanlar: o film düşerse yerine k dışından biri
+        # gelebilir, bu yüzden bunlar da tam hesaplanır
+        holds_changed = ((neighbors >= 0) & is_changed[np.maximum(neighbors, 0)]).any(axis=1)
+        recompute = np.flatnonzero(is_changed | holds_changed)
+        if len(recompute) > FULL_REBUILD_FRACTION * len(inputs):
+            logger.info(f"🔄 {len(recompute):,} lists affected, falling back to full rebuild")
+            return None
+        merge_targets = np.flatnonzero(~(is_changed | holds_changed))
+
+        stale_rows = np.flatnonzero(holds_changed & ~is_changed)
+        neighbors[stale_rows], scores[stale_rows], components[stale_rows] = compute_rows(
+            inputs, stale_rows, k, weights, block_rows
+        )
+
+        all_idx = np.arange(len(inputs), dtype=np.int32)
+        for start in range(0, len(changed), block_rows):
+            block = changed[start:start + block_rows]
+            blended, comps = score_block(inputs, block, weights)
+            neighbors[block], scores[block], components[block] = select_top_k(
+                np.broadcast_to(all_idx, blended.shape), blended, comps, k
+            )
+
+            # Simetri: bloğun skor kolonları diğer filmler için yeni adaylar
+            for offset in range(0, len(merge_targets), merge_rows):
+                rows = merge_targets[offset:offset + merge_rows]
+                neighbors[rows], scores[rows], components[rows] = select_top_k(
+                    np.concatenate([neighbors[rows], np.broadcast_to(block.astype(np.int32), (len(rows), len(block)))], axis=1),
+                    np.concatenate([scores[rows], blended[:, rows].T], axis=1),
+                    np.concatenate([components[rows], comps[:, rows].transpose(1, 0, 2)], axis=1),
+                    k,
+                )
+
+        touched = is_changed | (neighbors != old_neighbors).any(axis=1) | (scores != old_scores).any(axis=1)
+        touched_rows = np.flatnonzero(touched)
+
+        # Yerinde (r+) yazmak, aynı dosyayı okuyan worker'lara yarı yeni satır gösterir:
+        # yeni dosyalar os.replace ile yayınlanır, meta.json en son yazılır
+        _write_store(store_dir, {'neighbors': neighbors, 'scores': scores, 'components': components})
+
+        _write_sqlite(conn, inputs.movie_ids, touched_rows, neighbors, scores, components,
+                      watermark['timestamp'], full=False)
+
+    meta = dict(meta, built_at=watermark['timestamp'], mode='incremental',
+                changed_movies=len(changed), updated_rows=int(touched.sum()),
+                rating_watermark=watermark,
+                duration_seconds=round(time.perf_counter() - started, 3))
+    _write_meta(store_dir, meta)
+    logger.info(f"✅ Incremental build: {len(changed):,} changed movies, "
+                f"{meta['updated_rows']:,} lists updated in {meta['duration_seconds']}s")
+    return meta
+
+
+def build(db_path: str = 'movie_recommendation.db', store_dir: str = DEFAULT_STORE_DIR,
+          k: int = DEFAULT_K, weights: Optional[Dict[str, float]] = None,
+          full: bool = False, block_rows: int = BLOCK_ROWS) -> Dict:
+    """🔗 Offline top-k similar-movies job (varsayılan: mümkünse artımlı)"""
+    weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+    _prepare_table(db_path)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        # Watermark rating'ler okunmadan önce alınır: build sırasında gelenler bir sonraki tura kalır
+        watermark = _rating_watermark(conn)
+        inputs = load_inputs(conn)
+        if not len(inputs):
+            raise ValueError("No movies in database")
+
+        meta = None if full else _load_meta(store_dir)
+        if meta is not None and meta.get('k') == k and meta.get('weights') == weights:
+            result = build_incremental(conn, inputs, store_dir, meta, weights, watermark, block_rows)
+            if result is not None:
+                return result
+        return build_full(conn, inputs, store_dir, k, weights, watermark, block_rows)
+    finally:
+        conn.close()
+
+
+class SimilarMoviesIndex:
+    """
+    📚 Read side of the precomputed table for the API workers
+
+    Arrays are opened with mmap_mode='r', so every worker shares the page
+    cache and a lookup is one row read. meta.json is re-checked at most every
+    RELOAD_CHECK_SECONDS to pick up rebuilds.
+    """
+
+    RELOAD_CHECK_SECONDS = 30
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+        self._state = None
+        self._meta_mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.RELOAD_CHECK_SECONDS:
+            return
+        with self._lock:
+            if now - self._checked_at < self.RELOAD_CHECK_SECONDS:
+                return
+            self._checked_at = now
+            try:
+                mtime = os.stat(os.path.join(self.store_dir, META_FILE)).st_mtime
+            except FileNotFoundError:
+                self._state = None
+                return
+            if mtime == self._meta_mtime and self._state is not None:
+                return
+            try:
+                arrays = {name: np.load(_store_path(self.store_dir, name), mmap_mode='r')
+                          for name in STORE_ARRAYS}
+                meta = _load_meta(self.store_dir)
+            except (FileNotFoundError, ValueError) as e:
+                logger.warning(f"⚠️ Similar-movies store unreadable: {e}")
+                self._state = None
+                return
+            row_by_movie_id = {int(m): i for i, m in enumerate(arrays['movie_ids'])}
+            self._state = (arrays, row_by_movie_id, meta)
+            self._meta_mtime = mtime
+            logger.info(f"📚 Similar-movies store loaded ({len(row_by_movie_id):,} movies)")
+
+    @property
+    def is_ready(self) -> bool:
+        self._maybe_reload()
+        return self._state is not None
+
+    @property
+    def version(self) -> Optional[float]:
+        """Yüklü tablonun meta.json mtime'ı (tablo yoksa None); ETag parçası"""
+        self._maybe_reload()
+        return self._meta_mtime if self._state is not None else None
+
+    def lookup(self, movie_id: int, n: int = DEFAULT_K) -> Optional[List[Tuple[int, float]]]:
+        """(similar_movie_id, score) listesi; tablo yoksa veya film tabloda yoksa None"""
+        self._maybe_reload()
+        state = self._state
+        if state is None:
+            return None
+        arrays, row_by_movie_id, _ = state
+        row = row_by_movie_id.get(int(movie_id))
+        if row is None:
+            return None
+        neighbors = arrays['neighbors'][row, :n]
+        scores = arrays['scores'][row, :n]
+        movie_ids = arrays['movie_ids']
+        return [(int(movie_ids[nb]), float(sc)) for nb, sc in zip(neighbors, scores) if nb >= 0]
+
+    def status(self) -> Dict:
+        self._maybe_reload()
+        if self._state is None:
+            return {'ready': False, 'store_dir': self.store_dir}
+        meta = self._state[2] or {}
+        return {'ready': True, 'store_dir': self.store_dir,
+                **{key: meta.get(key) for key in ('k', 'n_movies', 'built_at', 'mode', 'weights')}}
+
+
+# Global okuyucu (worker başına tek)
+similar_index = SimilarMoviesIndex(os.environ.get('SIMILAR_STORE_DIR', DEFAULT_STORE_DIR))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline top-K similar-movies table builder")
+    parser.add_argument('--db', default='movie_recommendation.db', help="SQLite database path")
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR, help="Memmap output directory")
+    parser.add_argument('--k', type=int, default=DEFAULT_K, help="Neighbours kept per movie")
+    parser.add_argument('--full', action='store_true', help="Force a full rebuild")
+    parser.add_argument('--block-rows', type=int, default=BLOCK_ROWS,
+                        help="Movies scored per block (memory ~ block × catalog × 16 bytes)")
+    for component in COMPONENTS:
+        parser.add_argument(f"--{component.replace('_', '-')}-weight", type=float,
+                            default=DEFAULT_WEIGHTS[component])
+    args = parser.parse_args()
+
+    weights = {c: getattr(args, f"{c}_weight") for c in COMPONENTS}
+    meta = build(args.db, args.store, args.k, weights, args.full, args.block_rows)
+    print(json.dumps(meta, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import asyncio
+import functools
+import weakref
+from typing import Awaitable, Callable, Hashable
+
+from prometheus_metrics import SINGLE_FLIGHT_CALLS, record_cache
+
+
+class SingleFlight:
+    """
+    🛫 Coalesce concurrent identical async computations
+
+    The first caller for a key starts the computation as its own task; every
+    caller that arrives while it is running awaits the same task instead of
+    starting another one. The task is shielded, so a disconnected client
+    does not cancel the work for the others. Nothing is cached once the
+    task finishes: the next call for the key computes again.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        # Task'lar event loop'a bağlıdır; loop başına ayrı tablo
+        self._inflight = weakref.WeakKeyDictionary()
+
+    def _table(self) -> dict:
+        loop = asyncio.get_running_loop()
+        table = self._inflight.get(loop)
+        if table is None:
+            table = self._inflight[loop] = {}
+        return table
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable]):
+        """func()'ı key için tek sefer çalıştır; eşzamanlı çağıranlar sonucu paylaşır"""
+        table = self._table()
+        task = table.get(key)
+        # Hit: sonuç zaten hesaplanıyor, bu çağrı onu paylaşır
+        record_cache(f"single_flight_{self.name}", task is not None)
+        if task is None:
+            SINGLE_FLIGHT_CALLS.labels(self.name, 'leader').inc()
+            task = table[key] = asyncio.ensure_future(func())
+            task.add_done_callback(functools.partial(self._finished, table, key))
+        else:
+            SINGLE_FLIGHT_CALLS.labels(self.name, 'coalesced').inc()
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _finished(table: dict, key, task: asyncio.Future):
+        if table.get(key) is task:
+            del table[key]
+        if not task.cancelled():
+            task.exception()  # bekleyen kalmadıysa "never retrieved" uyarısı olmasın
+
+    def in_flight(self) -> int:
+        try:
+            return len(self._table())
+        except RuntimeError:
+            return 0
@@ -0,0 +1,119 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+# Havuz boyutu ve kilit bekleme süresi env ile ayarlanabilir
+SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', '4'))
+SQLITE_POOL_TIMEOUT = float(os.environ.get('SQLITE_POOL_TIMEOUT', '30'))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', '5000'))
+
+
+class SQLiteConnectionPool:
+    """
+    🔌 Bounded pool of raw sqlite3 connections for one database file
+
+    Code that talks to SQLite directly (pandas.read_sql_query, executemany
+    jobs) borrows a connection instead of opening and closing one per call.
+    Connections are opened lazily up to `size`, configured once (WAL,
+    busy_timeout) and shared across executor threads, one borrower at a
+    time. A borrower that leaves a transaction open gets it rolled back on
+    return; a connection that fails that rollback is discarded.
+    """
+
+    def __init__(self, db_path: str, size: int = SQLITE_POOL_SIZE, timeout: float = SQLITE_POOL_TIMEOUT):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()  # En son kullanılan bağlantı önce (sıcak cache)
+        self._opened = 0
+        self._in_use = 0
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No SQLite connection available for {self.db_path} "
+                               f"within {self.timeout:.0f}s") from None
+
+    def _release(self, conn: sqlite3.Connection):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as conn: ... (commit çağıranın sorumluluğunda)"""
+        conn = self._acquire()
+        with self._lock:
+            self._in_use += 1
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._release(conn)
+
+    def stats(self) -> Dict:
+        return {'db_path': self.db_path, 'size': self.size, 'opened': self._opened, 'in_use': self._in_use}
+
+    def close(self):
+        """Boştaki bağlantıları kapat (kullanımdakiler iade edildiğinde havuza döner)"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> SQLiteConnectionPool:
+    """Dosya başına paylaşılan havuz (aynı dosyaya farklı yazılmış path'ler tek havuz)"""
+    key = os.path.abspath(db_path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = SQLiteConnectionPool(db_path)
+    return pool
+
+
+def pool_stats() -> Dict[str, Dict]:
+    return {key: pool.stats() for key, pool in _pools.items()}
@@ -0,0 +1,55 @@
+import asyncio
+import os
+import tempfile
+
+from enhanced_hybrid_recommender_v6 import EnhancedHybridRecommender, EnhancedRecommendationAPI
+from generate_synthetic_data import export_matrix_pickle, generate
+from jobs import FAILED, SUCCEEDED, JobRunner
+
+TEST_USERS = list(range(1, 21))
+
+
+def test_ab_test_job():
+    print("🧪 A/B test işi testi başlıyor...")
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'movies.db')
+    matrix_path = os.path.join(workdir, 'user_movie_matrix.pkl')
+    store_dir = os.path.join(workdir, 'ratings')
+    generate(n_users=150, n_movies=80, n_ratings=4000, output_dir=store_dir, db_path=db_path, seed=5)
+    export_matrix_pickle(store_dir, matrix_path)
+
+    # app_enhanced_v6 ile aynı bağlantı: serving model + job runner hook'ları
+    api = EnhancedRecommendationAPI()
+    api.recommender = EnhancedHybridRecommender(db_path, matrix_path)
+    runner = JobRunner(db_path, matrix_path, workers=1)
+    runner.on_success('ab_test', api.apply_ab_test_results)
+
+    async def scenario():
+        # Test 1: İş kuyruğa alınır ve worker process'te tamamlanır
+        job_id = await runner.submit('ab_test', {'test_users': TEST_USERS})
+        print(f"✅ Job {job_id} kuyrukta")
+        job = None
+        for _ in range(600):
+            job = await runner.get(job_id)
+            if job['status'] in (SUCCEEDED, FAILED) and runner.stats()['pending'] == 0:
+                break
+            await asyncio.sleep(0.2)
+        assert job['status'] == SUCCEEDED, f"Job {job['status']}: {job['error']}"
+        print(f"✅ Job tamamlandı (en iyi: {job['result']['best_algorithm']})")
+
+        # Test 2: Sonuçlar serving model'in analytics'inde (worker'daki kopyada kalmadı)
+        analytics = await api.get_performance_analytics()
+        assert analytics['ab_test_results'] == job['result']['results'], "A/B sonuçları analytics'e yansımadı"
+        quality = analytics['recommendation_quality']
+        assert quality['avg_f1_score'] == job['result']['results']['hybrid_v6']['f1_score']
+        print(f"✅ Analytics A/B sonuçlarını gösteriyor (hybrid F1: {quality['avg_f1_score']:.4f})")
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        runner.shutdown()
+    print("\n✅ Test tamamlandı!")
+
+
+if __name__ == "__main__":
+    test_ab_test_job()
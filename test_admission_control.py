@@ -0,0 +1,88 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from admission_control import (ADMIT, DEGRADE, SHED, AdmissionController, install_admission_control,
+                               is_degraded)
+
+
+class FakeExecutor:
+    """Yalnızca queue_delay() sinyali veren executor"""
+
+    def __init__(self, delay_seconds: float = 0.0):
+        self.delay_seconds = delay_seconds
+
+    def queue_delay(self) -> float:
+        return self.delay_seconds
+
+
+def test_admission_decisions():
+    print("🧪 Admission karar testi başlıyor...")
+    cpu, db = FakeExecutor(), FakeExecutor()
+    controller = AdmissionController([cpu, db], degrade_in_flight=2, shed_in_flight=4,
+                                     degrade_queue_ms=200, shed_queue_ms=1000)
+
+    # Test 1: In-flight eşikleri
+    assert controller.decide() == ADMIT
+    decisions = []
+    for _ in range(4):
+        controller.enter()
+        decisions.append(controller.decide())
+    assert decisions == [ADMIT, DEGRADE, DEGRADE, SHED]
+    for _ in range(4):
+        controller.exit()
+    assert controller.in_flight == 0 and controller.decide() == ADMIT
+    print("✅ In-flight: admit -> degrade -> shed -> admit")
+
+    # Test 2: En yavaş executor'ın kuyruk gecikmesi belirler
+    db.delay_seconds = 0.25
+    assert controller.decide() == DEGRADE and controller.queue_delay_ms() == 250
+    cpu.delay_seconds = 1.5
+    assert controller.decide() == SHED
+    cpu.delay_seconds = db.delay_seconds = 0.0
+    assert controller.decide() == ADMIT
+    print("✅ Kuyruk gecikmesi: degrade ve shed eşikleri")
+    print("\n✅ Test tamamlandı!")
+
+
+def test_admission_middleware():
+    print("🧪 Admission middleware testi başlıyor...")
+    executor = FakeExecutor()
+    controller = AdmissionController([executor], degrade_in_flight=1, shed_in_flight=3,
+                                     degrade_queue_ms=200, shed_queue_ms=1000)
+    app = FastAPI()
+    install_admission_control(app, controller)
+
+    @app.get("/recommendations")
+    async def recommendations(request: Request):
+        return {"degraded": is_degraded(request), "in_flight": controller.in_flight}
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    client = TestClient(app)
+
+    # Test 1: Boşta tam kabul, istek bitince sayaç düşer
+    response = client.get("/recommendations")
+    assert response.status_code == 200 and response.json() == {"degraded": False, "in_flight": 1}
+    assert controller.in_flight == 0
+    print("✅ Normal yükte tam kabul")
+
+    # Test 2: Yavaş kuyrukta degrade mod handler'a iletilir
+    executor.delay_seconds = 0.5
+    assert client.get("/recommendations").json()["degraded"] is True
+    print("✅ Degrade kararı request.state ile handler'a ulaştı")
+
+    # Test 3: Shed: 503 + Retry-After, handler çalışmaz; exempt path'ler etkilenmez
+    executor.delay_seconds = 2.0
+    shed = client.get("/recommendations")
+    assert shed.status_code == 503 and shed.headers["retry-after"].isdigit()
+    assert controller.in_flight == 0
+    assert client.get("/health").status_code == 200
+    print("✅ Aşırı yükte 503 + Retry-After, /health yine 200")
+    print("\n✅ Test tamamlandı!")
+
+
+if __name__ == "__main__":
+    test_admission_decisions()
+    test_admission_middleware()
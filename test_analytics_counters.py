@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta
+
+from analytics_counters import compact, compact_once, ensure_tables
+from generate_synthetic_data import generate
+from genre_index import parse_genres
+
+
+def _full_recount(conn):
+    """Sayaç tablolarının karşılığı: ratings/users üzerinde tam tarama"""
+    daily = Counter(dict(conn.execute(
+        "SELECT date(created_at), COUNT(*) FROM ratings GROUP BY 1").fetchall()))
+    users = Counter(dict(conn.execute(
+        "SELECT date(created_at), COUNT(*) FROM users GROUP BY 1").fetchall()))
+    genres = Counter()
+    for genre_string, count in conn.execute(
+            "SELECT m.genres, COUNT(*) FROM ratings r JOIN movies m ON m.id = r.movie_id GROUP BY m.genres"):
+        for genre in parse_genres(genre_string):
+            genres[genre] += count
+    return daily, users, genres
+
+
+def _counters(conn):
+    rows = conn.execute("SELECT day, ratings, new_users, rerates FROM analytics_daily").fetchall()
+    daily = Counter({day: n for day, n, _, _ in rows if n})
+    users = Counter({day: n for day, _, n, _ in rows if n})
+    rerates = Counter({day: n for day, _, _, n in rows if n})
+    genres = Counter(dict(conn.execute("SELECT genre, ratings FROM analytics_genres").fetchall()))
+    return daily, users, genres, rerates
+
+
+def test_analytics_counters():
+    print("🧪 Analytics sayaç testi başlıyor...")
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'movies.db')
+    generate(n_users=200, n_movies=80, n_ratings=3000, output_dir=os.path.join(workdir, 'ratings'),
+             db_path=db_path, seed=3)
+    ensure_tables(db_path)
+    conn = sqlite3.connect(db_path)
+
+    # Test 1: Küçük batch'lerle compaction = tam tarama
+    result = compact(db_path, batch=700)
+    assert result['ratings'] == 3000 and result['users'] == 200
+    daily, users, genres, rerates = _counters(conn)
+    assert (daily, users, genres) == _full_recount(conn)
+    assert not rerates
+    print(f"✅ Sayaçlar tam taramayla aynı ({len(daily)} gün, {len(genres)} tür)")
+
+    # Test 2: Re-rate'ler kendi watermark'ıyla updated_at gününe sayılır, yeni rating'ler ayrıca
+    later = datetime.utcnow() + timedelta(seconds=5)
+    rerated_ids = [row[0] for row in conn.execute("SELECT id FROM ratings ORDER BY id LIMIT 25")]
+    conn.executemany("UPDATE ratings SET rating = 5.0, updated_at = ? WHERE id = ?",
+                     [(str(later), row_id) for row_id in rerated_ids])
+    taken = set(conn.execute("SELECT user_id, movie_id FROM ratings").fetchall())
+    new_rows = [(u, m) for u in range(1, 30) for m in (1, 2) if (u, m) not in taken][:10]
+    conn.executemany("INSERT INTO ratings (user_id, movie_id, rating, created_at, updated_at) "
+                     "VALUES (?, ?, 4.0, ?, ?)", [(u, m, str(later), str(later)) for u, m in new_rows])
+    conn.commit()
+
+    counts = compact_once(db_path)
+    assert counts['ratings'] == len(new_rows)
+    daily, users, genres, rerates = _counters(conn)
+    assert (daily, users, genres) == _full_recount(conn)
+    assert rerates == Counter({later.date().isoformat(): 25})
+    print(f"✅ {sum(rerates.values())} re-rate ve {len(new_rows)} yeni rating ayrı sayıldı")
+
+    # Test 3: Tekrar çalıştırmak hiçbir şeyi ikinci kez saymaz
+    assert compact_once(db_path) == {'ratings': 0, 'rating_updates': 0, 'users': 0}
+    assert _counters(conn)[3] == rerates
+    print("✅ İkinci geçiş boş, çift sayım yok")
+    conn.close()
+    print("\n✅ Test tamamlandı!")
+
+
+if __name__ == "__main__":
+    test_analytics_counters()
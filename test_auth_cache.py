@@ -0,0 +1,55 @@
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from auth import AuthCache, RevocationStore, create_access_token
+
+
+def test_auth_cache_revocation():
+    print("🧪 Auth cache iptal testi başlıyor...")
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'auth.db')}")
+    # İki worker: ayrı cache'ler, aynı veritabanı
+    worker_a = AuthCache(revocations=RevocationStore(sessionmaker(bind=engine)), revocation_check_seconds=0.2)
+    worker_b = AuthCache(revocations=RevocationStore(sessionmaker(bind=engine)), revocation_check_seconds=0.2)
+    token = create_access_token({"sub": "alice"})
+    other = create_access_token({"sub": "bob"})
+
+    # Test 1: Her iki worker token'ı doğrular ve cache'ler
+    assert worker_a.verify(token) == "alice"
+    assert worker_b.verify(token) == "alice"
+    assert worker_b.stats()['tokens'] == 1
+    print("✅ Token iki worker'da da geçerli")
+
+    # Test 2: A'da çıkış -> A hemen reddeder, B cache süresi dolunca reddeder
+    worker_a.revoke(token)
+    assert worker_a.verify(token) is None
+    time.sleep(0.3)
+    assert worker_b.verify(token) is None
+    assert worker_b.stats()['revoked'] == 1
+    print("✅ Başka worker'daki çıkış paylaşılan tablodan görüldü")
+
+    # Test 3: Diğer token'lar etkilenmez; yeni bir worker da iptali görür
+    assert worker_b.verify(other) == "bob"
+    worker_c = AuthCache(revocations=RevocationStore(sessionmaker(bind=engine)))
+    assert worker_c.verify(token) is None
+    assert worker_c.verify(other) == "bob"
+    print("✅ İptal yalnızca çıkış yapılan token'a uygulandı")
+
+    # Test 4: Süresi dolmuş iptal kayıtları sonraki çıkışta temizlenir
+    short = create_access_token({"sub": "carol"}, expires_delta=timedelta(seconds=1))
+    worker_a.revoke(short)
+    time.sleep(1.1)
+    worker_a.revoke(other)
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("SELECT username FROM revoked_tokens ORDER BY username").fetchall()
+    assert [row[0] for row in rows] == ["alice", "bob"]
+    print("✅ Süresi dolmuş iptal kaydı silindi")
+    print("\n✅ Test tamamlandı!")
+
+
+if __name__ == "__main__":
+    test_auth_cache_revocation()
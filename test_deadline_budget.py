@@ -0,0 +1,76 @@
+import os
+import tempfile
+import time
+
+from enhanced_hybrid_recommender_v6 import HYBRID_COMPONENT_ORDER, EnhancedHybridRecommender, _check_deadline
+from generate_synthetic_data import export_matrix_pickle, generate
+
+
+def _recommender():
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'movies.db')
+    matrix_path = os.path.join(workdir, 'user_movie_matrix.pkl')
+    store_dir = os.path.join(workdir, 'ratings')
+    generate(n_users=150, n_movies=80, n_ratings=4000, output_dir=store_dir, db_path=db_path, seed=9)
+    export_matrix_pickle(store_dir, matrix_path)
+    recommender = EnhancedHybridRecommender(db_path, matrix_path)
+    assert recommender.initialize_system()
+    return recommender
+
+
+def _scores(recommendations):
+    return [(rec['movie_id'], round(rec['hybrid_score'], 9)) for rec in recommendations]
+
+
+def test_deadline_budget():
+    print("🧪 Deadline bütçesi testi başlıyor...")
+    recommender = _recommender()
+    user_id = int(recommender.user_movie_matrix.index[0])
+    total_weight = sum(recommender.algorithm_weights.values())
+
+    # Test 1: Bütçe yoksa ya da yeterliyse tüm bileşenler, sonuç aynı
+    unbounded, report = recommender.hybrid_recommendations_with_report(user_id, 10)
+    assert report['components_dropped'] == {} and report['remaining_ms'] is None
+    assert len(report['components_used']) == len(HYBRID_COMPONENT_ORDER)
+    generous, report = recommender.hybrid_recommendations_with_report(user_id, 10, time.monotonic() + 60)
+    assert report['components_dropped'] == {} and _scores(generous) == _scores(unbounded)
+    assert _scores(recommender.hybrid_recommendations(user_id, 10)) == _scores(unbounded)
+    print(f"✅ Geniş bütçede 4 bileşen, {len(unbounded)} öneri birebir aynı")
+
+    # Test 2: Bütçe bitmişse yalnızca popülerlik tabanı çalışır, yine de öneri döner
+    floor, report = recommender.hybrid_recommendations_with_report(user_id, 10, time.monotonic() - 0.001)
+    assert report['components_used'] == ['popularity_based']
+    assert report['components_dropped'] == {c: 'budget_exhausted' for c in HYBRID_COMPONENT_ORDER[1:]}
+    assert floor and all(rec['algorithm_breakdown']['cf_contribution'] == 0 for rec in floor)
+    print(f"✅ Bütçe bitmiş: popülerlik tabanından {len(floor)} öneri")
+
+    # Test 3: Payını aşan bileşenler düşer; kalan ağırlıklar toplamı koruyacak şekilde ölçeklenir
+    def slow_content(user, n):
+        time.sleep(0.6)  # Kooperatif kontrol yok -> over_budget
+        return [(1, 1.0)]
+
+    def endless_cf(user, n):
+        while True:     # Kooperatif kontrol -> timeout
+            _check_deadline()
+            time.sleep(0.005)
+
+    recommender.content_based_recommendations = slow_content
+    recommender.collaborative_filtering_recommendations = endless_cf
+    started = time.monotonic()
+    degraded, report = recommender.hybrid_recommendations_with_report(user_id, 10, started + 1.0)
+    elapsed = time.monotonic() - started
+    assert report['components_dropped'] == {'content_based': 'over_budget', 'collaborative_filtering': 'timeout'}
+    assert report['components_used'] == ['matrix_factorization', 'popularity_based']
+    assert elapsed < 1.1, f"Bütçe aşıldı: {elapsed:.3f}s"  # Füzyon payı + zamanlayıcı toleransı
+    weights = recommender._renormalized_weights({c: [] for c in report['components_used']})
+    assert abs(sum(weights.values()) - total_weight) < 1e-9
+    for rec in degraded:
+        breakdown = rec['algorithm_breakdown']
+        assert breakdown['cf_contribution'] == 0 and breakdown['content_contribution'] == 0
+        assert abs(breakdown['mf_contribution'] + breakdown['popularity_contribution'] - rec['hybrid_score']) < 1e-9
+    print(f"✅ İki bileşen düştü, {elapsed * 1000:.0f} ms'de {len(degraded)} öneri (bütçe 1000 ms)")
+    print("\n✅ Test tamamlandı!")
+
+
+if __name__ == "__main__":
+    test_deadline_budget()
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from enhanced_hybrid_recommender_v6 import EnhancedHybridRecommender
+from genre_index import genre_bitmasks
+
+GENRES = ["Action", "Comedy", "Drama", "Horror", "Romance", "Sci-Fi", "Thriller", "Animation"]
+UNKNOWN_MOVIE = 5000   # Öneride var, katalogda yok
+ORPHAN_MOVIES = [901, 902]   # Matriste puanı var, katalogda yok
+
+
+def baseline_metrics(movies_df, recommendations, actual_ratings):
+    """Vektörleştirme öncesi evaluate_recommendations döngüsü (karşılaştırma için birebir kopya)"""
+    recommended_movies = [rec['movie_id'] for rec in recommendations]
+    valid_actual_ratings = {mid: rating for mid, rating in actual_ratings.items()
+                            if mid in movies_df['movie_id'].values}
+    if not valid_actual_ratings:
+        return {'precision': 0.0, 'recall': 0.0, 'f1_score': 0.0,
+                'coverage': 0.1, 'diversity': 0.5, 'novelty': 0.5}
+
+    true_positives = len([mid for mid in recommended_movies
+                          if mid in valid_actual_ratings and valid_actual_ratings[mid] >= 4.0])
+    all_liked_movies = [mid for mid, rating in valid_actual_ratings.items() if rating >= 4.0]
+    precision = true_positives / len(recommended_movies) if recommended_movies else 0
+    recall = true_positives / len(all_liked_movies) if all_liked_movies else 0
+    f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
+    coverage = len(set(recommended_movies)) / len(movies_df)
+
+    genres_in_recs = set()
+    for rec in recommendations:
+        if rec.get('genres') and isinstance(rec['genres'], list):
+            genres_in_recs.update(rec['genres'])
+    diversity = min(len(genres_in_recs) / 20, 1.0)
+
+    novelty_scores = [1 / (rec.get('popularity', 1) + 1) for rec in recommendations]
+    novelty = np.mean(novelty_scores) if novelty_scores else 0.5
+    return {'precision': precision, 'recall': recall, 'f1_score': f1,
+            'coverage': coverage, 'diversity': diversity, 'novelty': novelty}
+
+
+def _fixture(seed=11):
+    rng = np.random.default_rng(seed)
+    movie_ids = np.arange(1, 61)
+    genres = [list(rng.choice(GENRES, size=rng.integers(1, 4), replace=False)) for _ in movie_ids]
+    movies_df = pd.DataFrame({'movie_id': movie_ids, 'genres_processed': genres,
+                              'popularity': rng.integers(0, 300, len(movie_ids)).astype(float)})
+
+    user_ids = np.arange(1, 41)
+    columns = np.concatenate([movie_ids, ORPHAN_MOVIES])
+    values = np.where(rng.random((len(user_ids), len(columns))) < 0.3,
+                      rng.integers(1, 6, (len(user_ids), len(columns))), np.nan).astype(float)
+    values[0, :len(movie_ids)] = np.nan             # Yalnızca katalog dışı puanlar -> sabit metrikler
+    values[1] = np.where(np.isnan(values[1]), np.nan, 2.0)   # Puanı var, beğendiği yok
+    matrix = pd.DataFrame(values, index=user_ids, columns=columns)
+
+    recommender = EnhancedHybridRecommender()
+    recommender.movies_df = movies_df
+    recommender.user_movie_matrix = matrix
+    recommender.movie_genre_bits, recommender.genre_registry = genre_bitmasks(movies_df['genres_processed'])
+
+    cards = {int(m): {'movie_id': int(m), 'genres': g, 'popularity': int(p)}
+             for m, g, p in zip(movie_ids, genres, movies_df['popularity'])}
+    test_users = list(user_ids) + [999]            # 999 matriste yok
+    recommendations = []
+    for i, _ in enumerate(test_users):
+        picked = [int(m) for m in rng.choice(movie_ids, size=10, replace=False)]
+        if i % 4 == 0:
+            picked[3] = UNKNOWN_MOVIE              # Katalog dışı öneri
+        if i % 5 == 0:
+            picked[7] = picked[2]                  # Tekrarlanan öneri
+        recommendations.append([cards.get(m, {'movie_id': m}) for m in picked])
+    return recommender, test_users, recommendations
+
+
+def _actual_ratings(matrix, user_id):
+    return matrix.loc[user_id].dropna().to_dict() if user_id in matrix.index else {}
+
+
+def test_evaluation_kernels_match_baseline():
+    print("🧪 Vektörleştirilmiş metrik kernel testi başlıyor...")
+    recommender, test_users, recommendations = _fixture()
+    names = ['precision', 'recall', 'f1_score', 'coverage', 'diversity', 'novelty']
+    expected = [baseline_metrics(recommender.movies_df, recs, _actual_ratings(recommender.user_movie_matrix, u))
+                for u, recs in zip(test_users, recommendations)]
+
+    # Test 1: Toplu değerlendirme eski döngüyle kullanıcı bazında aynı
+    batch = recommender.evaluate_batch(test_users, recommendations)
+    for name in names:
+        np.testing.assert_allclose(batch[name], [e[name] for e in expected], atol=1e-12, err_msg=name)
+    print(f"✅ evaluate_batch = eski döngü ({len(test_users)} kullanıcı, {len(names)} metrik)")
+
+    # Test 2: Özel durumlar gerçekten fixture'da var
+    assert expected[0]['coverage'] == 0.1 and batch['coverage'][0] == 0.1
+    assert expected[-1]['novelty'] == 0.5 and batch['coverage'][-1] == 0.1
+    assert expected[1]['coverage'] != 0.1 and batch['precision'][1] == 0.0
+    print("✅ Puansız kullanıcı sabit metrikleri, beğenisiz kullanıcı normal hesaplandı")
+
+    # Test 3: Tek kullanıcılık evaluate_recommendations da aynı kernel ile aynı sonucu verir
+    for user_id, recs, exp in zip(test_users, recommendations, expected):
+        single = recommender.evaluate_recommendations(
+            user_id, recs, _actual_ratings(recommender.user_movie_matrix, user_id))
+        for name in names:
+            assert abs(getattr(single, name) - exp[name]) < 1e-12, (user_id, name)
+    print("✅ evaluate_recommendations = eski döngü")
+    print("\n✅ Test tamamlandı!")
+
+
+if __name__ == "__main__":
+    test_evaluation_kernels_match_baseline()
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+from executors import BoundedExecutor, ExecutorBusy
+
+
+def test_bounded_executor():
+    print("🧪 BoundedExecutor testi başlıyor...")
+    executor = BoundedExecutor('test', max_workers=1, max_queue=2)
+    release = threading.Event()
+
+    async def scenario():
+        # 1 çalışan + 2 kuyrukta = 3 slot; hepsi release'i bekler
+        held = [asyncio.ensure_future(executor.run(release.wait, 5)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert executor.stats()['active'] == 1 and executor.stats()['queued'] == 2
+
+        # Test 1: Slot yoksa çağrı beklemez, hemen reddedilir
+        rejected = 0
+        for _ in range(10):
+            try:
+                await executor.run(lambda: None)
+            except ExecutorBusy:
+                rejected += 1
+        assert rejected == 10
+        assert executor.stats()['queued'] == 2, "Reddedilen çağrı kuyruğa girmemeli"
+        print(f"✅ Dolu executor {rejected} çağrıyı bekletmeden reddetti")
+
+        # Test 2: Slotlar boşalınca yeni çağrılar yine kabul edilir
+        release.set()
+        assert await asyncio.gather(*held) == [True, True, True]
+        assert await executor.run(sum, [1, 2, 3]) == 6
+        stats = executor.stats()
+        assert stats['active'] == 0 and stats['queued'] == 0
+        print("✅ Slotlar boşaldı, sayaçlar sıfırlandı")
+
+    asyncio.run(scenario())
+    executor.shutdown()
+    print("\n✅ Test tamamlandı!")
+
+
+if __name__ == "__main__":
+    test_bounded_executor()
@@ -0,0 +1,101 @@
+import json
+import os
+import sqlite3
+import tempfile
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from generate_synthetic_data import generate
+from genre_index import GenreCatalog, jaccard, match_fraction
+
+N_RECOMMENDATIONS = 15
+
+
+def baseline_scores(movies, query_genres, bonus=None, skip_ids=()):
+    """Bitmask öncesi döngü: her satırda json.loads + set kesişimi (skora göre stable sıralı)"""
+    scored = []
+    for movie_id, db_id, genres_json, rating_count, avg_rating in movies:
+        if db_id in skip_ids or not genres_json:
+            continue
+        movie_genres = set(json.loads(genres_json))
+        common = query_genres.intersection(movie_genres)
+        if common:
+            score = len(common) / len(query_genres)
+            if bonus is not None:
+                if rating_count and rating_count > bonus:
+                    score += 0.1
+                if avg_rating and avg_rating > 7.0:
+                    score += 0.2
+                score = round(score, 3)
+            scored.append((movie_id, score))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored[:N_RECOMMENDATIONS]
+
+
+def vectorized(catalog, scores):
+    return [(int(catalog.movie_ids[row]), float(scores[row])) for row in catalog.top_rows(scores, N_RECOMMENDATIONS)]
+
+
+def _with_bonus(catalog, scores, threshold):
+    bonus = 0.1 * (catalog.rating_count > threshold) + 0.2 * (catalog.avg_rating > 7.0)
+    return np.round(np.where(scores > 0, scores + bonus, 0.0), 3)
+
+
+def test_genre_bitmasks_match_baseline():
+    print("🧪 Tür bitmask testi başlıyor...")
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'movies.db')
+    generate(n_users=100, n_movies=300, n_ratings=3000, output_dir=os.path.join(workdir, 'ratings'),
+             db_path=db_path, seed=21)
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE movies SET avg_rating = 8.5 WHERE id % 7 = 0")   # avg_rating > 7 bonusu da denensin
+    conn.commit()
+    movies = conn.execute("SELECT movie_id, id, genres, rating_count, avg_rating FROM movies ORDER BY id").fetchall()
+    conn.close()
+
+    session = sessionmaker(bind=create_engine(f"sqlite:///{db_path}"))()
+    catalog = GenreCatalog.from_session(session)
+    session.close()
+
+    # Test 1: /genres: bitmask birleşimi = tüm türlerin kümesi
+    expected_genres = set().union(*(json.loads(g) for _, _, g, _, _ in movies if g))
+    assert catalog.genre_names() == sorted(expected_genres)
+    print(f"✅ {len(expected_genres)} tür aynı")
+
+    # Test 2: /favorites-based ve /similar-movies: ortak tür / sorgu türü
+    favorite_db_ids = [3, 10, 42]
+    favorite_genres = set().union(*(json.loads(g) for _, db_id, g, _, _ in movies if db_id in favorite_db_ids))
+    scores = match_fraction(catalog.masks, catalog.union_mask(catalog.rows_for_db_ids(favorite_db_ids)))
+    assert vectorized(catalog, scores) == baseline_scores(movies, favorite_genres)
+
+    base_row = catalog.row_for_movie_id(17)
+    scores = match_fraction(catalog.masks, int(catalog.masks[base_row]))
+    scores[base_row] = 0.0
+    assert vectorized(catalog, scores) == baseline_scores(movies, set(json.loads(movies[base_row][2])),
+                                                          skip_ids={movies[base_row][1]})
+    print("✅ Favori ve benzer film skorları/sıralaması eski döngüyle aynı")
+
+    # Test 3: /advanced (popülerlik bonusu, puanlananlar hariç) ve /genre-based (kayıtsız tür paydada)
+    liked, rated = [5, 8, 13], [5, 8, 13, 21, 34]
+    liked_genres = set().union(*(json.loads(g) for _, db_id, g, _, _ in movies if db_id in liked))
+    scores = _with_bonus(catalog, match_fraction(catalog.masks, catalog.union_mask(catalog.rows_for_db_ids(liked))), 50)
+    scores[catalog.rows_for_db_ids(rated)] = 0.0
+    assert vectorized(catalog, scores) == baseline_scores(movies, liked_genres, bonus=50, skip_ids=set(rated))
+
+    selected = {sorted(expected_genres)[0], sorted(expected_genres)[-1], "Bilinmeyen Tür"}
+    scores = _with_bonus(catalog, match_fraction(catalog.masks, catalog.registry.mask(selected), len(selected)), 20)
+    assert vectorized(catalog, scores) == baseline_scores(movies, selected, bonus=20)
+    print("✅ Bonuslu skorlar eski döngüyle aynı")
+
+    # Test 4: Jaccard, set tabanlı tanımla aynı
+    query = set(sorted(expected_genres)[:3])
+    expected = [len(query & set(json.loads(g))) / len(query | set(json.loads(g))) for _, _, g, _, _ in movies]
+    assert np.allclose(jaccard(catalog.masks, catalog.registry.mask(query)), expected)
+    print("✅ Jaccard set tanımıyla aynı")
+    print("\n✅ Test tamamlandı!")
+
+
+if __name__ == "__main__":
+    test_genre_bitmasks_match_baseline()
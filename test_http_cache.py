@@ -0,0 +1,76 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from http_cache import PRIVATE_CATALOG_CACHE, make_etag, not_modified, set_cache_headers
+from json_fragments import PreEncodedJSONResponse
+
+
+def _catalog_app(state):
+    # /genres, /search gibi handler'larla aynı desen: ETag sorgudan önce
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items(request: Request, limit: int = 10):
+        etag = make_etag('items', state['version'], limit)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        state['queries'] += 1
+        return set_cache_headers(PreEncodedJSONResponse({"version": state['version'], "limit": limit}), etag)
+
+    @app.get("/mine")
+    async def mine(request: Request):
+        etag = make_etag('mine', state['version'])
+        cached = not_modified(request, etag, PRIVATE_CATALOG_CACHE)
+        if cached is not None:
+            return cached
+        return set_cache_headers(PreEncodedJSONResponse({"ok": True}), etag, PRIVATE_CATALOG_CACHE)
+
+    return app
+
+
+def test_http_cache():
+    print("🧪 ETag / 304 testi başlıyor...")
+    state = {'version': 'v1', 'queries': 0}
+    client = TestClient(_catalog_app(state))
+
+    # Test 1: İlk istek 200 + ETag + Cache-Control
+    first = client.get("/items")
+    etag = first.headers['etag']
+    assert first.status_code == 200 and etag.startswith('W/"')
+    assert first.headers['cache-control'].startswith('public, max-age=')
+    print(f"✅ 200, ETag {etag}")
+
+    # Test 2: Güncel kopya -> 304, gövde yok, sorgu çalışmadı
+    revalidated = client.get("/items", headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304 and revalidated.content == b''
+    assert revalidated.headers['etag'] == etag and state['queries'] == 1
+    print("✅ If-None-Match eşleşti: 304, handler sorgusu çalışmadı")
+
+    # Test 3: Zayıf karşılaştırma, liste ve '*' kabul edilir
+    strong = etag.removeprefix('W/')
+    assert client.get("/items", headers={'If-None-Match': strong}).status_code == 304
+    assert client.get("/items", headers={'If-None-Match': f'"other", {etag}'}).status_code == 304
+    assert client.get("/items", headers={'If-None-Match': '*'}).status_code == 304
+    print("✅ W/ öneki, ETag listesi ve '*' eşleşti")
+
+    # Test 4: Parametre ya da katalog versiyonu değişince yeni ETag ve 200
+    other_limit = client.get("/items", params={'limit': 5}, headers={'If-None-Match': etag})
+    assert other_limit.status_code == 200 and other_limit.headers['etag'] != etag
+    state['version'] = 'v2'
+    reloaded = client.get("/items", headers={'If-None-Match': etag})
+    assert reloaded.status_code == 200 and reloaded.json()['version'] == 'v2'
+    assert state['queries'] == 3
+    print("✅ Parametre / versiyon değişikliği 200 döndü")
+
+    # Test 5: Kullanıcıya özel yanıtlar paylaşılan cache'e private işaretlenir
+    private = client.get("/mine")
+    assert private.headers['cache-control'].startswith('private')
+    not_changed = client.get("/mine", headers={'If-None-Match': private.headers['etag']})
+    assert not_changed.status_code == 304 and not_changed.headers['cache-control'].startswith('private')
+    print("✅ Private Cache-Control 304'te de korundu")
+    print("\n✅ Test tamamlandı!")
+
+
+if __name__ == "__main__":
+    test_http_cache()
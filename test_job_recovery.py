@@ -0,0 +1,62 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from jobs import FAILED, QUEUED, RUNNING, JobStore
+from sqlite_pool import get_pool
+
+
+def _age(store, job_id, seconds):
+    # Heartbeat'i geriye çek: sahibi `seconds` saniyedir sessiz
+    old = (datetime.utcnow() - timedelta(seconds=seconds)).isoformat(sep=' ')
+    with get_pool(store.db_path).connection() as conn, conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (old, job_id))
+
+
+def test_job_recovery():
+    print("🧪 Job recovery testi başlıyor...")
+    store = JobStore(os.path.join(tempfile.mkdtemp(), 'jobs.db'))
+    store.ensure_table()
+
+    # Test 1: Canlı sahibin işlerine dokunulmaz
+    live_running = store.create('ab_test', {'test_users': [1]}, owner='api-a')
+    store.mark_running(live_running)
+    live_queued = store.create('ab_test', {'test_users': [2]}, owner='api-a')
+    assert store.recover('api-b', limit=10) == []
+    assert store.get(live_running)['status'] == RUNNING
+    assert store.get(live_queued)['status'] == QUEUED
+    print("✅ Canlı process'in işleri başka process tarafından alınmadı")
+
+    # Test 2: Sahibi ölmüş running iş failed olur, queued iş tek bir process'e geçer
+    for job_id in (live_running, live_queued):
+        _age(store, job_id, 3600)
+    claimed_b = store.recover('api-b', limit=10)
+    claimed_c = store.recover('api-c', limit=10)
+    assert [job_id for job_id, _, _ in claimed_b] == [live_queued]
+    assert claimed_c == []
+    assert store.get(live_running)['status'] == FAILED
+    print("✅ Yetim queued iş yalnızca bir kez sahiplenildi")
+
+    # Test 3: Recovery bekleyen iş limitine uyar
+    orphans = [store.create('optimize_weights', {'test_users': [i]}, owner='api-dead') for i in range(5)]
+    for job_id in orphans:
+        _age(store, job_id, 3600)
+    first = store.recover('api-b', limit=2)
+    assert len(first) == 2
+    assert store.recover('api-b', limit=0) == []
+    rest = store.recover('api-c', limit=10)
+    assert len(rest) == 3 and not {j for j, _, _ in first} & {j for j, _, _ in rest}
+    print(f"✅ Limit uygulandı: {len(first)} + {len(rest)} iş, çakışma yok")
+
+    # Test 4: Heartbeat yalnızca kendi işlerini tazeler
+    mine, theirs = first[0][0], rest[0][0]
+    _age(store, mine, 3600)
+    _age(store, theirs, 3600)
+    store.heartbeat('api-b')
+    assert [job_id for job_id, _, _ in store.recover('api-x', limit=10)] == [theirs]
+    print("✅ Heartbeat atan sahibin işi korundu, sessiz olanın işi devredildi")
+    print("\n✅ Test tamamlandı!")
+
+
+if __name__ == "__main__":
+    test_job_recovery()
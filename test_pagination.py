@@ -0,0 +1,88 @@
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from pagination import (PAGE_MAX_LIMIT, InvalidCursor, RankedListCache, decode_cursor, decode_id_cursor,
+                        decode_time_cursor, encode_cursor, encode_time_cursor, page_limit, split_page)
+
+
+def _raises_invalid(func, *args):
+    try:
+        func(*args)
+    except InvalidCursor:
+        return True
+    return False
+
+
+def test_keyset_cursors():
+    print("🧪 Keyset cursor testi başlıyor...")
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE movies (id INTEGER PRIMARY KEY, title TEXT)")
+    conn.executemany("INSERT INTO movies (id, title) VALUES (?, ?)",
+                     [(i, f"Movie {i}") for i in range(1, 48)])
+
+    # Test 1: /search deseni (id > cursor, limit + 1) her satırı bir kez verir, araya eklenen satır kaymaz
+    seen, cursor, pages = [], None, 0
+    while True:
+        after_id = decode_id_cursor(cursor) if cursor else 0
+        ids, has_more = split_page([row[0] for row in conn.execute(
+            "SELECT id FROM movies WHERE id > ? ORDER BY id LIMIT ?", (after_id, 10 + 1))], 10)
+        seen.extend(ids)
+        pages += 1
+        if pages == 2:
+            conn.execute("INSERT INTO movies (id, title) VALUES (0, 'Yeni ama eski sırada')")
+        if not has_more:
+            break
+        cursor = encode_cursor([ids[-1]])
+    assert seen == list(range(1, 48)) and pages == 5
+    print(f"✅ {len(seen)} satır {pages} sayfada, tekrar/atlama yok")
+
+    # Test 2: (created_at DESC, id DESC) cursor'ı aynı zamanlı satırları id ile ayırır
+    base = datetime(2024, 5, 1, 12, 0, 0)
+    rows = sorted([(base - timedelta(minutes=i // 3), 100 + i) for i in range(12)], reverse=True)
+    walked, cursor = [], None
+    while True:
+        candidates = [r for r in rows if cursor is None or r < decode_time_cursor(cursor)]
+        page, has_more = split_page(candidates[:5], 4)
+        walked.extend(page)
+        if not has_more:
+            break
+        cursor = encode_time_cursor(*page[-1])
+    assert walked == rows
+    print("✅ Zaman cursor'ı eşit created_at değerlerinde satır kaybetmedi")
+
+    # Test 3: Bozuk cursor'lar InvalidCursor (handler 400)
+    assert _raises_invalid(decode_id_cursor, "not-base64!!")
+    assert _raises_invalid(decode_id_cursor, encode_cursor(["x"]))
+    assert _raises_invalid(decode_cursor, encode_cursor([1, 2]), 3)
+    assert _raises_invalid(decode_time_cursor, encode_cursor(["dün", 5]))
+    assert page_limit(None) > 0 and page_limit(0) == 1 and page_limit(10 ** 6) == PAGE_MAX_LIMIT
+    print("✅ Bozuk cursor'lar reddedildi, limit sınırlandı")
+    print("\n✅ Test tamamlandı!")
+
+
+def test_ranked_list_sessions():
+    print("🧪 Sıralı liste oturum testi başlıyor...")
+    cache = RankedListCache('test_pages', ttl=0.3, maxsize=10)
+    ranked = [{'movie_id': i} for i in range(30)]
+    session_id = cache.put((7, 'hybrid'), ranked)
+
+    # Test 1: Sonraki sayfalar aynı snapshot'tan dilimlenir
+    assert cache.get(session_id, (7, 'hybrid')) is ranked
+    print("✅ Oturum snapshot'ı döndü")
+
+    # Test 2: Başka kullanıcının cursor'ı reddedilir
+    assert _raises_invalid(cache.get, session_id, (8, 'hybrid'))
+    print("✅ Başka owner'a ait cursor reddedildi")
+
+    # Test 3: Süre dolunca None (v6 handler 410 döner)
+    time.sleep(0.4)
+    assert cache.get(session_id, (7, 'hybrid')) is None
+    assert cache.stats()['sessions'] == 0
+    print("✅ Süresi dolan oturum None (410)")
+    print("\n✅ Test tamamlandı!")
+
+
+if __name__ == "__main__":
+    test_keyset_cursors()
+    test_ranked_list_sessions()
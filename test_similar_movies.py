@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import tempfile
+
+import numpy as np
+
+from generate_synthetic_data import generate
+from similar_movies import SimilarMoviesIndex, _store_path, build
+
+
+def _load_store(store_dir):
+    return {name: np.load(_store_path(store_dir, name)) for name in ('neighbors', 'scores')}
+
+
+def test_similar_movies_incremental():
+    print("🧪 Similar-movies artımlı build testi başlıyor...")
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'movies.db')
+    generate(n_users=300, n_movies=150, n_ratings=6000, output_dir=os.path.join(workdir, 'ratings'),
+             db_path=db_path, seed=7)
+
+    store = os.path.join(workdir, 'similar_store')
+    assert build(db_path, store, k=10)['mode'] == 'full'
+
+    # Okuyucu tabloyu build'den önce açar (API worker'ı gibi)
+    index = SimilarMoviesIndex(store)
+    assert index.is_ready
+    old_arrays = index._state[0]
+    old_neighbors = np.array(old_arrays['neighbors'])
+    old_scores = np.array(old_arrays['scores'])
+
+    # Birkaç filme yeni rating'ler: mevcut kullanıcılar farklı filmleri yüksek puanlar
+    conn = sqlite3.connect(db_path)
+    rated = set(conn.execute("SELECT user_id, movie_id FROM ratings").fetchall())
+    new_rows = [(u, m, 5.0) for u in range(1, 61) for m in (3, 17, 42) if (u, m) not in rated]
+    conn.executemany("INSERT INTO ratings (user_id, movie_id, rating, created_at, updated_at) "
+                     "VALUES (?, ?, ?, datetime('now'), datetime('now'))", new_rows)
+    conn.commit()
+    conn.close()
+
+    # Test 1: Artımlı build, sıfırdan tam build ile aynı tabloyu üretir
+    meta = build(db_path, store, k=10)
+    assert meta['mode'] == 'incremental' and meta['changed_movies'] == 3
+    full_store = os.path.join(workdir, 'full_store')
+    build(db_path, full_store, k=10, full=True)
+    incremental, full = _load_store(store), _load_store(full_store)
+    assert np.allclose(incremental['scores'], full['scores'], atol=1e-6)
+    same = (incremental['neighbors'] == full['neighbors']).mean()
+    assert same > 0.99, f"Komşu listeleri farklı ({same:.3f})"
+    print(f"✅ Artımlı build = tam build ({meta['updated_rows']} liste güncellendi, komşu eşleşmesi {same:.3f})")
+
+    # Test 2: Açık okuyucunun gördüğü dosyalar yerinde değişmedi (yarı yeni satır yok)
+    assert np.array_equal(np.array(old_arrays['neighbors']), old_neighbors)
+    assert np.array_equal(np.array(old_arrays['scores']), old_scores)
+    print("✅ Eski memmap'ler tutarlı kaldı")
+
+    # Test 3: meta.json değişince okuyucu yeni tabloya geçer
+    index._checked_at = 0.0
+    row = index._state[1][42]
+    index._maybe_reload()
+    assert np.array_equal(np.array(index._state[0]['neighbors'][row]), incremental['neighbors'][row])
+    print("✅ Okuyucu yeni tabloyu yükledi")
+    print("\n✅ Test tamamlandı!")
+
+
+if __name__ == "__main__":
+    test_similar_movies_incremental()
@@ -0,0 +1,56 @@
+import asyncio
+
+from single_flight import SingleFlight
+
+
+def test_single_flight():
+    print("🧪 Single-flight testi başlıyor...")
+    flight = SingleFlight('test')
+    calls = []
+
+    def compute(key, delay=0.05, fail=False):
+        async def run():
+            calls.append(key)
+            await asyncio.sleep(delay)
+            if fail:
+                raise RuntimeError(f"boom {key}")
+            return {'key': key, 'call': len(calls)}
+        return run
+
+    async def scenario():
+        # Test 1: Aynı anahtar için 20 eşzamanlı çağrı tek hesaplamayı paylaşır
+        results = await asyncio.gather(*(flight.do('user-1', compute('user-1')) for _ in range(20)))
+        assert calls == ['user-1'] and all(r is results[0] for r in results)
+        print("✅ 20 eşzamanlı istek tek hesaplama")
+
+        # Test 2: Farklı anahtarlar ayrı hesaplanır; bitince yeni çağrı yeniden hesaplar (cache yok)
+        calls.clear()
+        await asyncio.gather(flight.do('a', compute('a')), flight.do('b', compute('b')))
+        await flight.do('a', compute('a'))
+        assert sorted(calls) == ['a', 'a', 'b'] and flight.in_flight() == 0
+        print("✅ Farklı anahtarlar ayrı, biten iş saklanmadı")
+
+        # Test 3: Hata tüm bekleyenlere iletilir, tablo temizlenir
+        calls.clear()
+        outcomes = await asyncio.gather(*(flight.do('bad', compute('bad', fail=True)) for _ in range(5)),
+                                        return_exceptions=True)
+        assert calls == ['bad'] and all(isinstance(o, RuntimeError) for o in outcomes)
+        assert flight.in_flight() == 0
+        print("✅ Hata 5 bekleyene de iletildi")
+
+        # Test 4: İptal edilen istemci diğerlerinin hesaplamasını durdurmaz
+        calls.clear()
+        leader = asyncio.ensure_future(flight.do('slow', compute('slow', delay=0.1)))
+        follower = asyncio.ensure_future(flight.do('slow', compute('slow', delay=0.1)))
+        await asyncio.sleep(0.02)
+        leader.cancel()
+        result = await follower
+        assert leader.cancelled() and result['key'] == 'slow' and calls == ['slow']
+        print("✅ İptal edilen lider diğer bekleyeni etkilemedi")
+
+    asyncio.run(scenario())
+    print("\n✅ Test tamamlandı!")
+
+
+if __name__ == "__main__":
+    test_single_flight()